@@ -0,0 +1,129 @@
+import numpy as np
+from pymavlink import mavutil
+
+import tlogFrames
+
+# struct format codes of MAVLink payloads and their little-endian NumPy equivalents
+STRUCT_DTYPES = {
+    'b': 'i1', 'B': 'u1',
+    'h': '<i2', 'H': '<u2',
+    'i': '<i4', 'I': '<u4',
+    'q': '<i8', 'Q': '<u8',
+    'f': '<f4', 'd': '<f8',
+    'c': 'S1', 's': 'S',
+}
+
+# Frames gathered at once; bounds the size of the temporary index arrays
+CHUNK_FRAMES = 65536
+
+_payload_layouts = {}
+
+
+def payload_layout(msg_class):
+    """(structured dtype in wire order, [(field, array length or 0)]) for a message class.
+
+    The field list is in declared order, holds only the fields pymavlink
+    decodes to numbers, and is None if the payload format is not supported.
+    """
+    layout = _payload_layouts.get(msg_class)
+    if layout is not None:
+        return layout
+
+    tokens = tlogFrames.FORMAT_TOKEN.findall(msg_class.unpacker.format.lstrip('<>=!@'))
+    layout = (None, None)
+    if len(tokens) == len(msg_class.ordered_fieldnames) and all(code in STRUCT_DTYPES for _, code in tokens):
+        names, formats, numeric = [], [], {}
+        for name, (count, code) in zip(msg_class.ordered_fieldnames, tokens):
+            count = int(count or 1)
+            names.append(name)
+            if code == 's':
+                formats.append(f"S{count}")
+            elif count > 1:
+                formats.append((STRUCT_DTYPES[code], (count,)))
+            else:
+                formats.append(STRUCT_DTYPES[code])
+            # Strings and chars decode to bytes, which are not plotted
+            if code not in ('s', 'c'):
+                numeric[name] = count if count > 1 else 0
+        dtype = np.dtype({'names': names, 'formats': formats})
+        if dtype.itemsize == msg_class.unpacker.size:
+            layout = (dtype, [(name, numeric[name]) for name in msg_class.fieldnames if name in numeric])
+    _payload_layouts[msg_class] = layout
+    return layout
+
+
+def x25crc(rows, crc_extra):
+    """MAVLink CRC-16/MCRF4XX of every row of a 2-D uint8 array, with crc_extra appended"""
+    crc = np.full(len(rows), 0xFFFF, dtype=np.uint32)
+    columns = list(rows.T.astype(np.uint32)) + [np.full(len(rows), crc_extra, dtype=np.uint32)]
+    for byte in columns:
+        tmp = byte ^ (crc & 0xFF)
+        tmp = (tmp ^ (tmp << 4)) & 0xFF
+        crc = ((crc >> 8) ^ (tmp << 8) ^ (tmp << 3) ^ (tmp >> 4)) & 0xFFFF
+    return crc
+
+
+def decode_frames(data, offsets, msg_class, skipped=()):
+    """Decode the tlog frames at offsets (all of msg_class) in bulk.
+
+    data is the log as a uint8 array. Returns (times, [(field, column name,
+    values)]) with frames failing their CRC dropped, exactly as pymavlink
+    would decode them, or None if the frames need the per-message decoder.
+    """
+    if msg_class is None:
+        return None
+    dtype, fields = payload_layout(msg_class)
+    if dtype is None:
+        return None
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    packets = offsets + tlogFrames.TIMESTAMP_LEN
+    markers = data[packets]
+    v2 = markers == tlogFrames.MARKER_V2
+    if v2.any() and mavutil.mavlink.WIRE_PROTOCOL_VERSION != "2.0":
+        return None  # the MAVLink 1 decoder rejects these; let it report them
+    header_len = np.where(v2, tlogFrames.HEADER_LEN_V2, tlogFrames.HEADER_LEN_V1)
+    payload_len = data[packets + 1].astype(np.int64)
+    check_crc = not getattr(mavutil.mavlink, 'MAVLINK_IGNORE_CRC', False)
+
+    count = len(offsets)
+    records = np.zeros(count, dtype=dtype)
+    valid = np.zeros(count, dtype=bool)
+    wire_size = dtype.itemsize
+
+    # Frames with the same header and payload length share one gather and CRC pass
+    frame_kind = header_len * 256 + payload_len
+    for kind in np.unique(frame_kind):
+        header, length = divmod(int(kind), 256)
+        rows = np.flatnonzero(frame_kind == kind)
+        # Bytes from after the marker through the CRC
+        span = np.arange(1, header + length + tlogFrames.CRC_LEN)
+        copied = min(length, wire_size)
+        for start in range(0, len(rows), CHUNK_FRAMES):
+            chunk = rows[start:start + CHUNK_FRAMES]
+            frames = data[packets[chunk, None] + span]
+            if check_crc:
+                crc = frames[:, -2].astype(np.uint32) | (frames[:, -1].astype(np.uint32) << 8)
+                ok = x25crc(frames[:, :-2], msg_class.crc_extra) == crc
+            else:
+                ok = np.ones(len(chunk), dtype=bool)
+            # Short (MAVLink 2 truncated) payloads are zero padded, long ones cut to the wire size
+            payload = np.zeros((len(chunk), wire_size), dtype=np.uint8)
+            payload[:, :copied] = frames[:, header - 1:header - 1 + copied]
+            records[chunk] = payload.view(dtype).reshape(len(chunk))
+            valid[chunk] = ok
+
+    records = records[valid]
+    stamps = data[offsets[valid, None] + np.arange(tlogFrames.TIMESTAMP_LEN)]
+    times = stamps.copy().view('>u8').reshape(len(records)).astype(np.float64) * 1.0e-6
+
+    columns = []
+    for field, length in fields:
+        if field in skipped:
+            continue
+        values = records[field]
+        if length:
+            columns.extend((field, f"{field}[{idx}]", values[:, idx]) for idx in range(length))
+        else:
+            columns.append((field, field, values))
+    return times, columns
@@ -0,0 +1,127 @@
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+import synthTlog  # noqa: E402
+from columnSpill import MemoryBudget  # noqa: E402
+from exportFormats import EXPORT_FORMATS, NPY_BLOCK  # noqa: E402
+from logIndex import LogIndex  # noqa: E402
+from runBenchmarks import DEFAULT_DATA_DIR  # noqa: E402
+from xmlWriter import RECORDS_PER_BLOCK  # noqa: E402
+
+# One fast type, so its time column alone is several times the budget
+DEFAULT_MIX = {'ATTITUDE': 1000}
+DEFAULT_SIZE_MB = 24
+DEFAULT_BUDGET_MB = 2
+# Rows of the sample export that measures what formatting one block costs
+SAMPLE_ROWS = max(RECORDS_PER_BLOCK, NPY_BLOCK)
+# Formats written a block at a time (pyarrow builds its tables in memory)
+STREAMED_FORMATS = ('xml', 'csv', 'npz', 'npz-compressed')
+
+
+def sections_of(index, msg_type):
+    """Export sections of every instance of msg_type, as the plotter's "Export All" builds them"""
+    sections = []
+    for msg_id, data in sorted(index.type_data(msg_type, index.start_time).items(), key=lambda item: int(item[0])):
+        fields = data['data']
+        sections.append((msg_id, data['times'], [(field, fields[field]) for field in sorted(fields)]))
+    return sections
+
+
+def traced_peak(write):
+    """Peak Python/NumPy memory allocated while write() runs; memory-mapped pages are not counted"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        write()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check(log_file, budget_mb, progress=print):
+    """Export the biggest type of log_file, decoded within budget_mb, in every streamed format.
+
+    Each export may take at most budget_mb more than exporting its first
+    SAMPLE_ROWS rows (the cost of formatting a block), so no column bigger
+    than the budget is read whole; and it must write the same file as an
+    export of the log decoded without a budget. Returns the failures.
+    """
+    index = LogIndex(log_file, budget=MemoryBudget(int(budget_mb * 1024 * 1024))).load()
+    index.decode_types(index.message_types())
+    msg_type = max(index.message_types(), key=index.frame_count)
+    times_bytes = index.frame_count(msg_type) * 8
+    if times_bytes <= budget_mb * 1024 * 1024:
+        return [f"the {msg_type} times ({times_bytes / 2 ** 20:.1f} MB) fit in the budget; use a bigger --size-mb"]
+
+    reference = LogIndex(log_file).load()
+    reference.decode_types([msg_type])
+    reference_sections = sections_of(reference, msg_type)
+    sample_sections = [(msg_id, np.asarray(times)[:SAMPLE_ROWS],
+                        [(field, np.asarray(values)[:SAMPLE_ROWS]) for field, values in columns])
+                       for msg_id, times, columns in reference_sections]
+
+    failures = []
+    work_dir = tempfile.mkdtemp(prefix='mavlink-spill-check-')
+    try:
+        for export_format in EXPORT_FORMATS:
+            if export_format.key not in STREAMED_FORMATS:
+                continue
+            path = os.path.join(work_dir, 'spilled' + export_format.extension)
+            expected = os.path.join(work_dir, 'in-memory' + export_format.extension)
+            block_peak = traced_peak(lambda: export_format.write(expected, sample_sections, msg_type))
+            # The sections are looked up as part of the export, as the GUIs do when Export is clicked
+            peak = traced_peak(lambda: export_format.write(path, sections_of(index, msg_type), msg_type))
+            export_format.write(expected, reference_sections, msg_type)
+            extra = (peak - block_peak) / 2 ** 20
+            progress(f"{export_format.key:16} {times_bytes / 2 ** 20:6.1f} MB of times, peak {peak / 2 ** 20:6.2f} MB "
+                     f"({extra:+.2f} MB over one block)")
+            if extra > budget_mb:
+                failures.append(f"{export_format.key}: peak {extra:.2f} MB over one block, more than the {budget_mb} MB budget")
+            if not same_export(path, expected):
+                failures.append(f"{export_format.key}: differs from the export without a budget")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return failures
+
+
+def same_export(path, expected):
+    if path.endswith('.npz'):
+        with np.load(path) as a, np.load(expected) as b:
+            return list(a.keys()) == list(b.keys()) and all(np.array_equal(a[key], b[key]) for key in a.keys())
+    with open(path, 'rb') as a, open(expected, 'rb') as b:
+        return a.read() == b.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that exporting spilled columns bigger than the memory budget stays within it.")
+    parser.add_argument('--size-mb', type=float, default=DEFAULT_SIZE_MB,
+                        help=f"synthetic log size (default: {DEFAULT_SIZE_MB})")
+    parser.add_argument('--mix', type=synthTlog.parse_mix, help="message mix, as synthTlog.py (default: ATTITUDE=1000)")
+    parser.add_argument('--budget-mb', type=float, default=DEFAULT_BUDGET_MB,
+                        help=f"memory budget of the decoded columns (default: {DEFAULT_BUDGET_MB})")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where synthetic logs are kept for reuse")
+    args = parser.parse_args(argv)
+
+    log_file = synthTlog.ensure_log(args.data_dir, args.size_mb, args.mix or DEFAULT_MIX)
+    failures = check(log_file, args.budget_mb)
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        return 1
+    print("Exports stayed within the budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+import argparse
+import datetime
+import fnmatch
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib  # noqa: E402
+
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+import synthTlog  # noqa: E402
+from exportFormats import EXPORT_FORMATS  # noqa: E402
+from logCache import DEFAULT_CACHE_DIR, LogCache  # noqa: E402
+from logIndex import LogIndex  # noqa: E402
+from pageCache import AxesPool, page_series, render_page  # noqa: E402
+from selectionExport import selection_section  # noqa: E402
+from timeAlign import ALIGN_MODES, ALIGN_RESAMPLE  # noqa: E402
+
+RESULTS_VERSION = 1
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'results.json')
+DEFAULT_DATA_DIR = os.path.join(DEFAULT_CACHE_DIR, 'benchmarks')
+# A stage regresses when it is this much slower or bigger than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and by more than these, so noise on very short stages is not reported
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 1.0
+# "Plot All" page grid and figure, as the plotter lays out a 3x3 page
+PAGE_ROWS = 3
+PAGE_COLS = 3
+PAGE_SIZE = (10, 6)
+PAGE_DPI = 100
+# Fields per message type in the exported selection, and the resample rate (Hz)
+SELECTION_FIELDS = 2
+RESAMPLE_RATE = 50.0
+
+
+class Stage:
+    """A measured step: setup() prepares its input untimed, run(state) is timed and may return an item count"""
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda: None)
+
+
+def scanned(log_file, workers):
+    return LogIndex(log_file).load(workers=workers)
+
+
+def decoded(log_file, workers):
+    index = scanned(log_file, workers)
+    index.decode_types(index.message_types(), workers=workers)
+    return index
+
+
+def log_stages(log_file, workers, work_dir):
+    """Stages of reading the log: the scan that finds the message types, each type's decode, a full
+    parse and reopening it from the log cache"""
+    def scan(_):
+        index = scanned(log_file, workers)
+        return sum(index.frame_count(msg_type) for msg_type in index.message_types())
+    stages = [Stage('scan', scan)]
+
+    for msg_type in scanned(log_file, workers).message_types():
+        def decode(index, msg_type=msg_type):
+            index.decode_types([msg_type], workers=workers)
+            return index.frame_count(msg_type)
+        stages.append(Stage(f'decode:{msg_type}', decode, lambda: scanned(log_file, workers)))
+
+    def full_parse(_):
+        index = decoded(log_file, workers)
+        return sum(len(data['times']) for instances in index.all_data().values() for data in instances.values())
+    stages.append(Stage('full_parse', full_parse))
+
+    cache = LogCache(os.path.join(work_dir, 'cache'))
+
+    def fill_cache():
+        if cache.open(log_file) is None:
+            index = LogIndex(log_file).load(cache, workers=workers)
+            index.decode_types(index.message_types(), workers=workers)
+
+    def open_cached(_):
+        index = LogIndex(log_file).load(cache, workers=workers)
+        index.decode_types(index.message_types(), workers=workers)
+        return len(index.all_data())
+    stages.append(Stage('open_cached', open_cached, fill_cache))
+    return stages
+
+
+def type_plots(message_data, msg_type):
+    """The "Plot All" list of a message type, built as the plotter builds it"""
+    plots = []
+    for msg_id in sorted(message_data[msg_type], key=int):
+        data = message_data[msg_type][msg_id]
+        times = data['times']
+        for field in sorted(data['data']):
+            values = data['data'][field]
+            if len(times) == len(values):
+                plots.append({'times': times, 'values': values, 'field': field, 'msg_id': msg_id})
+    return plots
+
+
+def plot_stages(message_data, plot_type):
+    """Rendering "Plot All" pages on the Agg backend: a first page on a fresh figure, and turning pages"""
+    per_page = PAGE_ROWS * PAGE_COLS
+    plots = type_plots(message_data, plot_type)
+    pages = [plots[start:start + per_page] for start in range(0, len(plots), per_page)]
+
+    def first_page(_):
+        render_page(pages[0], PAGE_ROWS, PAGE_COLS, PAGE_SIZE, PAGE_DPI, True, None)
+        return len(pages[0])
+
+    def turn_setup():
+        figure = Figure(figsize=PAGE_SIZE, dpi=PAGE_DPI)
+        canvas = FigureCanvasAgg(figure)
+        pool = AxesPool(figure)
+        pool.configure(PAGE_ROWS, PAGE_COLS)
+        pool.show(page_series(pages[0]), True)
+        pool.layout()
+        canvas.draw()
+        return pool, canvas, [1 % len(pages)]
+
+    def turn_page(state):
+        # Alternates between two pages so every run shows other data
+        pool, canvas, page = state
+        pool.show(page_series(pages[page[0]]), True, pool.subplot_params)
+        canvas.draw()
+        page[0] = 1 - page[0] if len(pages) > 1 else 0
+        return len(pages[page[0]])
+
+    def no_decimation(_):
+        render_page(pages[0], PAGE_ROWS, PAGE_COLS, PAGE_SIZE, PAGE_DPI, False, None)
+        return len(pages[0])
+
+    return [Stage('plot_all:first_page', first_page), Stage('plot_all:page_turn', turn_page, turn_setup),
+            Stage('plot_all:no_decimation', no_decimation)]
+
+
+def export_stages(message_data, plot_type, selection, work_dir):
+    """Every export path in every available format: a whole message type (plotter "Plot All"), one field
+    (plotter), the selected fields (exporter), plus the timeline alignment of the selection"""
+    type_sections = []
+    for msg_id in sorted(message_data[plot_type], key=int):
+        data = message_data[plot_type][msg_id]
+        fields = data['data']
+        type_sections.append((msg_id, data['times'], [(field, fields[field]) for field in sorted(fields)]))
+    msg_type, msg_id, field = selection[0]
+    field_data = message_data[msg_type][msg_id]
+    field_sections = [(None, field_data['times'], [(field, field_data['data'][field])])]
+
+    stages = []
+    for export_format in EXPORT_FORMATS:
+        path = os.path.join(work_dir, 'export' + export_format.extension)
+
+        def export_type(_, export_format=export_format, path=path):
+            export_format.write(path, type_sections, plot_type)
+            return sum(len(times) for _, times, _ in type_sections)
+
+        def export_field(_, export_format=export_format, path=path):
+            export_format.write(path, field_sections)
+            return len(field_data['times'])
+
+        def export_selection(_, export_format=export_format, path=path):
+            times, columns, exact_times = selection_section(message_data, selection)
+            export_format.write(path, [(None, times, columns)], exact_times=exact_times)
+            return len(times)
+
+        stages += [Stage(f'export_type:{export_format.key}', export_type),
+                   Stage(f'export_field:{export_format.key}', export_field),
+                   Stage(f'export_selection:{export_format.key}', export_selection)]
+
+    for mode in ALIGN_MODES:
+        def align(_, mode=mode):
+            rate = RESAMPLE_RATE if mode == ALIGN_RESAMPLE else None
+            return len(selection_section(message_data, sorted(selection), mode, rate)[0])
+        stages.append(Stage(f'align:{mode}', align))
+    return stages
+
+
+def measure(stage, repeat):
+    """{'seconds': fastest run, 'median', 'peak_mb', 'items'}; peak memory comes from one extra traced run"""
+    times = []
+    items = None
+    for _ in range(repeat):
+        state = stage.setup()
+        gc.collect()
+        started = time.perf_counter()
+        items = stage.run(state)
+        times.append(time.perf_counter() - started)
+        del state
+
+    # Traced separately: tracemalloc slows Python code down too much to time it
+    state = stage.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    result = {'seconds': round(min(times), 6), 'median': round(statistics.median(times), 6),
+              'peak_mb': round(peak / (1024 * 1024), 3)}
+    if items is not None:
+        result['items'] = int(items)
+    return result
+
+
+def environment():
+    import pymavlink
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'pymavlink': getattr(pymavlink, '__version__', None),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(workload, workers=1, repeat=3, data_dir=DEFAULT_DATA_DIR, patterns=None, progress=print):
+    """Generate (or reuse) the synthetic log of workload (synthTlog.generate arguments) and measure
+    every stage matching patterns; returns the results"""
+    log_file = synthTlog.ensure_log(data_dir, **workload)
+    work_dir = tempfile.mkdtemp(prefix='mavlink-bench-')
+    try:
+        index = decoded(log_file, workers)
+        message_data = index.all_data()
+        # Pages and exports of the type with the most samples over all its fields
+        plot_type = max(sorted(message_data), key=lambda msg_type: sum(
+            len(plot_data['values']) for plot_data in type_plots(message_data, msg_type)))
+        selection = [(msg_type, msg_id, field)
+                     for msg_type in sorted(message_data)
+                     for msg_id in sorted(message_data[msg_type], key=int)[:1]
+                     for field in sorted(message_data[msg_type][msg_id]['data'])[:SELECTION_FIELDS]]
+
+        stages = (log_stages(log_file, workers, work_dir) + plot_stages(message_data, plot_type)
+                  + export_stages(message_data, plot_type, selection, work_dir))
+        if patterns:
+            stages = [stage for stage in stages if any(fnmatch.fnmatch(stage.name, pattern) for pattern in patterns)]
+
+        results = {}
+        for stage in stages:
+            results[stage.name] = measure(stage, repeat)
+            progress(f"{stage.name:32} {results[stage.name]['seconds'] * 1000:10.1f} ms {results[stage.name]['peak_mb']:9.1f} MB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'workload': workload,
+        'workers': workers,
+        'repeat': repeat,
+        'log': {'bytes': os.path.getsize(log_file), 'plot_type': plot_type,
+                'selection': ['/'.join(path) for path in selection]},
+        'stages': results,
+    }
+
+
+def comparable(results, baseline):
+    """Why the results cannot be compared with the baseline, or None"""
+    if baseline.get('version') != RESULTS_VERSION:
+        return "the baseline was written by another version of the suite"
+    if baseline.get('workload') != results['workload']:
+        return "the baseline was measured on another synthetic log (size, mix, seed or MAVLink version)"
+    return None
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """[(stage, metric, baseline value, current value)] of the stages that got slower or bigger beyond tolerance"""
+    regressions = []
+    for name, current in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+            if current[metric] > before[metric] * (1 + tolerance) and current[metric] - before[metric] > floor:
+                regressions.append((name, metric, before[metric], current[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time and measure peak memory of loading, plotting and exporting a synthetic tlog, "
+                    "and compare with a stored baseline. Needs no display or network.")
+    parser.add_argument('--size-mb', type=float, default=synthTlog.DEFAULT_SIZE_MB,
+                        help=f"synthetic log size (default: {synthTlog.DEFAULT_SIZE_MB})")
+    parser.add_argument('--mix', type=synthTlog.parse_mix,
+                        help="message types and rates, e.g. ATTITUDE=50,BATTERY_STATUS=2:3 (default: a typical autopilot stream)")
+    parser.add_argument('--seed', type=int, default=synthTlog.DEFAULT_SEED)
+    parser.add_argument('--mavlink2', action='store_true', help="use MAVLink 2 frames")
+    parser.add_argument('--workers', type=int, default=1, help="processes used to scan and decode (default: 1)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage; the fastest counts (default: 3)")
+    parser.add_argument('--stage', action='append', dest='stages', metavar='PATTERN',
+                        help="only run stages matching this wildcard, e.g. 'export_*:csv' (repeatable)")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where synthetic logs are kept for reuse")
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT, help="results JSON file")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline JSON to compare with")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown or memory growth, as a fraction (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    # Round-tripped through JSON so it compares equal to a baseline's
+    workload = json.loads(json.dumps({'size_mb': args.size_mb, 'mix': args.mix or synthTlog.DEFAULT_MIX,
+                                      'seed': args.seed, 'mavlink2': args.mavlink2}))
+    results = run(workload, args.workers, args.repeat, args.data_dir, args.stages)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        print("No baseline to compare with (write one with --update-baseline)")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    reason = comparable(results, baseline)
+    if reason:
+        print(f"Not compared with {args.baseline}: {reason}")
+        return 2
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, before, now in regressions:
+        unit = 'ms' if metric == 'seconds' else 'MB'
+        scale = 1000 if metric == 'seconds' else 1
+        print(f"REGRESSION {name}: {metric} {before * scale:.1f} -> {now * scale:.1f} {unit} ({now / before:.2f}x)")
+    if regressions:
+        return 1
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
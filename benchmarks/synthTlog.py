@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import heapq
+import importlib
+import json
+import math
+import os
+import random
+import struct
+import sys
+
+# Message types and their rates (Hz); TYPE=RATE:N sends N instances (ids 0..N-1) of a type with an 'id' field
+DEFAULT_MIX = {
+    'ATTITUDE': 50,
+    'RAW_IMU': 50,
+    'SCALED_IMU2': 50,
+    'SERVO_OUTPUT_RAW': 25,
+    'GLOBAL_POSITION_INT': 25,
+    'RC_CHANNELS': 10,
+    'VFR_HUD': 10,
+    'GPS_RAW_INT': 5,
+    'SYS_STATUS': 2,
+    'BATTERY_STATUS': (2, 2),
+    'HEARTBEAT': 1,
+    'STATUSTEXT': 0.2,
+}
+DEFAULT_SIZE_MB = 16
+DEFAULT_SEED = 1
+# Fixed start so the same settings always give the same bytes
+START_USEC = 1700000000 * 1000000
+
+INT_RANGES = {
+    'int8_t': (-128, 127), 'uint8_t': (0, 255), 'int16_t': (-32768, 32767), 'uint16_t': (0, 65535),
+    'int32_t': (-2 ** 31, 2 ** 31 - 1), 'uint32_t': (0, 2 ** 32 - 1),
+    'int64_t': (-2 ** 63, 2 ** 63 - 1), 'uint64_t': (0, 2 ** 64 - 1),
+}
+
+
+def parse_mix(text):
+    """'ATTITUDE=50,BATTERY_STATUS=2:3' -> {type: rate or (rate, instances)}"""
+    mix = {}
+    for item in text.split(','):
+        name, _, rate = item.strip().partition('=')
+        rate, _, instances = rate.partition(':')
+        mix[name.strip().upper()] = (float(rate), int(instances)) if instances else float(rate)
+    return mix
+
+
+def mix_streams(mix):
+    """[(type, rate, instance)] of a mix"""
+    streams = []
+    for msg_type, rate in sorted(mix.items()):
+        rate, instances = rate if isinstance(rate, (tuple, list)) else (rate, 1)
+        streams.extend((msg_type, float(rate), instance) for instance in range(instances))
+    return streams
+
+
+def log_name(size_mb, mix, seed, mavlink2):
+    """File name identifying the settings, so a generated log can be reused"""
+    settings = json.dumps([float(size_mb), sorted((k, v) for k, v in mix.items()), seed, mavlink2])
+    return f"synthetic-{size_mb:g}mb-v{2 if mavlink2 else 1}-{hashlib.sha1(settings.encode()).hexdigest()[:10]}.tlog"
+
+
+class FieldSignal:
+    """Reproducible values of one field: a slow sine plus noise for floats, a bounded ramp for integers"""
+
+    def __init__(self, rng, ftype, length):
+        self.ftype = ftype
+        self.length = length
+        self.amplitude = rng.uniform(0.5, 100.0)
+        self.period = rng.uniform(5.0, 120.0)
+        self.phase = rng.uniform(0, 2 * math.pi)
+        self.noise = self.amplitude * rng.uniform(0.0, 0.05)
+        low, high = INT_RANGES.get(ftype, (0, 0))
+        self.low = max(low, 0) if low < 0 and rng.random() < 0.5 else low
+        self.span = min(high - self.low, 10000)
+        self.step = rng.randint(1, 7)
+
+    def value(self, rng, t, count):
+        if self.ftype == 'char':
+            return b'SYNTHETIC'[:self.length]
+        if self.ftype in ('float', 'double'):
+            values = [self.amplitude * math.sin(2 * math.pi * t / self.period + self.phase + i)
+                      + rng.gauss(0, self.noise) for i in range(self.length)]
+        elif self.ftype == 'uint8_t_mavlink_version':
+            return 3
+        else:
+            values = [self.low + (count * self.step + i) % (self.span + 1) for i in range(self.length)]
+        return values if self.length > 1 else values[0]
+
+
+class MessageStream:
+    """Messages of one (type, instance) at a fixed rate"""
+
+    def __init__(self, rng, mavlink, msg_type, rate, instance):
+        self.msg_class = getattr(mavlink, f"MAVLink_{msg_type.lower()}_message", None)
+        if self.msg_class is None:
+            raise ValueError(f"Unknown message type: {msg_type}")
+        if rate <= 0:
+            raise ValueError(f"Rate of {msg_type} must be above zero")
+        lengths = dict(zip(self.msg_class.ordered_fieldnames, self.msg_class.array_lengths))
+        self.fields = [(name, FieldSignal(rng, ftype, lengths[name] or 1))
+                       for name, ftype in zip(self.msg_class.fieldnames, self.msg_class.fieldtypes)]
+        self.period = 1.0 / rate
+        self.instance = instance
+        self.count = 0
+        # Streams start at staggered offsets, as they would on a vehicle
+        self.next_time = rng.uniform(0, self.period)
+
+    def message(self, rng, t):
+        args = []
+        for name, signal in self.fields:
+            if name == 'id':
+                args.append(self.instance)
+            elif name == 'time_boot_ms':
+                args.append(int(t * 1000) % 2 ** 32)
+            elif name in ('time_usec', 'time_unix_usec'):
+                # Some messages carry time_usec as a uint32, i.e. time since boot
+                usec = int(t * 1e6)
+                args.append(START_USEC + usec if signal.ftype.endswith('64_t') else usec % 2 ** 32)
+            else:
+                args.append(signal.value(rng, t, self.count))
+        self.count += 1
+        self.next_time += self.period
+        return self.msg_class(*args)
+
+
+def generate(path, size_mb=DEFAULT_SIZE_MB, mix=None, seed=DEFAULT_SEED, mavlink2=False):
+    """Write a tlog of about size_mb megabytes with the given message mix; returns the message count.
+
+    The same arguments always produce the same file.
+    """
+    mavlink = importlib.import_module(f"pymavlink.dialects.{'v20' if mavlink2 else 'v10'}.ardupilotmega")
+    mav = mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    rng = random.Random(seed)
+    streams = [MessageStream(rng, mavlink, msg_type, rate, instance)
+               for msg_type, rate, instance in mix_streams(mix or DEFAULT_MIX)]
+    queue = [(stream.next_time, i) for i, stream in enumerate(streams)]
+    heapq.heapify(queue)
+    limit = int(size_mb * 1024 * 1024)
+    written = count = 0
+    pack_timestamp = struct.Struct('>Q').pack
+
+    with open(path + '.tmp', 'wb') as f:
+        while written < limit:
+            t, i = heapq.heappop(queue)
+            stream = streams[i]
+            frame = pack_timestamp(START_USEC + int(t * 1e6)) + stream.message(rng, t).pack(mav)
+            f.write(frame)
+            written += len(frame)
+            count += 1
+            heapq.heappush(queue, (stream.next_time, i))
+    os.replace(path + '.tmp', path)
+    return count
+
+
+def ensure_log(data_dir, size_mb=DEFAULT_SIZE_MB, mix=None, seed=DEFAULT_SEED, mavlink2=False):
+    """Path of the synthetic log for these settings in data_dir, generated if it is not there yet"""
+    mix = mix or DEFAULT_MIX
+    path = os.path.join(data_dir, log_name(size_mb, mix, seed, mavlink2))
+    if not os.path.isfile(path):
+        os.makedirs(data_dir, exist_ok=True)
+        generate(path, size_mb, mix, seed, mavlink2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a reproducible synthetic tlog.")
+    parser.add_argument('output', help="tlog to write")
+    parser.add_argument('--size-mb', type=float, default=DEFAULT_SIZE_MB, help=f"approximate size (default: {DEFAULT_SIZE_MB})")
+    parser.add_argument('--mix', type=parse_mix, help="message types and rates, e.g. ATTITUDE=50,BATTERY_STATUS=2:3 "
+                                                       "(rate:instances); default: a typical autopilot stream")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--mavlink2', action='store_true', help="write MAVLink 2 frames (default: MAVLink 1)")
+    args = parser.parse_args(argv)
+    count = generate(args.output, args.size_mb, args.mix, args.seed, args.mavlink2)
+    print(f"Wrote {count} messages to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
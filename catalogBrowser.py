@@ -0,0 +1,148 @@
+import os
+import threading
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, filedialog, messagebox
+
+from logCatalog import DEFAULT_CATALOG, LogCatalog
+
+
+class CatalogBrowser:
+    """Window to index folders of logs into the catalog, search it and open a result.
+
+    on_open(path) is called with the log chosen from the results.
+    """
+
+    def __init__(self, master, on_open, catalog_path=DEFAULT_CATALOG):
+        self.on_open = on_open
+        self.catalog_path = catalog_path
+        self.window = tk.Toplevel(master)
+        self.window.title("Log Catalog")
+        self.window.geometry("750x400")
+        self._progress = None
+        self._build_thread = None
+        self._cancel_event = None
+        self.window.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        query_frame = ttk.Frame(self.window, padding=5)
+        query_frame.pack(fill=tk.X)
+        ttk.Label(query_frame, text="Query:").pack(side=tk.LEFT)
+        self.query_var = tk.StringVar()
+        entry = ttk.Entry(query_frame, textvariable=self.query_var)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        entry.bind('<Return>', lambda event: self.search())
+        ttk.Button(query_frame, text="Search", command=self.search).pack(side=tk.LEFT)
+        ttk.Button(query_frame, text="Index Folder", command=self.index_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Label(self.window, padding=(5, 0),
+                  text="Terms: TYPE, TYPE/instance, TYPE/instance/field, TYPE/*/field<value or >value",
+                  font=('Arial', 8, 'italic')).pack(fill=tk.X)
+
+        result_frame = ttk.Frame(self.window, padding=5)
+        result_frame.pack(fill=tk.BOTH, expand=True)
+        self.results = ttk.Treeview(result_frame, columns=('start', 'duration'), selectmode='browse')
+        self.results.heading('#0', text="Log")
+        self.results.heading('start', text="Start")
+        self.results.heading('duration', text="Duration (s)")
+        self.results.column('start', width=140, stretch=False)
+        self.results.column('duration', width=90, stretch=False)
+        self.results.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.results.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results.configure(yscrollcommand=scrollbar.set)
+        self.results.bind('<Double-1>', lambda event: self.open_selected())
+
+        bottom_frame = ttk.Frame(self.window, padding=5)
+        bottom_frame.pack(fill=tk.X)
+        ttk.Button(bottom_frame, text="Open", command=self.open_selected).pack(side=tk.LEFT)
+        # Shown only while a folder is being indexed
+        self.cancel_button = ttk.Button(bottom_frame, text="Cancel", command=self.cancel_build)
+        self.status_label = ttk.Label(bottom_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=10)
+
+        self.search()
+
+    def _on_close(self):
+        self.cancel_build()
+        self.window.destroy()
+
+    def cancel_build(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def search(self):
+        terms = self.query_var.get().split()
+        catalog = LogCatalog(self.catalog_path)
+        try:
+            rows = catalog.query(terms)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self.window)
+            return
+        finally:
+            catalog.close()
+
+        self.results.delete(*self.results.get_children())
+        for path, start, end in rows:
+            start_text = datetime.fromtimestamp(start).strftime('%Y-%m-%d %H:%M:%S') if start else ""
+            duration = f"{end - start:.1f}" if start and end else ""
+            self.results.insert('', tk.END, iid=path, text=path, values=(start_text, duration))
+        self.status_label.config(text=f"{len(rows)} logs")
+
+    def open_selected(self):
+        selection = self.results.selection()
+        if not selection:
+            return
+        path = selection[0]
+        if not os.path.isfile(path):
+            messagebox.showerror("Error", f"Log file not found:\n{path}", parent=self.window)
+            return
+        self.on_open(path)
+
+    def index_folder(self):
+        if self._build_thread is not None:
+            return
+        root = filedialog.askdirectory(title="Select a folder of logs", parent=self.window)
+        if not root:
+            return
+
+        # Indexing runs on a thread (its own connection) with the pool behind it; the UI polls
+        self._progress = (0, 0)
+        self._result = None
+        cancel_event = self._cancel_event = threading.Event()
+
+        def build():
+            catalog = LogCatalog(self.catalog_path)
+            try:
+                self._result = catalog.update(root, progress=lambda done, total: setattr(self, '_progress', (done, total)),
+                                              cancel_event=cancel_event)
+            except Exception as e:
+                self._result = e
+            finally:
+                catalog.close()
+
+        self._build_thread = threading.Thread(target=build, daemon=True)
+        self._build_thread.start()
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0), before=self.status_label)
+        self._poll_build()
+
+    def _poll_build(self):
+        if not self.window.winfo_exists():
+            return
+        if self._build_thread.is_alive():
+            done, total = self._progress
+            self.status_label.config(text=f"Indexing... {done}/{total} logs" if total else "Scanning folder...")
+            self.window.after(200, self._poll_build)
+            return
+
+        self._build_thread = None
+        cancelled = self._cancel_event.is_set()
+        self._cancel_event = None
+        self.cancel_button.pack_forget()
+        if isinstance(self._result, Exception):
+            messagebox.showerror("Error", f"Indexing failed:\n{self._result}", parent=self.window)
+            self.status_label.config(text="")
+            return
+        indexed, removed, failed = self._result
+        self.search()
+        self.status_label.config(
+            text=f"{'Cancelled after indexing' if cancelled else 'Indexed'} {indexed} logs ({failed} failed), removed {removed}; "
+                 + self.status_label.cget('text'))
@@ -0,0 +1,284 @@
+import collections
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections.abc import Mapping
+
+import numpy as np
+
+from telemetryStore import Column, InstanceColumns, TelemetryStore
+
+# Decoded columns held in memory per process before the least recently used are spilled to disk; 0 keeps everything in memory
+MEMORY_BUDGET = int(os.environ.get('MAVLINK_MEMORY_BUDGET_MB', '0')) * 1024 * 1024
+# Where the scratch files of spilled columns go (default: the system temp directory)
+SPILL_DIR = os.environ.get('MAVLINK_SPILL_DIR') or None
+
+_shared_budget = None
+
+
+def shared_budget():
+    """The process-wide MemoryBudget set by MAVLINK_MEMORY_BUDGET_MB, or None if there is no budget"""
+    global _shared_budget
+    if _shared_budget is None and MEMORY_BUDGET > 0:
+        _shared_budget = MemoryBudget(MEMORY_BUDGET)
+    return _shared_budget
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Still mapped (Windows); the scratch directory is removed at exit
+
+
+class MemoryBudget:
+    """LRU of the spill columns held in memory.
+
+    Once they take more than max_bytes, the least recently used are written
+    to files in a scratch directory and from then on read back through
+    memory maps, which the OS pages in on demand and can drop again at will.
+    Columns dropped by their store are forgotten, and their files removed.
+    """
+
+    def __init__(self, max_bytes, spill_dir=SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.resident_bytes = 0
+        # Guards the LRU and every spill column: a spill may be triggered by any writer thread
+        self.lock = threading.RLock()
+        self._columns = collections.OrderedDict()  # id -> [weakref, bytes], least recently used first
+        self._scratch_dir = None
+        self._files = 0
+
+    def track(self, column):
+        key = id(column)
+        with self.lock:
+            self._columns[key] = [weakref.ref(column, lambda _, key=key: self._forget(key)), 0]
+        self.resized(column)
+
+    def resized(self, column):
+        """Record the current size of a resident column, mark it used and spill others if over budget"""
+        with self.lock:
+            entry = self._columns.get(id(column))
+            if entry is None:
+                return
+            nbytes = column._buffer.nbytes
+            self.resident_bytes += nbytes - entry[1]
+            entry[1] = nbytes
+            self._columns.move_to_end(id(column))
+            while self.resident_bytes > self.max_bytes and self._columns:
+                key, (ref, nbytes) = next(iter(self._columns.items()))
+                victim = ref()
+                if victim is None:
+                    self._forget(key)
+                else:
+                    victim._spill()
+
+    def touch(self, column):
+        with self.lock:
+            if id(column) in self._columns:
+                self._columns.move_to_end(id(column))
+
+    def _forget(self, key):
+        with self.lock:
+            entry = self._columns.pop(key, None)
+            if entry is not None:
+                self.resident_bytes -= entry[1]
+
+    def scratch_path(self):
+        with self.lock:
+            if self._scratch_dir is None:
+                self._scratch_dir = tempfile.mkdtemp(prefix='mavlink-spill-', dir=self.spill_dir)
+                weakref.finalize(self, shutil.rmtree, self._scratch_dir, True)
+            self._files += 1
+            return os.path.join(self._scratch_dir, f"{self._files}.bin")
+
+
+class SpillColumn(Column):
+    """Column counted against a MemoryBudget; once spilled, appends go to its scratch file"""
+
+    def __init__(self, dtype, budget, capacity=256):
+        super().__init__(dtype, capacity)
+        self.budget = budget
+        self._path = None
+        budget.track(self)
+
+    @property
+    def spilled(self):
+        return self._path is not None
+
+    def append(self, value):
+        self.extend((value,))
+
+    def extend(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        with self.budget.lock:
+            # A column that could no longer double inside the budget goes straight to disk
+            if self._path is None and 2 * (self._size + len(values)) * self.dtype.itemsize > self.budget.max_bytes:
+                self._spill()
+            if self._path is None:
+                super().extend(values)
+                self.budget.resized(self)
+                return
+            with open(self._path, 'ab') as f:
+                f.write(values.data)
+            self._size += len(values)
+
+    def _spill(self):
+        path = self.budget.scratch_path()
+        with open(path, 'wb') as f:
+            f.write(self._buffer[:self._size].data)
+        self._path = path
+        self._buffer = np.empty(0, dtype=self._buffer.dtype)
+        weakref.finalize(self, _remove_file, path)
+        self.budget._forget(id(self))
+
+    def trim(self):
+        with self.budget.lock:
+            if self._path is None:
+                super().trim()
+                self.budget.resized(self)
+
+    def view(self):
+        with self.budget.lock:
+            if self._path is None:
+                self.budget.touch(self)
+                return self._buffer[:self._size]
+            size = self._size
+        if not size:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self._path, dtype=self.dtype, mode='r', shape=(size,))
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.view()
+        return view if dtype is None else view.astype(dtype, copy=False)
+
+
+class SpillInstance(InstanceColumns):
+    """InstanceColumns made of spill columns"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.times = SpillColumn(np.float64, budget)
+        self.fields = {}
+
+    def column(self, field, dtype):
+        column = self.fields.get(field)
+        if column is None:
+            column = self.fields[field] = SpillColumn(dtype, self.budget)
+        return column
+
+    def as_dict(self, start_time=0.0):
+        return InstanceData(self, start_time)
+
+
+class SpillStore(TelemetryStore):
+    """TelemetryStore whose columns share a MemoryBudget"""
+
+    def __init__(self, budget):
+        super().__init__()
+        self.budget = budget
+
+    def _new_instance(self):
+        return SpillInstance(self.budget)
+
+
+class InstanceData(Mapping):
+    """as_dict of a spill instance whose 'times' and 'data' columns are read when looked up.
+
+    The GUIs keep these snapshots for every decoded type; reading lazily
+    means a kept snapshot holds no column in memory.
+    """
+
+    def __init__(self, instance, start_time):
+        self._instance = instance
+        self._start_time = start_time
+        self._count = len(instance.times)
+        # One OffsetTimes per snapshot, so the fields that share it also share its array
+        self._times = OffsetTimes(instance.times, start_time, 0, self._count)
+
+    def __getitem__(self, key):
+        if key == 'times':
+            return self._times
+        if key == 'data':
+            return FieldData(self._instance.fields, self._count)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('times', 'data'))
+
+    def __len__(self):
+        return 2
+
+
+class OffsetTimes:
+    """Times of a spill column minus a start time, subtracted only for the part read.
+
+    Subtracting up front would copy the whole column on every lookup. Slices
+    stay lazy and the exporters convert them a block at a time; np.asarray()
+    (plotting, alignment) makes one copy, shared by its users while any of
+    them keeps it.
+    """
+
+    ndim = 1
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, column, offset, start, stop):
+        self._column = column
+        self.offset = offset
+        self._start = start
+        self._stop = stop
+        self._array = None
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def shape(self):
+        return (len(self),)
+
+    def _read(self):
+        return self._column.view()[self._start:self._stop] - self.offset
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return OffsetTimes(self._column, self.offset, self._start + start, self._start + max(start, stop))
+        elif isinstance(key, (int, np.integer)):
+            index = range(self._start, self._stop)[key]
+            return float(self._column.view()[index] - self.offset)
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self._array() if self._array is not None else None
+        if array is None:
+            array = self._read()
+            # Shared by every caller, so none may change it for the others
+            array.flags.writeable = False
+            self._array = weakref.ref(array)
+        elif copy:
+            array = array.copy()
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def tolist(self):
+        return self._read().tolist()
+
+
+class FieldData(Mapping):
+    """{field: values} of an InstanceData, clipped to its sample count"""
+
+    def __init__(self, columns, count):
+        self._columns = dict(columns)
+        self._count = count
+
+    def __getitem__(self, field):
+        return self._columns[field].view()[:self._count]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from columnSpill import MEMORY_BUDGET, MemoryBudget
+from exportFormats import EXPORT_FORMATS, format_by_key, format_for_path
+from logCache import LogCache
+from logIndex import LogIndex
+from selectionExport import clip_section, parse_selection, selection_section
+from spanTrace import span, tracer
+from timeAlign import ALIGN_MODES, ALIGN_RESAMPLE
+
+# Headless export (main.py export): imports no Tk or matplotlib, reports progress and the
+# result on stdout as JSON lines and tells schedulers how it went through the exit code
+EXIT_OK = 0
+EXIT_FAILURE = 1      # unexpected error
+EXIT_USAGE = 2        # bad arguments (argparse uses 2 as well)
+EXIT_BAD_INPUT = 3    # log or selection file missing or unreadable
+EXIT_NO_DATA = 4      # nothing selected is in the log, or nothing in the time window
+EXIT_INTERRUPTED = 130
+
+ALIGN_ROW = 'row'
+
+
+def emit(event, **fields):
+    """Write one JSON line to stdout"""
+    print(json.dumps(dict(event=event, **fields)), flush=True)
+
+
+class ProgressReporter:
+    """Emits progress events for one stage, at most once per percent"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._percent = -1
+
+    def __call__(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            emit('progress', stage=self.stage, done=done, total=total, percent=percent)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py export', description="Export fields of a MAVLink log without the GUI.")
+    parser.add_argument('log', help="log file (.tlog or any format pymavlink reads)")
+    parser.add_argument('--select', required=True,
+                        help="JSON list of 'TYPE/instance/field' paths, as saved by Export Favorite")
+    parser.add_argument('--output', '-o', required=True, help="file to write")
+    parser.add_argument('--format', '-f', choices=[export_format.key for export_format in EXPORT_FORMATS],
+                        help="output format (default: from the output file's extension, else xml)")
+    parser.add_argument('--align', choices=(ALIGN_ROW,) + ALIGN_MODES, default=ALIGN_ROW,
+                        help="how fields of different messages are lined up (default: row, the exporter's layout)")
+    parser.add_argument('--rate', type=float, help="samples per second for --align resample")
+    parser.add_argument('--start', type=float, help="first time to export, in seconds from the start of the log")
+    parser.add_argument('--end', type=float, help="last time to export, in seconds from the start of the log")
+    parser.add_argument('--workers', type=int, help="processes used to scan and decode large logs")
+    parser.add_argument('--memory-budget', type=int, default=MEMORY_BUDGET // (1024 * 1024), metavar='MB',
+                        help="decoded data kept in memory before spilling to disk (default: $MAVLINK_MEMORY_BUDGET_MB, 0 = no limit)")
+    parser.add_argument('--no-cache', action='store_true', help="neither read nor write the log cache")
+    parser.add_argument('--trace', metavar='FILE', help="time the load, decode and export stages into a Chrome trace (JSON)")
+    return parser
+
+
+def load_selection(path):
+    with open(path, 'r') as f:
+        favorite = json.load(f)
+    if not isinstance(favorite, list):
+        raise ValueError("expected a JSON list of 'TYPE/instance/field' paths")
+    return favorite
+
+
+def run(args, cancel_event):
+    mode = None if args.align == ALIGN_ROW else args.align
+    if mode == ALIGN_RESAMPLE and not (args.rate and args.rate > 0):
+        emit('error', message="--align resample needs --rate above zero")
+        return EXIT_USAGE
+    if args.format:
+        export_format = format_by_key(args.format)
+    else:
+        export_format = format_for_path(args.output)
+
+    if not os.path.isfile(args.log):
+        emit('error', message=f"Log file not found: {args.log}")
+        return EXIT_BAD_INPUT
+    try:
+        favorite = load_selection(args.select)
+    except (OSError, ValueError) as e:
+        emit('error', message=f"Failed to load selection: {e}")
+        return EXIT_BAD_INPUT
+    selection = parse_selection(favorite)
+    if len(selection) != len(favorite):
+        emit('warning', message=f"Skipped {len(favorite) - len(selection)} malformed selection entries")
+
+    started = time.perf_counter()
+    index = LogIndex(args.log, MemoryBudget(args.memory_budget * 1024 * 1024) if args.memory_budget > 0 else None)
+    try:
+        index.load(None if args.no_cache else LogCache(), ProgressReporter('scan'), cancel_event, args.workers)
+    except Exception as e:
+        emit('error', message=f"Failed to read log: {e}")
+        return EXIT_BAD_INPUT
+
+    known_types = set(index.message_types())
+    msg_types = sorted({msg_type for msg_type, _, _ in selection if msg_type in known_types})
+    missing = ['/'.join(path) for path in selection if path[0] not in known_types]
+    if missing:
+        emit('warning', message="Message types not in the log", paths=missing)
+    index.decode_types(msg_types, ProgressReporter('decode'), cancel_event, args.workers)
+    message_data = {msg_type: index.type_data(msg_type, index.start_time) for msg_type in msg_types}
+
+    try:
+        with span('select'):
+            times, columns, exact_times = selection_section(message_data, selection, mode, args.rate)
+    except ValueError as e:
+        emit('error', message=str(e))
+        return EXIT_NO_DATA
+    times, columns = clip_section(times, columns, args.start, args.end)
+    if not len(times):
+        emit('error', message="No samples in the requested time window")
+        return EXIT_NO_DATA
+
+    emit('progress', stage='write', done=0, total=len(times), percent=0)
+    with span('export', len(times), export_format.key):
+        export_format.write(args.output, [(None, times, columns)], exact_times=exact_times)
+    emit('done', output=os.path.abspath(args.output), format=export_format.key, records=len(times),
+         fields=[name for name, _ in columns], seconds=round(time.perf_counter() - started, 3))
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cancel_event = threading.Event()
+    if args.trace:
+        tracer.enabled = True
+    try:
+        return run(args, cancel_event)
+    except KeyboardInterrupt:
+        cancel_event.set()
+        emit('error', message="Interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit('error', message=f"{type(e).__name__}: {e}")
+        return EXIT_FAILURE
+    finally:
+        if args.trace:
+            save_trace(args.trace)
+
+
+def save_trace(path):
+    try:
+        tracer.save(path)
+    except OSError as e:
+        emit('warning', message=f"Failed to write trace: {e}")
+        return
+    emit('trace', output=os.path.abspath(path), spans=len(tracer),
+         stages=[str(summary) for summary in tracer.latest()])
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
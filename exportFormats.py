@@ -0,0 +1,235 @@
+import os
+import zipfile
+
+import numpy as np
+
+from xmlWriter import RECORDS_PER_BLOCK, WRITE_BUFFER, XmlStreamWriter
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Values converted at a time when writing an .npy entry
+NPY_BLOCK = 65536
+
+
+class ExportFormat:
+    """A file format the Export buttons can write.
+
+    write() gets the data as sections, one per instance:
+    [(instance id, times, [(field, values)])]. With msg_type set the
+    sections are the instances of that message type; without it there is a
+    single section (instance id None) holding the selected fields.
+    exact_times keeps fractional seconds in formats that otherwise write
+    whole-second times (XML).
+    """
+
+    name = ''
+    extension = ''
+    # Short name used on the command line
+    key = ''
+
+    def filetype(self):
+        return (f"{self.name} Files", f"*{self.extension}")
+
+    def write(self, file_path, sections, msg_type=None, exact_times=False):
+        raise NotImplementedError
+
+
+class XmlFormat(ExportFormat):
+    name = 'XML'
+    extension = '.xml'
+    key = 'xml'
+
+    def write(self, file_path, sections, msg_type=None, exact_times=False):
+        with XmlStreamWriter(file_path) as writer:
+            if msg_type is not None:
+                writer.start("Message", type=msg_type)
+            for instance_id, times, columns in sections:
+                if instance_id is not None:
+                    writer.start("Instance", ID=str(instance_id))
+                writer.write_records(times, columns, exact_times)
+                if instance_id is not None:
+                    writer.end()
+
+
+def _field_union(sections):
+    """Field names of all sections, in first-seen order"""
+    fields = {}
+    for _, _, columns in sections:
+        for field, _ in columns:
+            fields.setdefault(field, None)
+    return list(fields)
+
+
+class CsvFormat(ExportFormat):
+    """One row per sample: Instance (whole message type only), Time in seconds, then the fields.
+
+    Fields an instance does not have are left empty. Rows are formatted a
+    block at a time from the columns.
+    """
+
+    name = 'CSV'
+    extension = '.csv'
+    key = 'csv'
+
+    def write(self, file_path, sections, msg_type=None, exact_times=False):
+        fields = _field_union(sections)
+        with_instance = msg_type is not None
+        with open(file_path, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER) as file:
+            file.write(','.join((['Instance'] if with_instance else []) + ['Time'] + fields) + '\n')
+            for instance_id, times, columns in sections:
+                values = dict(columns)
+                present = [values[field] for field in fields if field in values]
+                cells = ['%s' if field in values else '' for field in fields]
+                prefix = f"{instance_id}," if with_instance else ''
+                template = prefix + ','.join(['%s'] + cells) + '\n'
+                count = len(times)
+                for start in range(0, count, RECORDS_PER_BLOCK):
+                    end = min(start + RECORDS_PER_BLOCK, count)
+                    block = [np.asarray(times[start:end], dtype=np.float64).tolist()] + [np.asarray(column)[start:end].tolist()
+                                                          for column in present]
+                    file.write(''.join([template % row for row in zip(*block)]))
+
+
+class NpzFormat(ExportFormat):
+    """NumPy archive of the columns as they are stored.
+
+    Arrays are named 'Time' and the field names; for a whole message type
+    they are prefixed with 'TYPE/instance/'. Load with numpy.load().
+    Written as numpy.savez would, but a block at a time, so columns kept on
+    disk are not read into memory whole.
+    """
+
+    name = 'NumPy'
+    extension = '.npz'
+    key = 'npz'
+
+    def __init__(self, compressed=False):
+        self.compressed = compressed
+        if compressed:
+            self.name = 'Compressed NumPy'
+            self.key = 'npz-compressed'
+
+    def write(self, file_path, sections, msg_type=None, exact_times=False):
+        arrays = {}
+        for instance_id, times, columns in sections:
+            prefix = f"{msg_type}/{instance_id}/" if msg_type is not None else ''
+            arrays[prefix + 'Time'] = (times, np.dtype(np.float64))
+            for field, values in columns:
+                values = np.asarray(values)
+                arrays[prefix + field] = (values, values.dtype)
+        if not str(file_path).endswith('.npz'):
+            file_path = f"{file_path}.npz"
+        compression = zipfile.ZIP_DEFLATED if self.compressed else zipfile.ZIP_STORED
+        with zipfile.ZipFile(file_path, 'w', compression=compression, allowZip64=True) as archive:
+            for name, (column, dtype) in arrays.items():
+                _write_npy(archive, name, column, dtype)
+
+
+def _write_npy(archive, name, column, dtype):
+    """Add column to the zip archive as name.npy, converting NPY_BLOCK values at a time"""
+    with archive.open(name + '.npy', 'w', force_zip64=True) as file:
+        if dtype.hasobject:
+            np.lib.format.write_array(file, np.asarray(column), allow_pickle=True)
+            return
+        count = len(column)
+        np.lib.format.write_array_header_1_0(file, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                    'fortran_order': False, 'shape': (count,)})
+        for start in range(0, count, NPY_BLOCK):
+            file.write(np.ascontiguousarray(column[start:start + NPY_BLOCK], dtype=dtype).tobytes())
+
+
+class ArrowFormat(ExportFormat):
+    """One table of Instance (whole message type only), Time in seconds and the fields.
+
+    The instances become record batches of the table; fields an instance
+    does not have are null. Needs pyarrow.
+    """
+
+    def __init__(self, parquet=False):
+        self.parquet = parquet
+        self.name = 'Parquet' if parquet else 'Arrow IPC'
+        self.extension = '.parquet' if parquet else '.arrow'
+        self.key = 'parquet' if parquet else 'arrow'
+
+    def _table(self, sections, msg_type):
+        fields = _field_union(sections)
+        types = {}
+        for _, _, columns in sections:
+            for field, values in columns:
+                types.setdefault(field, pyarrow.from_numpy_dtype(np.asarray(values).dtype))
+
+        chunks = {name: [] for name in ['Instance', 'Time'] + fields}
+        for instance_id, times, columns in sections:
+            count = len(times)
+            values = dict(columns)
+            chunks['Instance'].append(pyarrow.array(np.full(count, int(instance_id), dtype=np.int64))
+                                      if instance_id is not None else None)
+            chunks['Time'].append(pyarrow.array(np.asarray(times, dtype=np.float64)))
+            for field in fields:
+                if field in values:
+                    chunks[field].append(pyarrow.array(np.asarray(values[field]), type=types[field]))
+                else:
+                    chunks[field].append(pyarrow.nulls(count, type=types[field]))
+
+        if msg_type is None:
+            del chunks['Instance']
+        names = list(chunks)
+        return pyarrow.Table.from_arrays(
+            [pyarrow.chunked_array(chunks[name]) if chunks[name] else
+             pyarrow.chunked_array([], type=types.get(name, pyarrow.float64())) for name in names],
+            names=names)
+
+    def write(self, file_path, sections, msg_type=None, exact_times=False):
+        table = self._table(sections, msg_type)
+        if self.parquet:
+            pyarrow.parquet.write_table(table, file_path)
+        else:
+            with pyarrow.ipc.new_file(file_path, table.schema) as writer:
+                writer.write_table(table)
+
+
+EXPORT_FORMATS = [XmlFormat(), CsvFormat(), NpzFormat(), NpzFormat(compressed=True)]
+if pyarrow is not None:
+    EXPORT_FORMATS += [ArrowFormat(), ArrowFormat(parquet=True)]
+
+
+def format_for_path(file_path, name=None):
+    """The export format called name if it matches the file's extension, else the first that does.
+
+    Falls back to XML when no format uses the extension.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    matching = [export_format for export_format in EXPORT_FORMATS if export_format.extension == extension]
+    for export_format in matching:
+        if f"{export_format.name} Files" == name:
+            return export_format
+    return matching[0] if matching else EXPORT_FORMATS[0]
+
+
+def format_by_key(key):
+    """The available export format with the given command-line key, or None"""
+    return next((export_format for export_format in EXPORT_FORMATS if export_format.key == key), None)
+
+
+def ask_export_path(parent=None, title="Save Export File"):
+    """Ask where to export; returns (file path, ExportFormat) or (None, None) if cancelled"""
+    import tkinter as tk
+    from tkinter import filedialog
+
+    chosen = tk.StringVar(parent)
+    file_path = filedialog.asksaveasfilename(
+        parent=parent,
+        defaultextension=".xml",
+        filetypes=[export_format.filetype() for export_format in EXPORT_FORMATS] + [("All Files", "*.*")],
+        typevariable=chosen,
+        title=title
+    )
+    if not file_path:
+        return None, None
+    return file_path, format_for_path(file_path, chosen.get())
@@ -0,0 +1,100 @@
+import operator
+
+from spanTrace import span
+from telemetryStore import field_dtypes
+
+# Fields that are never plotted or exported
+SKIPPED_FIELDS = ('time_boot_ms', 'time_usec', 'id')
+
+_extractors = {}
+
+
+class FieldExtractor:
+    """Flattens messages of one type into column values with a plan resolved once.
+
+    The plan (which fields are numeric, how arrays expand, the column names
+    and dtypes) comes from the first message seen; message definitions fix
+    it for every later message of the type.
+    """
+
+    def __init__(self, msg):
+        dtypes = field_dtypes(msg)
+        self.fields = []
+        self.lengths = []
+        self.columns = []
+        self.dtypes = []
+        for field in msg._fieldnames:
+            if field in SKIPPED_FIELDS:
+                continue
+            value = getattr(msg, field)
+            if isinstance(value, (list, tuple)):
+                if not value or not all(isinstance(val, (int, float)) for val in value):
+                    continue
+                names = [f"{field}[{idx}]" for idx in range(len(value))]
+                self.lengths.append(len(value))
+            elif isinstance(value, (int, float)):
+                names = [field]
+                self.lengths.append(0)
+            else:
+                continue
+            self.fields.append(field)
+            self.columns.extend(names)
+            self.dtypes.extend([dtypes.get(field, float)] * len(names))
+
+        self._get = operator.attrgetter(*self.fields) if self.fields else None
+        self._has_arrays = any(self.lengths)
+
+    def row(self, msg):
+        """Flat tuple of column values of one message"""
+        if self._get is None:
+            return ()
+        values = self._get(msg)
+        if len(self.fields) == 1:
+            values = (values,)
+        if not self._has_arrays:
+            return values
+        row = []
+        for value, length in zip(values, self.lengths):
+            if length:
+                row.extend(value)
+            else:
+                row.append(value)
+        return row
+
+
+def extractor_for(msg):
+    """Cached FieldExtractor for the type of msg"""
+    key = (type(msg), msg.get_type(), tuple(msg._fieldnames))
+    extractor = _extractors.get(key)
+    if extractor is None:
+        extractor = _extractors[key] = FieldExtractor(msg)
+    return extractor
+
+
+class PendingRows:
+    """Extracted rows per instance, written to the columns in blocks by flush"""
+
+    def __init__(self):
+        self._pending = {}
+
+    def add(self, instance, msg):
+        pending = self._pending.get(instance)
+        if pending is None:
+            pending = self._pending[instance] = (extractor_for(msg), [], [])
+        pending[1].append(pending[0].row(msg))
+        pending[2].append(msg._timestamp)
+
+    def flush(self):
+        with span('flatten') as flatten_span:
+            for instance, (extractor, rows, times) in self._pending.items():
+                if not times:
+                    continue
+                flatten_span.add(len(times))
+                if extractor.columns:
+                    for name, dtype, values in zip(extractor.columns, extractor.dtypes, zip(*rows)):
+                        instance.column(name, dtype).extend(values)
+                # Timestamps go last so a reader on another thread never sees a
+                # sample count ahead of the field columns
+                instance.times.extend(times)
+                rows.clear()
+                times.clear()
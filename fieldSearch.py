@@ -0,0 +1,103 @@
+import re
+
+import numpy as np
+
+# Length of the substrings the index is keyed on; single characters scan every path
+NGRAM = 2
+# Only * and ? are wildcards: brackets are literal, as in array fields named 'field[idx]'
+WILDCARDS = re.compile(r'([*?])')
+# Matches listed in the GUIs; acting on all matches is not limited
+SEARCH_SHOWN = 500
+
+
+def log_field_paths(log_index):
+    """(msg_type, instance, field) of every field of a scanned log, in tree order"""
+    return [(msg_type, instance_id, field)
+            for msg_type in log_index.message_types()
+            for instance_id in log_index.instance_ids(msg_type)
+            for field in log_index.field_names(msg_type, instance_id)]
+
+
+def wildcard_pattern(query):
+    return re.compile(''.join('.*' if part == '*' else '.' if part == '?' else re.escape(part)
+                              for part in WILDCARDS.split(query)) + r'\Z')
+
+
+def ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class FieldIndex:
+    """Case-insensitive substring and wildcard search over the 'TYPE/instance/field' paths of a log.
+
+    Built once per log: each character pair of a path maps to the sorted ids
+    of the paths containing it, so a query only checks the paths holding all
+    of its pairs.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._texts = ['/'.join(path).lower() for path in self.paths]
+        self._fields = [field.lower() for _, _, field in self.paths]
+        postings = {}
+        for i, text in enumerate(self._texts):
+            for gram in ngrams(text):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _candidates(self, literals):
+        """Ids of the paths holding every n-gram of the literals, in order, or None if they have none"""
+        grams = set()
+        for literal in literals:
+            grams |= ngrams(literal)
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is None:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        ids = postings[0]
+        for other in postings[1:]:
+            if not len(ids):
+                break
+            ids = np.intersect1d(ids, other, assume_unique=True)
+        return ids.tolist()
+
+    def search(self, query):
+        """Paths matching query, in index order.
+
+        Plain text matches anywhere in 'TYPE/instance/field'. With * or ? the
+        query is a wildcard pattern for the field name ('servo*_raw'), or for
+        the whole path when it contains a '/' ('RC_CHANNELS/*/chan1*').
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(self.paths)
+        texts = self._texts
+
+        if not WILDCARDS.search(query):
+            ids = self._candidates([query])
+            if ids is None:
+                ids = range(len(texts))
+            return [self.paths[i] for i in ids if query in texts[i]]
+
+        pattern = wildcard_pattern(query)
+        ids = self._candidates(WILDCARDS.split(query))
+        if ids is None:
+            ids = range(len(texts))
+        if '/' in query:
+            return [self.paths[i] for i in ids if pattern.match(texts[i])]
+        # Instances share field names: test each name once
+        fields = self._fields
+        matched = {}
+        for i in ids:
+            field = fields[i]
+            if field not in matched:
+                matched[field] = pattern.match(field) is not None
+        return [self.paths[i] for i in ids if matched[fields[i]]]
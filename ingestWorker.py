@@ -0,0 +1,96 @@
+import queue
+import threading
+
+from logIndex import IngestCancelled
+
+
+class IngestWorker:
+    """Runs a LogIndex task (load or decode_types) on a background thread and reports back on the Tk thread.
+
+    task(progress, cancel_event) does the work. The index is usable while the
+    task runs, so callers can show the message types found so far. All
+    callbacks run on the Tk thread.
+    """
+
+    def __init__(self, master, index, task, on_progress=None, on_types=None,
+                 on_done=None, on_error=None, on_cancelled=None, poll_ms=100):
+        self.master = master
+        self.index = index
+        self.task = task
+        self.on_progress = on_progress
+        self.on_types = on_types
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.poll_ms = poll_ms
+
+        self._events = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._types_reported = 0
+        self._detached = False
+
+    def start(self):
+        self._thread.start()
+        self.master.after(self.poll_ms, self._poll)
+
+    def cancel(self, notify=True):
+        """Stop loading; with notify=False no further callbacks are made (e.g. another log replaces this one)"""
+        self._cancel_event.set()
+        if not notify:
+            self._detached = True
+
+    def _report(self, done, total):
+        # Runs on the worker thread, which is the only writer of type_start_times
+        types = list(self.index.type_start_times)
+        if len(types) > self._types_reported:
+            self._events.put(('types', types[self._types_reported:]))
+            self._types_reported = len(types)
+        self._events.put(('progress', done, total))
+
+    def _run(self):
+        try:
+            self.task(self._report, self._cancel_event)
+        except IngestCancelled:
+            self._events.put(('cancelled',))
+            return
+        except Exception as e:
+            self._events.put(('error', e))
+            return
+        # A cache hit reports no progress, so report its types here
+        self._report(1, 1)
+        self._events.put(('done',))
+
+    def _poll(self):
+        if self._detached:
+            return
+
+        progress = None
+        finished = None
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'types':
+                if self.on_types and not self._cancel_event.is_set():
+                    self.on_types(event[1])
+            elif event[0] == 'progress':
+                # Only the latest progress value matters
+                progress = event[1:]
+            else:
+                finished = event
+
+        if progress is not None and self.on_progress and not self._cancel_event.is_set():
+            self.on_progress(*progress)
+
+        if finished is None:
+            self.master.after(self.poll_ms, self._poll)
+        elif finished[0] == 'done':
+            if self.on_done:
+                self.on_done()
+        elif finished[0] == 'cancelled':
+            if self.on_cancelled:
+                self.on_cancelled()
+        elif self.on_error:
+            self.on_error(finished[1])
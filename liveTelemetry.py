@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+
+import numpy as np
+from pymavlink import mavutil
+
+from fieldExtractor import PendingRows
+from telemetryStore import InstanceColumns, TelemetryStore
+from tlogFrames import HEADER_LEN_V2, TIMESTAMP_LEN, frame_length
+
+# Samples kept per field; older ones are overwritten, so memory stays flat however long the session
+LIVE_SAMPLES = 4096
+# Decoded messages are handed to the GUI this often (seconds)
+FLUSH_INTERVAL = 0.05
+# Live plots are redrawn at most this many times per second
+LIVE_FPS = 10
+# Time left free on the right when the x axis is stretched: a share of the shown span, at least a few seconds
+LIVE_HEADROOM = 0.25
+LIVE_MIN_HEADROOM = 10.0
+DEFAULT_ENDPOINT = 'udpin:0.0.0.0:14550'
+NETWORK_PREFIXES = ('udpin:', 'udpout:', 'udpbcast:', 'udp:', 'tcpin:', 'tcp:')
+
+
+def is_network_endpoint(endpoint):
+    return endpoint.lower().startswith(NETWORK_PREFIXES)
+
+
+class RingColumn:
+    """Fixed-size column keeping the latest `capacity` values; a drop-in for Column in a live store"""
+
+    def __init__(self, dtype, capacity=LIVE_SAMPLES):
+        self._buffer = np.empty(capacity, dtype=dtype)
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, len(self._buffer))
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._buffer.dtype)
+        capacity = len(self._buffer)
+        count = len(values)
+        kept = values[-capacity:]
+        start = (self._written + count - len(kept)) % capacity
+        first = min(len(kept), capacity - start)
+        self._buffer[start:start + first] = kept[:first]
+        self._buffer[:len(kept) - first] = kept[first:]
+        self._written += count
+
+    def view(self):
+        """The kept values, oldest first (a copy, as the buffer keeps being overwritten)"""
+        capacity = len(self._buffer)
+        if self._written <= capacity:
+            return self._buffer[:self._written].copy()
+        start = self._written % capacity
+        return np.concatenate((self._buffer[start:], self._buffer[:start]))
+
+
+class LiveInstance(InstanceColumns):
+    """InstanceColumns backed by ring columns"""
+
+    def __init__(self, capacity=LIVE_SAMPLES):
+        self.capacity = capacity
+        self.times = RingColumn(np.float64, capacity)
+        self.fields = {}
+
+    def column(self, field, dtype):
+        column = self.fields.get(field)
+        if column is None:
+            column = self.fields[field] = RingColumn(dtype, self.capacity)
+        return column
+
+
+class LiveStore(TelemetryStore):
+    """TelemetryStore whose instances keep only their latest samples"""
+
+    def __init__(self, capacity=LIVE_SAMPLES):
+        super().__init__()
+        self.capacity = capacity
+
+    def _new_instance(self):
+        return LiveInstance(self.capacity)
+
+
+class LiveSource:
+    """Decodes a live MAVLink stream on a background thread into ring-buffered columns.
+
+    endpoint is what mavutil.mavlink_connection opens: a network endpoint
+    such as 'udpin:0.0.0.0:14550', or the path of a tlog still being written,
+    which is read from the start and then followed. Offers the LogIndex calls
+    the plotter uses (message_types, instance_ids, field_names, is_decoded,
+    type_data), so its selectors work unchanged; data is copied out under
+    the lock.
+    """
+
+    def __init__(self, endpoint, capacity=LIVE_SAMPLES):
+        self.endpoint = endpoint
+        self.store = LiveStore(capacity)
+        self.start_time = None
+        self.type_start_times = {}
+        self.messages = 0
+        self.error = None
+        self.lock = threading.Lock()
+        # Bumped when instances first seen are flushed, so the plotter knows to re-index its search
+        self.instance_version = 0
+        self._instances_added = False
+        self._stop_event = threading.Event()
+        self._connection = None
+        self._thread = None
+
+    def start(self):
+        """Open the endpoint (errors are raised here) and start decoding"""
+        if not is_network_endpoint(self.endpoint) and not os.path.isfile(self.endpoint):
+            raise FileNotFoundError(f"No such log file or endpoint: {self.endpoint}")
+        self._connection = mavutil.mavlink_connection(self.endpoint)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        connection = self._connection
+        follow_file = not is_network_endpoint(self.endpoint)
+        pending = PendingRows()
+        flushed = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                if not follow_file:
+                    msg = connection.recv_match(blocking=True, timeout=FLUSH_INTERVAL)
+                elif frame_ready(connection.f):
+                    msg = connection.recv_match(blocking=False)
+                else:
+                    msg = None
+                    time.sleep(FLUSH_INTERVAL)
+                if msg is not None and msg.get_type() != 'BAD_DATA':
+                    self._add(pending, msg)
+                now = time.monotonic()
+                if now - flushed >= FLUSH_INTERVAL:
+                    self._flush(pending)
+                    flushed = now
+        except Exception as e:
+            self.error = e
+        finally:
+            self._flush(pending)
+            connection.close()
+
+    def _flush(self, pending):
+        with self.lock:
+            pending.flush()
+            if self._instances_added:
+                self._instances_added = False
+                self.instance_version += 1
+
+    def _add(self, pending, msg):
+        msg_type = msg.get_type()
+        if self.start_time is None:
+            self.start_time = msg._timestamp
+        if msg_type not in self.type_start_times:
+            self.type_start_times[msg_type] = msg._timestamp
+        msg_id = str(getattr(msg, 'id', '0'))
+        instance = self.store.types.get(msg_type, {}).get(msg_id)
+        if instance is None:
+            with self.lock:
+                instance = self.store.instance(msg_type, msg_id)
+            self._instances_added = True
+        pending.add(instance, msg)
+        self.messages += 1
+
+    def message_types(self):
+        return sorted(self.type_start_times)
+
+    def instance_ids(self, msg_type):
+        return sorted(list(self.store.types.get(msg_type, {})), key=int)
+
+    def field_names(self, msg_type, msg_id):
+        instance = self.store.types.get(msg_type, {}).get(msg_id)
+        return sorted(list(instance.fields)) if instance is not None else []
+
+    def is_decoded(self, msg_type):
+        return True
+
+    def type_data(self, msg_type, start_time):
+        """Snapshot of the buffered samples of one type, as LogIndex.type_data"""
+        with self.lock:
+            return {msg_id: columns.as_dict(start_time)
+                    for msg_id, columns in self.store.types.get(msg_type, {}).items()}
+
+    def series(self, msg_type, msg_id, field, start_time):
+        """(times - start_time, values) of the buffered samples of one field"""
+        with self.lock:
+            instance = self.store.types.get(msg_type, {}).get(msg_id)
+            column = instance.fields.get(field) if instance is not None else None
+            if column is None:
+                return np.empty(0), np.empty(0)
+            times = instance.times.view()
+            values = column.view()
+        count = min(len(times), len(values))
+        return times[len(times) - count:] - start_time, values[len(values) - count:]
+
+
+def frame_ready(f):
+    """True if a whole tlog frame can be read at the file's position (a tlog being written may end mid-frame)"""
+    pos = f.tell()
+    head = f.read(TIMESTAMP_LEN + HEADER_LEN_V2)
+    f.seek(pos)
+    if len(head) < TIMESTAMP_LEN + HEADER_LEN_V2:
+        return False
+    length = frame_length(head, 0)
+    # Not a frame start: let pymavlink skip the bad bytes
+    if length is None:
+        return True
+    return os.fstat(f.fileno()).st_size - pos >= length
+
+
+def follow_limits(ax, times, values):
+    """Stretch the limits of ax in steps to keep a growing series in view; True if they changed.
+
+    Between steps the limits stay put, so new samples only need the lines
+    redrawn over the cached background.
+    """
+    if not len(times):
+        return False
+    changed = False
+    x0, x1 = ax.get_xlim()
+    if times[-1] > x1 or times[0] < x0:
+        headroom = max(LIVE_HEADROOM * float(times[-1] - times[0]), LIVE_MIN_HEADROOM)
+        ax.set_xlim(float(times[0]), float(times[-1]) + headroom)
+        changed = True
+    if values.dtype.kind == 'f':
+        values = values[np.isfinite(values)]
+    if len(values):
+        low, high = float(values.min()), float(values.max())
+        y0, y1 = ax.get_ylim()
+        if low < y0 or high > y1:
+            margin = 0.1 * (high - low) or max(abs(high) * 0.1, 1.0)
+            ax.set_ylim(low - margin, high + margin)
+            changed = True
+    return changed
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+
+# Bump whenever the on-disk layout changes; older entries are discarded and rebuilt
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'MAVLINK_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'mavlink-view-exporter'))
+DEFAULT_MAX_BYTES = int(os.environ.get('MAVLINK_CACHE_MAX_MB', '2048')) * 1024 * 1024
+
+# Bytes hashed from each end of the log for the content part of the key
+HASH_BLOCK = 1024 * 1024
+ALIGNMENT = 64
+
+
+def cache_key(log_file):
+    """Key a log on its path, size, mtime and a hash of its first and last blocks"""
+    stat = os.stat(log_file)
+    digest = hashlib.sha1()
+    digest.update(os.path.abspath(log_file).encode('utf-8'))
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('ascii'))
+    with open(log_file, 'rb') as f:
+        digest.update(f.read(HASH_BLOCK))
+        if stat.st_size > HASH_BLOCK:
+            f.seek(max(HASH_BLOCK, stat.st_size - HASH_BLOCK))
+            digest.update(f.read(HASH_BLOCK))
+    return digest.hexdigest()
+
+
+class LogCache:
+    """Size-bounded directory of parsed logs.
+
+    Each log has a JSON manifest (<key>.json) and any number of named
+    segments (<key>.<name>.bin), each a memory-mappable file of aligned
+    columns. Segments can be added one at a time, e.g. as message types
+    are decoded.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _manifest_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _segment_path(self, key, name):
+        return os.path.join(self.cache_dir, f"{key}.{name}.bin")
+
+    def open(self, log_file):
+        """Return (key, manifest) for a cached log, or None if it is missing or stale"""
+        try:
+            key = cache_key(log_file)
+            with open(self._manifest_path(key), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get('version') != CACHE_VERSION:
+            self._remove(key)
+            return None
+
+        # Touch the manifest so eviction sees this entry as recently used
+        try:
+            os.utime(self._manifest_path(key))
+        except OSError:
+            pass
+        return key, manifest
+
+    def create(self, log_file, metadata):
+        """Start a new entry for log_file; returns (key, manifest)"""
+        key = cache_key(log_file)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove(key)
+        manifest = dict(metadata, version=CACHE_VERSION, log_file=os.path.abspath(log_file), segments={})
+        self._write_manifest(key, manifest)
+        return key, manifest
+
+    def load_segment(self, key, manifest, name):
+        """Return {column key: read-only array view of the mapped segment}, or None if it is not cached"""
+        segment = manifest['segments'].get(name)
+        if segment is None:
+            return None
+        try:
+            if segment['size']:
+                with open(self._segment_path(key, name), 'rb') as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                mapping = b''
+        except (OSError, ValueError):
+            return None
+
+        columns = {}
+        for entry in segment['columns']:
+            columns[tuple(entry['key'])] = np.frombuffer(
+                mapping, dtype=entry['dtype'], count=entry['length'], offset=entry['offset'])
+        return columns
+
+    def save_segment(self, key, manifest, name, columns):
+        """Write {column key (tuple of str/int/None): array} as segment name and record it in the manifest"""
+        entries = []
+        offset = 0
+        path = self._segment_path(key, name)
+        with open(path + '.tmp', 'wb') as f:
+            for column_key, array in columns.items():
+                array = np.ascontiguousarray(array)
+                padding = -offset % ALIGNMENT
+                f.write(b'\0' * padding)
+                offset += padding
+                f.write(array.data)  # Straight from the buffer: no in-memory copy of a spilled column
+                entries.append({
+                    'key': list(column_key), 'dtype': array.dtype.str,
+                    'length': len(array), 'offset': offset
+                })
+                offset += array.nbytes
+
+        # Segment first, manifest last: the manifest only lists complete segments
+        os.replace(path + '.tmp', path)
+        manifest['segments'][name] = {'size': offset, 'columns': entries}
+        self._write_manifest(key, manifest)
+        self.evict(keep=key)
+
+    def _write_manifest(self, key, manifest):
+        path = self._manifest_path(key)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def _entry_files(self, names):
+        files = {}
+        for name in names:
+            key = name.split('.', 1)[0]
+            files.setdefault(key, []).append(name)
+        return files
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        entries = []
+        total = 0
+        for key, files in self._entry_files(names).items():
+            size = 0
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            try:
+                used = os.path.getmtime(self._manifest_path(key))
+            except OSError:
+                used = 0  # Orphaned segments are evicted first
+            entries.append((used, key, size))
+            total += size
+
+        for used, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            if self._remove(key):
+                total -= size
+
+    def _remove(self, key):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return True
+
+        removed = True
+        # Manifest first so a half-removed entry is never opened
+        files = sorted(self._entry_files(names).get(key, []), key=lambda name: not name.endswith('.json'))
+        for name in files:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Still mapped by an open log on Windows; try again on the next eviction
+                removed = False
+        return removed
@@ -0,0 +1,287 @@
+import concurrent.futures
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from columnSpill import shared_budget
+from logCache import DEFAULT_CACHE_DIR
+from logIndex import INGEST_WORKERS, LogIndex
+
+DEFAULT_CATALOG = os.environ.get('MAVLINK_CATALOG', os.path.join(DEFAULT_CACHE_DIR, 'catalog.sqlite'))
+LOG_EXTENSIONS = ('.tlog',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    indexed_at REAL NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    log_id INTEGER NOT NULL,
+    msg_type TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    PRIMARY KEY (log_id, msg_type, instance)
+);
+CREATE TABLE IF NOT EXISTS fields (
+    log_id INTEGER NOT NULL,
+    msg_type TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    field TEXT NOT NULL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (log_id, msg_type, instance, field)
+);
+CREATE INDEX IF NOT EXISTS messages_by_type ON messages (msg_type, instance);
+CREATE INDEX IF NOT EXISTS fields_by_name ON fields (msg_type, field);
+"""
+
+# TYPE, TYPE/instance or TYPE/instance/field, optionally compared with a number; instance may be *
+CONDITION = re.compile(r'^\s*([^/<>=\s]+)(?:/([^/<>=\s]+)(?:/([^<>=\s]+)\s*(<=|>=|<|>)?\s*([-+0-9.eE]+|nan|inf)?)?)?\s*$')
+
+
+def summarize_log(log_file):
+    """Catalog entry of one log: (start, end, [(type, instance, samples, start, end,
+    [(field, min, max)])]), with absolute times in seconds.
+
+    Runs in a pool worker. Types are decoded one at a time and dropped once
+    summarised, so memory stays bounded by the largest type.
+    """
+    index = LogIndex(log_file, shared_budget()).load(workers=1)
+    messages = []
+    for msg_type in index.message_types():
+        index.decode_types([msg_type], workers=1)
+        for msg_id, columns in index.store.types.get(msg_type, {}).items():
+            times = columns.times.view()
+            count = len(times)
+            stats = []
+            for field, column in columns.fields.items():
+                values = column.view()[:count]
+                if values.dtype.kind == 'f':
+                    values = values[~np.isnan(values)]
+                if len(values):
+                    stats.append((field, float(values.min()), float(values.max())))
+                else:
+                    stats.append((field, None, None))
+            first = float(times.min()) if count else None
+            last = float(times.max()) if count else None
+            messages.append((msg_type, msg_id, count, first, last, stats))
+        index.store.types.pop(msg_type, None)
+
+    starts = [message[3] for message in messages if message[3] is not None]
+    ends = [message[4] for message in messages if message[4] is not None]
+    return (min(starts) if starts else None, max(ends) if ends else None, messages)
+
+
+def _summarize(log_file):
+    try:
+        return summarize_log(log_file), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def find_logs(root):
+    """Paths of the logs under a directory tree"""
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            if name.lower().endswith(LOG_EXTENSIONS):
+                yield os.path.abspath(os.path.join(directory, name))
+
+
+def parse_condition(text):
+    """(msg_type, instance or None, field or None, operator or None, value or None) of a query term"""
+    match = CONDITION.match(text)
+    if match is None or (match.group(4) is None) != (match.group(5) is None):
+        raise ValueError(f"Bad query term: {text!r} (expected TYPE[/instance[/field[<|>|<=|>=value]]])")
+    msg_type, instance, field, operator, value = match.groups()
+    if instance == '*':
+        instance = None
+    return msg_type, instance, field, operator, float(value) if value is not None else None
+
+
+class LogCatalog:
+    """SQLite catalog of the logs of a directory tree: message types, instances, sample
+    counts, time spans and per-field min/max, kept up to date incrementally"""
+
+    def __init__(self, path=DEFAULT_CATALOG):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def stale_logs(self, root):
+        """(logs under root that are new or changed since indexed, catalogued paths under root now gone)"""
+        known = {}
+        prefix = os.path.join(os.path.abspath(root), '')
+        for path, size, mtime_ns in self.connection.execute(
+                "SELECT path, size, mtime_ns FROM logs WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)):
+            known[path] = (size, mtime_ns)
+
+        changed = []
+        for path in find_logs(root):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.pop(path, None) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((path, stat.st_size, stat.st_mtime_ns))
+        return changed, list(known)
+
+    def update(self, root, workers=None, progress=None, cancel_event=None):
+        """Index the new and changed logs under root with a process pool and drop deleted ones.
+
+        progress(logs_done, logs_total) is called as logs finish. Setting
+        cancel_event stops the build within a fraction of a second, keeping
+        the logs already indexed; logs being summarized at that moment are
+        finished by their worker, which then exits. Returns (indexed,
+        removed, failed) counts.
+        """
+        changed, removed = self.stale_logs(root)
+        for path in removed:
+            self._delete(path)
+        self.connection.commit()
+
+        workers = max(1, min(INGEST_WORKERS if workers is None else workers, len(changed)))
+        indexed = failed = 0
+        if changed and not (cancel_event is not None and cancel_event.is_set()):
+            context = multiprocessing.get_context('spawn')
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            try:
+                futures = {executor.submit(_summarize, path): (path, size, mtime_ns)
+                           for path, size, mtime_ns in changed}
+                pending = set(futures)
+                while pending and not (cancel_event is not None and cancel_event.is_set()):
+                    finished, pending = concurrent.futures.wait(
+                        pending, timeout=0.2, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        summary, error = future.result()
+                        failed += error is not None
+                        self._store(*futures[future], summary, error)
+                        # Commit as logs finish so an interrupted build keeps its progress
+                        self.connection.commit()
+                        indexed += 1
+                        if progress is not None:
+                            progress(indexed, len(changed))
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return indexed, len(removed), failed
+
+    def _delete(self, path):
+        row = self.connection.execute("SELECT id FROM logs WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            for table in ('messages', 'fields'):
+                self.connection.execute(f"DELETE FROM {table} WHERE log_id = ?", row)
+            self.connection.execute("DELETE FROM logs WHERE id = ?", row)
+
+    def _store(self, path, size, mtime_ns, summary, error):
+        self._delete(path)
+        start, end, messages = summary if summary is not None else (None, None, [])
+        log_id = self.connection.execute(
+            "INSERT INTO logs (path, size, mtime_ns, start_time, end_time, indexed_at, error)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, start, end, time.time(), error)).lastrowid
+        self.connection.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+            [(log_id, msg_type, msg_id, count, first, last)
+             for msg_type, msg_id, count, first, last, _ in messages])
+        self.connection.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?, ?, ?, ?)",
+            [(log_id, msg_type, msg_id, field, low, high)
+             for msg_type, msg_id, _, _, _, stats in messages for field, low, high in stats])
+
+    def query(self, conditions=()):
+        """Logs matching every condition, as (path, start_time, end_time) sorted by start time.
+
+        A condition is 'TYPE' (the type is present), 'TYPE/instance' (with
+        that instance; * for any), 'TYPE/instance/field' (the field has
+        data) or 'TYPE/instance/field<value' (some sample below value; > for
+        above, <= and >= too).
+        """
+        clauses, params = ["error IS NULL"], []
+        for text in conditions:
+            msg_type, instance, field, operator, value = parse_condition(text)
+            table = 'messages' if field is None else 'fields'
+            clause = f"EXISTS (SELECT 1 FROM {table} t WHERE t.log_id = logs.id AND t.msg_type = ?"
+            params.append(msg_type)
+            if instance is not None:
+                clause += " AND t.instance = ?"
+                params.append(instance)
+            if field is not None:
+                clause += " AND t.field = ?"
+                params.append(field)
+            if operator is not None:
+                clause += f" AND t.{'min' if operator.startswith('<') else 'max'} {operator} ?"
+                params.append(value)
+            clauses.append(clause + ")")
+        sql = f"SELECT path, start_time, end_time FROM logs WHERE {' AND '.join(clauses)} ORDER BY start_time, path"
+        return self.connection.execute(sql, params).fetchall()
+
+    def log_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+
+def main(argv=None):
+    """main.py catalog build DIR | main.py catalog query [TERM ...]"""
+    import argparse
+    import threading
+
+    from exportCli import (EXIT_BAD_INPUT, EXIT_FAILURE, EXIT_INTERRUPTED, EXIT_NO_DATA, EXIT_OK, EXIT_USAGE,
+                           ProgressReporter, emit)
+
+    parser = argparse.ArgumentParser(prog='main.py catalog', description="Index directories of logs and search them.")
+    parser.add_argument('--db', default=DEFAULT_CATALOG, help=f"catalog database (default: {DEFAULT_CATALOG})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index the new and changed logs under a directory")
+    build.add_argument('root', help="directory searched recursively for .tlog files")
+    build.add_argument('--workers', type=int, help="processes indexing logs in parallel")
+    query = commands.add_parser('query', help="print the logs matching every term, one path per line")
+    query.add_argument('terms', nargs='*', help="TYPE, TYPE/instance or TYPE/instance/field[<|>|<=|>=value]; * for any instance")
+    args = parser.parse_args(argv)
+
+    cancel_event = threading.Event()
+    try:
+        catalog = LogCatalog(args.db)
+        if args.command == 'build':
+            if not os.path.isdir(args.root):
+                emit('error', message=f"Directory not found: {args.root}")
+                return EXIT_BAD_INPUT
+            indexed, removed, failed = catalog.update(args.root, args.workers, ProgressReporter('index'), cancel_event)
+            emit('done', indexed=indexed, removed=removed, failed=failed, logs=catalog.log_count())
+            return EXIT_OK
+        try:
+            rows = catalog.query(args.terms)
+        except ValueError as e:
+            emit('error', message=str(e))
+            return EXIT_USAGE
+        for path, _, _ in rows:
+            print(path)
+        return EXIT_OK if rows else EXIT_NO_DATA
+    except KeyboardInterrupt:
+        cancel_event.set()
+        emit('error', message="Interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit('error', message=f"{type(e).__name__}: {e}")
+        return EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,515 @@
+import concurrent.futures
+import mmap
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+from pymavlink import DFReader, mavutil
+
+import batchDecoder
+import tlogFrames
+from columnSpill import SpillColumn, SpillStore
+from fieldExtractor import SKIPPED_FIELDS, PendingRows
+from spanTrace import span
+from telemetryStore import TelemetryStore, InstanceColumns, field_dtypes
+
+# Parallel ingest: process count, and the sizes below which a single process is faster
+INGEST_WORKERS = int(os.environ.get('MAVLINK_INGEST_WORKERS', os.cpu_count() or 1))
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+PARALLEL_MIN_FRAMES = 200000
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Cache segment holding the frame offsets found by the header scan
+FRAMES_SEGMENT = 'frames'
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+def declared_fields(msg_class):
+    """Column names a message class produces, derived from its definition"""
+    fields = []
+    for name, ftype in zip(msg_class.fieldnames, msg_class.fieldtypes):
+        if name in SKIPPED_FIELDS or ftype == 'char':
+            continue
+        length = msg_class.array_lengths[msg_class.ordered_fieldnames.index(name)]
+        # pymavlink decodes one-element arrays as scalars
+        if length > 1:
+            fields.extend(f"{name}[{idx}]" for idx in range(length))
+        else:
+            fields.append(name)
+    return fields
+
+
+class LogIndex:
+    """Index of every message type and instance in a log.
+
+    A tlog is opened with a header-only scan that records where the frames of
+    each (type, instance) are; decode_types decodes only the types asked for.
+    Other formats pymavlink reads are decoded completely on load. With a
+    MemoryBudget, decoded columns and frame offsets beyond it are spilled to
+    disk.
+    """
+
+    # Messages decoded between progress reports and cancellation checks
+    PROGRESS_INTERVAL = 2000
+
+    def __init__(self, log_file, budget=None):
+        self.log_file = log_file
+        self.start_time = None
+        self.type_start_times = {}
+        self.budget = budget
+        self.store = self._new_store()
+        self.from_cache = False
+
+        # Header scan of a tlog, {msg_type: {msg_id: frame offsets}}; None when decoded on load
+        self.frames = None
+        self.type_msgids = {}
+        self.first_marker = None
+        # With a budget the offsets are moved from the scan's arrays into spill columns as they are found
+        self._frame_columns = {}
+
+        # Sorted declared_fields by msgid, for the field names of undecoded types
+        self._declared_fields = {}
+
+        self._buffer = None
+        self._cache = None
+        self._cache_key = None
+        self._cache_manifest = None
+        # Decodes on different threads may finish at once; segment writes share the manifest
+        self._cache_lock = threading.Lock()
+
+    def load(self, cache=None, progress=None, cancel_event=None, workers=None):
+        """Fill the index from the cache, a header scan (tlogs) or a full parse.
+
+        progress(bytes_done, bytes_total) is called from the loading thread;
+        setting cancel_event aborts with IngestCancelled. Large tlogs are
+        scanned by a pool of `workers` processes (default INGEST_WORKERS).
+        """
+        with span('load', detail=os.path.basename(self.log_file)) as load_span:
+            self._load(cache, progress, cancel_event, workers)
+            load_span.add(self.sample_count())
+        return self
+
+    def _load(self, cache, progress, cancel_event, workers):
+        self._cache = cache
+        if cache is not None:
+            with span('cache_load'):
+                if self._load_cached(cache):
+                    return
+
+        workers = INGEST_WORKERS if workers is None else workers
+        if self._is_tlog():
+            with span('scan'):
+                self._scan(workers, progress, cancel_event)
+        else:
+            with span('parse'):
+                self._build(progress, cancel_event)
+
+        if cache is not None:
+            with span('cache_save'):
+                self._save_cached(cache)
+
+    def _new_store(self):
+        return TelemetryStore() if self.budget is None else SpillStore(self.budget)
+
+    def _is_tlog(self):
+        # Only plain tlogs have the timestamp + packet framing the scanner relies on. The file
+        # is classified the way mavlink_connection picks its reader, without opening one: the
+        # tlog reader indexes the whole log up front
+        name = self.log_file.lower()
+        if name.endswith(('.bin', '.px4log')) or self.log_file.endswith('.elf') or '/bin/' in self.log_file:
+            return False
+        if self.log_file.endswith('.log') and DFReader.DFReader_is_text_log(self.log_file):
+            return False
+        return os.path.getsize(self.log_file) > 0
+
+    def _map_log(self):
+        if self._buffer is None:
+            with open(self.log_file, 'rb') as f:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._buffer
+
+    def _scan(self, workers, progress=None, cancel_event=None):
+        buf = self._map_log()
+        total_bytes = len(buf)
+        first = tlogFrames.first_frame(buf)
+        self.frames = {}
+        if first is None:
+            return
+        reference_usec, self.first_marker = first
+        tlogFrames.select_dialect(self.first_marker)
+        self.start_time = reference_usec * 1.0e-6
+
+        frames = {}
+        first_usec = {}
+        if workers > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+            chunk_count = max(1, min(workers * CHUNKS_PER_WORKER, total_bytes // MIN_CHUNK_BYTES))
+            ranges = tlogFrames.split_ranges(buf, chunk_count)
+            jobs = [(_scan_range, (self.log_file, start, end, reference_usec, self.first_marker))
+                    for start, end in ranges]
+            done_bytes = 0
+            results = self._pool_map(workers, jobs, cancel_event)
+            for (start, end), (chunk_frames, chunk_first_usec) in zip(ranges, results):
+                # Merge strictly in file order so every offset list stays sorted
+                for key, offsets in chunk_frames.items():
+                    if key in frames:
+                        frames[key].extend(offsets)
+                    else:
+                        frames[key] = offsets
+                for msgid, usec in chunk_first_usec.items():
+                    first_usec.setdefault(msgid, usec)
+                self._register_frames(frames, first_usec)
+                done_bytes += end - start
+                if progress is not None:
+                    progress(done_bytes, total_bytes)
+            return
+
+        def report(pos):
+            self._register_frames(frames, first_usec)
+            if progress is not None:
+                progress(pos, total_bytes)
+
+        try:
+            tlogFrames.scan_frames(buf, 0, total_bytes, reference_usec, frames, first_usec,
+                                   report, cancel_event)
+        except tlogFrames.ScanCancelled:
+            raise IngestCancelled()
+        self._register_frames(frames, first_usec)
+        if progress is not None:
+            progress(total_bytes, total_bytes)
+
+    def _register_frames(self, frames, first_usec):
+        # Publish newly found types and instances; the offset arrays are shared, not copied
+        if self.budget is not None:
+            frames = self._spill_frames(frames)
+        for (msgid, msg_id), offsets in frames.items():
+            msg_type = tlogFrames.type_name(msgid)
+            instances = self.frames.get(msg_type)
+            if instances is None:
+                instances = self.frames[msg_type] = {}
+                self.type_msgids[msg_type] = msgid
+            instances.setdefault(msg_id, offsets)
+        for msgid, usec in first_usec.items():
+            self.type_start_times.setdefault(tlogFrames.type_name(msgid), usec * 1.0e-6)
+
+    def _spill_frames(self, frames):
+        for key, offsets in frames.items():
+            column = self._frame_columns.get(key)
+            if column is None:
+                column = self._frame_columns[key] = SpillColumn(np.int64, self.budget)
+            if len(offsets):
+                column.extend(offsets)
+                # Emptied in place: the scan keeps appending to the same array
+                del offsets[:]
+        return self._frame_columns
+
+    def _build(self, progress=None, cancel_event=None):
+        mlog = mavutil.mavlink_connection(self.log_file)
+        total_bytes = os.path.getsize(self.log_file)
+
+        def report():
+            progress(int(total_bytes * getattr(mlog, 'percent', 0) / 100), total_bytes)
+
+        try:
+            self._ingest(mlog, report if progress is not None else None, cancel_event)
+        finally:
+            mlog.close()
+
+        self.store.trim()
+        if progress is not None:
+            progress(total_bytes, total_bytes)
+
+    def _ingest(self, mlog, report=None, cancel_event=None):
+        """Decode every message from mlog into the store"""
+        store = self.store
+        pending = PendingRows()
+        count = 0
+
+        while True:
+            msg = mlog.recv_match(blocking=False)
+            if msg is None:
+                break
+
+            count += 1
+            if count % self.PROGRESS_INTERVAL == 0:
+                pending.flush()
+                if cancel_event is not None and cancel_event.is_set():
+                    raise IngestCancelled()
+                if report is not None:
+                    report()
+
+            msg_type = msg.get_type()
+            if self.start_time is None:
+                self.start_time = msg._timestamp
+            if msg_type not in self.type_start_times:
+                self.type_start_times[msg_type] = msg._timestamp
+
+            msg_id = str(getattr(msg, 'id', '0'))
+            pending.add(store.instance(msg_type, msg_id), msg)
+
+        pending.flush()
+
+    def is_decoded(self, msg_type):
+        return self.frames is None or msg_type in self.store.types
+
+    def frame_count(self, msg_type):
+        if self.frames is None:
+            return 0
+        return sum(len(offsets) for offsets in list(self.frames.get(msg_type, {}).values()))
+
+    def sample_count(self):
+        """Frames found by the scan of a tlog, or messages decoded from any other log"""
+        if self.frames is not None:
+            return sum(self.frame_count(msg_type) for msg_type in list(self.frames))
+        return sum(len(instance.times) for instances in list(self.store.types.values())
+                   for instance in list(instances.values()))
+
+    def decode_types(self, msg_types, progress=None, cancel_event=None, workers=None):
+        """Decode the scanned frames of msg_types into the store.
+
+        progress(frames_done, frames_total) and cancel_event work as in load.
+        Each type is published to the store only once it is complete.
+        """
+        pending = [msg_type for msg_type in msg_types
+                   if not self.is_decoded(msg_type) and not self._load_cached_type(msg_type)]
+        workers = INGEST_WORKERS if workers is None else workers
+        total = sum(self.frame_count(msg_type) for msg_type in pending)
+        done = 0
+
+        for msg_type in pending:
+            with span('decode', self.frame_count(msg_type), msg_type):
+                instances = {}
+                for msg_id, offsets in self.frames.get(msg_type, {}).items():
+                    if workers > 1 and len(offsets) >= PARALLEL_MIN_FRAMES:
+                        with span('parallel_decode', len(offsets)):
+                            columns = self._decode_parallel(offsets, workers, cancel_event)
+                    else:
+                        columns = self.store._new_instance()
+                        self._decode_frames(offsets, columns, cancel_event)
+                    columns.trim()
+                    instances[msg_id] = columns
+                    done += len(offsets)
+                    if progress is not None:
+                        progress(done, total)
+
+                self.store.types[msg_type] = instances
+                self._save_cached_type(msg_type)
+
+    def _decode_frames(self, offsets, columns, cancel_event=None):
+        buf = self._map_log()
+        mavlink = tlogFrames.select_dialect(self.first_marker)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if not len(offsets):
+            return
+        msg_class = mavlink.mavlink_map.get(tlogFrames.frame_msgid(buf, int(offsets[0])))
+        data = np.frombuffer(buf, dtype=np.uint8)
+        dtypes = field_dtypes(msg_class)
+
+        for start in range(0, len(offsets), batchDecoder.CHUNK_FRAMES):
+            if cancel_event is not None and cancel_event.is_set():
+                raise IngestCancelled()
+            chunk = offsets[start:start + batchDecoder.CHUNK_FRAMES]
+            with span('batch_decode', len(chunk)):
+                batch = batchDecoder.decode_frames(data, chunk, msg_class, SKIPPED_FIELDS)
+            if batch is None:
+                self._decode_messages(chunk, columns, cancel_event)
+                continue
+            times, fields = batch
+            with span('columns', len(times)):
+                for field, name, values in fields:
+                    columns.column(name, dtypes.get(field, float)).extend(values)
+                columns.times.extend(times)
+
+    def _decode_messages(self, offsets, columns, cancel_event=None):
+        """Per-message fallback for frames the batch decoder does not handle"""
+        buf = self._map_log()
+        mavlink = mavutil.mavlink
+        mav = mavlink.MAVLink(None)
+        unpack_timestamp = tlogFrames.TIMESTAMP.unpack_from
+        packet_start = tlogFrames.TIMESTAMP_LEN
+        pending = PendingRows()
+
+        with span('pymavlink', len(offsets)):
+            for count, offset in enumerate(offsets):
+                if count % self.PROGRESS_INTERVAL == 0 and cancel_event is not None and cancel_event.is_set():
+                    raise IngestCancelled()
+                offset = int(offset)
+                length = tlogFrames.frame_length(buf, offset)
+                try:
+                    msg = mav.decode(bytearray(buf[offset + packet_start:offset + length]))
+                except mavlink.MAVError:
+                    continue  # Bad CRC: the scan resynced past corrupt bytes onto this frame
+                msg._timestamp = unpack_timestamp(buf, offset)[0] * 1.0e-6
+                pending.add(columns, msg)
+        pending.flush()
+
+    def _decode_parallel(self, offsets, workers, cancel_event=None):
+        chunks = np.array_split(np.asarray(offsets, dtype=np.int64), workers * CHUNKS_PER_WORKER)
+        jobs = [(_decode_offsets, (self.log_file, self.first_marker, chunk)) for chunk in chunks if len(chunk)]
+
+        columns = self.store._new_instance()
+        for chunk in self._pool_map(workers, jobs, cancel_event):
+            for field, array in chunk.items():
+                if field is not None:
+                    columns.column(field, array.dtype).extend(array)
+            columns.times.extend(chunk[None])
+        return columns
+
+    def _pool_map(self, workers, jobs, cancel_event=None):
+        """Run (function, args) jobs in a process pool, yielding results in submission order"""
+        context = multiprocessing.get_context('spawn')
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            futures = [executor.submit(function, *args) for function, args in jobs]
+            for future in futures:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise IngestCancelled()
+                    try:
+                        result = future.result(timeout=0.2)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        continue
+                yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_cached(self, cache):
+        opened = cache.open(self.log_file)
+        if opened is None:
+            return False
+        self._cache_key, self._cache_manifest = opened
+        manifest = self._cache_manifest
+
+        if manifest['lazy']:
+            frames = cache.load_segment(self._cache_key, manifest, FRAMES_SEGMENT)
+            if frames is None:
+                self._cache_key = self._cache_manifest = None
+                return False
+            self.frames = {}
+            for (msg_type, msgid, msg_id), offsets in frames.items():
+                self.frames.setdefault(msg_type, {})[msg_id] = offsets
+                self.type_msgids[msg_type] = msgid
+            self.first_marker = manifest['first_marker']
+            if self.first_marker is not None:
+                tlogFrames.select_dialect(self.first_marker)
+        else:
+            for msg_type in manifest['type_start_times']:
+                if not self._load_cached_type(msg_type):
+                    self.store = self._new_store()
+                    self._cache_key = self._cache_manifest = None
+                    return False
+
+        self.start_time = manifest['start_time']
+        self.type_start_times = manifest['type_start_times']
+        self.from_cache = True
+        return True
+
+    def _load_cached_type(self, msg_type):
+        if self._cache_manifest is None:
+            return False
+        with span('cache_load', detail=msg_type):
+            columns = self._cache.load_segment(self._cache_key, self._cache_manifest, 'type-' + msg_type)
+        if columns is None:
+            return False
+        store = TelemetryStore.from_columns({(msg_type, msg_id, field): array
+                                             for (msg_id, field), array in columns.items()})
+        self.store.types[msg_type] = store.types.get(msg_type, {})
+        return True
+
+    def _save_cached(self, cache):
+        metadata = {
+            'start_time': self.start_time,
+            'type_start_times': self.type_start_times,
+            'lazy': self.frames is not None,
+            'first_marker': self.first_marker,
+        }
+        try:
+            self._cache_key, self._cache_manifest = cache.create(self.log_file, metadata)
+            if self.frames is not None:
+                columns = {}
+                for msg_type, instances in self.frames.items():
+                    for msg_id, offsets in instances.items():
+                        columns[(msg_type, self.type_msgids[msg_type], msg_id)] = np.asarray(offsets, dtype=np.int64)
+                cache.save_segment(self._cache_key, self._cache_manifest, FRAMES_SEGMENT, columns)
+            else:
+                for msg_type in self.store.types:
+                    self._save_cached_type(msg_type)
+        except OSError as e:
+            self._cache_key = self._cache_manifest = None
+            print(f"Error writing log cache: {e}")
+
+    def _save_cached_type(self, msg_type):
+        if self._cache_manifest is None:
+            return
+        columns = {}
+        for msg_id, instance in self.store.types[msg_type].items():
+            columns[(msg_id, None)] = instance.times.view()
+            for field, column in instance.fields.items():
+                columns[(msg_id, field)] = column.view()
+        try:
+            with self._cache_lock, span('cache_save', detail=msg_type):
+                self._cache.save_segment(self._cache_key, self._cache_manifest, 'type-' + msg_type, columns)
+        except OSError as e:
+            print(f"Error writing log cache: {e}")
+
+    def message_types(self):
+        return sorted(self.type_start_times)
+
+    def instance_ids(self, msg_type):
+        if self.frames is not None:
+            return sorted(self.frames.get(msg_type, {}), key=int)
+        return self.store.instance_ids(msg_type)
+
+    def field_names(self, msg_type, msg_id):
+        """Sorted field names of one instance; undecoded types are answered from the message definition"""
+        instance = self.store.types.get(msg_type, {}).get(msg_id)
+        if instance is not None:
+            return sorted(instance.fields)
+        if self.frames is None or msg_id not in self.frames.get(msg_type, {}):
+            return []
+        msgid = self.type_msgids[msg_type]
+        fields = self._declared_fields.get(msgid)
+        if fields is None:
+            msg_class = mavutil.mavlink.mavlink_map.get(msgid)
+            fields = self._declared_fields[msgid] = sorted(declared_fields(msg_class)) if msg_class is not None else []
+        return list(fields)
+
+    def type_data(self, msg_type, start_time):
+        """Return {msg_id: {'times', 'data'}} for one decoded type with times relative to start_time"""
+        instances = list(self.store.types.get(msg_type, {}).items())
+        return {msg_id: columns.as_dict(start_time) for msg_id, columns in instances}
+
+    def all_data(self):
+        """Return every decoded type as {msg_type: {msg_id: {'times', 'data'}}} relative to the log start"""
+        return {msg_type: self.type_data(msg_type, self.start_time) for msg_type in list(self.store.types)}
+
+
+def _scan_range(log_file, start, end, reference_usec, first_marker):
+    """Process-pool entry point: header scan of the frames in [start, end) of a tlog"""
+    tlogFrames.select_dialect(first_marker)
+    with open(log_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return tlogFrames.scan_frames(buf, start, end, reference_usec, {}, {})
+    finally:
+        buf.close()
+
+
+def _decode_offsets(log_file, first_marker, offsets):
+    """Process-pool entry point: decode the frames at offsets into {field: array, None: times}"""
+    index = LogIndex(log_file)
+    index.first_marker = first_marker
+    columns = InstanceColumns()
+    try:
+        index._decode_frames(offsets, columns)
+    finally:
+        if index._buffer is not None:
+            index._buffer.close()
+    result = {field: column.view() for field, column in columns.fields.items()}
+    result[None] = columns.times.view()
+    return result
@@ -1,9 +1,28 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import subprocess
+import importlib
+import multiprocessing
 import os
 import sys
-from xmlExporter import open_xml_exporter
+import threading
+
+# The headless commands must not load Tk or matplotlib; nor must their worker
+# processes, which re-import this module with the same arguments
+HEADLESS_COMMANDS = ("export", "catalog", "replay")
+HEADLESS = len(sys.argv) > 1 and sys.argv[1] in HEADLESS_COMMANDS
+if not HEADLESS:
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+# numpy, matplotlib and pymavlink take seconds to import: the launcher shows first and imports
+# them on a background thread, so the plotter and the exporter open without the wait
+WARM_MODULES = ("logIndex", "pageCache", "plotInteraction", "exportFormats", "selectionExport")
+WARM_DELAY_MS = 100
+
+def warm_imports():
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Error preloading {name}: {e}")
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -52,7 +71,7 @@ class MavlinkLauncherGUI:
         self.export_button = ttk.Button(
         self.control_frame, 
         text="Export XML", 
-        command=open_xml_exporter  # Changed from show_export_warning
+        command=self.open_exporter  # Changed from show_export_warning
         )
         self.export_button.grid(row=2, column=0, columnspan=2, pady=5, sticky='ew')
 
@@ -60,19 +79,30 @@ class MavlinkLauncherGUI:
         self.control_frame.grid_columnconfigure(0, weight=1)
         self.control_frame.grid_columnconfigure(1, weight=3)
 
+        # Started once the window is drawn
+        master.after(WARM_DELAY_MS, lambda: threading.Thread(target=warm_imports, daemon=True).start())
+
     def open_plotter(self):
+        # Opens in this process, with the modules warmed in the background; the exporter and
+        # every plotter window share one memory budget and one set of timings
+        self.master.config(cursor="watch")
+        self.master.update_idletasks()
         try:
-            if getattr(sys, 'frozen', False):
-                # If running as compiled executable
-                subprocess.Popen([sys.executable, "--plotter"])
-            else:
-                # If running as .py script
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                plotter_script = os.path.join(script_dir, "mavlinkPlotter.py")
-                subprocess.Popen([sys.executable, plotter_script])
-                
+            from mavlinkPlotter import MavlinkPlotterGUI
+            MavlinkPlotterGUI(tk.Toplevel(self.master))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open plotter:\n{str(e)}")
+        finally:
+            self.master.config(cursor="")
+
+    def open_exporter(self):
+        self.master.config(cursor="watch")
+        self.master.update_idletasks()
+        try:
+            from xmlExporter import open_xml_exporter
+            open_xml_exporter()
+        finally:
+            self.master.config(cursor="")
 
     def show_export_warning(self):
         messagebox.showinfo(
@@ -81,7 +111,18 @@ class MavlinkLauncherGUI:
         )
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "--plotter":
+    # Needed for the parallel log parser's worker processes in the PyInstaller build
+    multiprocessing.freeze_support()
+    if HEADLESS and sys.argv[1] == "export":
+        from exportCli import main
+        sys.exit(main(sys.argv[2:]))
+    elif HEADLESS and sys.argv[1] == "catalog":
+        from logCatalog import main
+        sys.exit(main(sys.argv[2:]))
+    elif HEADLESS:
+        from tlogReplay import main
+        sys.exit(main(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--plotter":
         # Run the plotter directly
         from mavlinkPlotter import run_plotter
         run_plotter()
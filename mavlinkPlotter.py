@@ -1,16 +1,27 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from pymavlink import mavutil
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from columnSpill import shared_budget
+from logCache import LogCache
+from logIndex import LogIndex
+from ingestWorker import IngestWorker
+from plotInteraction import BlitManager, MotionThrottle, SampleCursor
+from pageCache import AxesPool, PageCache, capture_page, page_series, plot_label
+from catalogBrowser import CatalogBrowser
+from fieldSearch import SEARCH_SHOWN, FieldIndex, log_field_paths
+from liveTelemetry import DEFAULT_ENDPOINT, LIVE_FPS, LiveSource, follow_limits
+from exportFormats import ask_export_path
+from spanTrace import span
+from traceBar import TraceBar
 
 class MavlinkPlotterGUI:
     def __init__(self, master):
         self.master = master
         master.title("MAVLink Data Plotter")
         master.geometry("1000x800")
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
         master.grid_rowconfigure(1, weight=1)
         master.grid_columnconfigure(0, weight=1)
 
@@ -18,7 +29,7 @@ class MavlinkPlotterGUI:
         self.control_frame = ttk.Frame(master, padding=10)
         self.control_frame.grid(row=0, column=0, sticky='ew', padx=10)
 
-        for i in range(12):
+        for i in range(14):
             self.control_frame.grid_columnconfigure(i, weight=1)
 
         try:
@@ -65,6 +76,12 @@ class MavlinkPlotterGUI:
         self.export_button = ttk.Button(self.control_frame, text="Export", command=self.export_xml)
         self.export_button.grid(row=0, column=11, padx=5, pady=5)
 
+        self.catalog_button = ttk.Button(self.control_frame, text="Catalog", command=self.open_catalog)
+        self.catalog_button.grid(row=0, column=12, padx=5, pady=5)
+
+        self.live_button = ttk.Button(self.control_frame, text="Live", command=self.toggle_live)
+        self.live_button.grid(row=0, column=13, padx=5, pady=5)
+
         # Matplotlib Figure
         self.figure = plt.Figure(figsize=(10, 6), dpi=100)
         self.canvas = FigureCanvasTkAgg(self.figure, master=master)
@@ -89,7 +106,7 @@ class MavlinkPlotterGUI:
         self.next_button.grid_remove()
 
         self.grid_frame = ttk.Frame(self.control_frame)
-        self.grid_frame.grid(row=1, column=0, columnspan=12, pady=5)
+        self.grid_frame.grid(row=1, column=0, columnspan=14, pady=5)
 
         ttk.Label(self.grid_frame, text="Grid Layout:").pack(side='left', padx=5)
 
@@ -108,11 +125,43 @@ class MavlinkPlotterGUI:
             textvariable=self.cols_var, command=self.update_grid_layout)
         self.cols_spinbox.pack(side='left', padx=5)
 
+        # Unticked draws every sample, for exact inspection
+        self.decimate_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.grid_frame, text="Decimate", variable=self.decimate_var,
+                        command=self.toggle_decimation).pack(side='left', padx=5)
+
+        # Cursor readout snaps to the nearest recorded sample on every plot
+        self.snap_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.grid_frame, text="Snap cursor", variable=self.snap_var,
+                        command=self.toggle_snap).pack(side='left', padx=5)
+
+        # Field search: matches are listed as you type, picking one selects and plots it
+        self.search_frame = ttk.Frame(self.control_frame)
+        self.search_frame.grid(row=2, column=0, columnspan=14, pady=5)
+        ttk.Label(self.search_frame, text="Search:").pack(side='left', padx=5)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.update_search_matches())
+        ttk.Entry(self.search_frame, textvariable=self.search_var, width=25).pack(side='left', padx=5)
+        self.search_combobox = ttk.Combobox(self.search_frame, state="readonly", width=50)
+        self.search_combobox.pack(side='left', padx=5)
+        self.search_combobox.bind("<<ComboboxSelected>>", self.select_search_match)
+        self.search_label = ttk.Label(self.search_frame, text="")
+        self.search_label.pack(side='left', padx=5)
+
         # Plot canvas and nav frame
         self.figure = plt.Figure(figsize=(10, 6), dpi=100)
         self.canvas = FigureCanvasTkAgg(self.figure, master=master)
         self.canvas.get_tk_widget().grid(row=1, column=0, sticky='nsew')
 
+        # Cursor overlays are blitted; mouse moves are handled once per frame
+        self.blit = BlitManager(self.canvas)
+        MotionThrottle(self.canvas, self.update_cursor_position)
+        self.sample_cursor = None
+
+        # Axes and lines are created once per grid shape and refilled for each page or field
+        self.axes_pool = AxesPool(self.figure)
+        self.canvas.mpl_connect('resize_event', self.on_canvas_resize)
+
         self.nav_frame = ttk.Frame(master)
         self.nav_frame.grid(row=3, column=0, sticky='ew', pady=5)
         self.nav_frame.grid_columnconfigure(1, weight=1)
@@ -133,22 +182,52 @@ class MavlinkPlotterGUI:
         self.status_frame.grid(row=4, column=0, sticky='sw', padx=10, pady=5)
         self.log_date_label = ttk.Label(self.status_frame, text="Log date: Not loaded")
         self.log_date_label.pack(side='left')
+        # Timings of the latest load, plot and export stages, while switched on
+        self.trace_bar = TraceBar(self.status_frame, wraplength=500)
+        self.trace_bar.pack(side='left', padx=10)
+
+        # Shown only while a log is loading
+        self.progress_bar = ttk.Progressbar(self.status_frame, length=200, mode='determinate', maximum=100)
+        self.progress_label = ttk.Label(self.status_frame, text="")
+        self.cancel_load_button = ttk.Button(self.status_frame, text="Cancel", command=self.cancel_load)
 
-        self.cursor_label = ttk.Label(self.status_frame, text="")
+        self.cursor_label = ttk.Label(self.status_frame, text="", wraplength=700)
         self.cursor_label.pack(side='right', padx=10)
 
         # Internal state variables
         self.log_file = None
+        self.log_index = None
+        self.log_cache = LogCache()
+        self.ingest_worker = None
+        self.decode_worker = None
+        self.decoding_type = None
         self.message_data = {}
         self.current_ids = []
         self.current_fields = []
         self.start_time = None
         self.export_all_mode = False
+        self.field_index = None
+        # (type, instance, field) picked in the search while its type was still decoding
+        self.pending_plot = None
+
+        # Live mode: the source replaces the log index; shown lines are refreshed and blitted
+        self.live_source = None
+        self.live_lines = []
+        # LiveSource.instance_version the search index was built from
+        self.live_instance_version = None
+        self.plotted = []
+        self.plotted_start = None
 
         self.all_plots_data = []
+        self.plot_lines = []
         self.current_page = 0
         self.total_pages = 0
 
+        # Rendered "Plot All" pages; the neighbours of the shown page are drawn ahead of time
+        self.page_cache = PageCache()
+        self.plot_type = None
+        self.plot_sources = {}
+
         # Grid layout state
         self.grid_rows = 3
         self.grid_cols = 3
@@ -159,6 +238,7 @@ class MavlinkPlotterGUI:
             self.grid_rows = int(self.rows_var.get())
             self.grid_cols = int(self.cols_var.get())
             self.plots_per_page = self.grid_rows * self.grid_cols
+            self.page_cache.invalidate()
 
             if self.all_plots_data:
                 self.total_pages = (len(self.all_plots_data) + self.plots_per_page - 1) // self.plots_per_page
@@ -173,6 +253,11 @@ class MavlinkPlotterGUI:
         if not msg_type or msg_type not in self.message_data:
             return
 
+        # Pages rendered from an older snapshot of this type are stale
+        if self.plot_sources.get(msg_type) is not self.message_data[msg_type]:
+            self.page_cache.invalidate(msg_type)
+            self.plot_sources[msg_type] = self.message_data[msg_type]
+        self.plot_type = msg_type
         self.all_plots_data = []
         for msg_id in sorted(self.message_data[msg_type].keys(), key=int):
             data = self.message_data[msg_type][msg_id]
@@ -201,33 +286,82 @@ class MavlinkPlotterGUI:
 
         self.plot_current_page()
 
-    def plot_current_page(self):
-        self.figure.clear()
-        start_idx = self.current_page * self.plots_per_page
+    def page_plots(self, page):
+        start_idx = page * self.plots_per_page
         end_idx = min(start_idx + self.plots_per_page, len(self.all_plots_data))
-        current_plots = self.all_plots_data[start_idx:end_idx]
-
-        fig_width = max(3 * self.grid_cols, 10)
-        fig_height = max(2 * self.grid_rows, 6)
-        self.figure.set_size_inches(fig_width, fig_height)
-
-        for i, plot_data in enumerate(current_plots):
-            ax = self.figure.add_subplot(self.grid_rows, self.grid_cols, i + 1)
-            ax.plot(plot_data['times'], plot_data['values'])
-            ax.set_title(f"{plot_data['field']} (ID {plot_data['msg_id']})", fontsize=8)
-            ax.set_xlabel("Time (s)", fontsize=8)
-            ax.set_ylabel(plot_data['field'], fontsize=8)
-            ax.tick_params(labelsize=6)
-            ax.grid(True)
-            ax.format_coord = lambda x, y: f'Time: {x:.2f}s, Value: {y:.2f}'
-
-        self.figure.tight_layout()
-        self.page_label.config(text=f"Page {self.current_page + 1}/{self.total_pages}")
-        self.prev_button["state"] = "normal" if self.current_page > 0 else "disabled"
-        self.next_button["state"] = "normal" if self.current_page < self.total_pages - 1 else "disabled"
-        self.canvas.mpl_connect('motion_notify_event', self.update_cursor_position)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().update_idletasks()
+        return self.all_plots_data[start_idx:end_idx]
+
+    def page_key(self, page):
+        return (self.plot_type, page, self.grid_rows, self.grid_cols,
+                int(self.figure.bbox.width), int(self.figure.bbox.height), self.decimate_var.get(),
+                tuple(self.axes_pool.subplot_params.values()))
+
+    def remove_cursor(self):
+        if self.sample_cursor is not None:
+            self.sample_cursor.remove()
+            self.sample_cursor = None
+
+    def on_canvas_resize(self, event):
+        # The canvas redraws itself next; fit the spacing to the new size first
+        if self.plot_lines:
+            self.axes_pool.layout()
+
+    def plot_current_page(self):
+        current_plots = self.page_plots(self.current_page)
+        with span('plot_page', sum(len(plot_data['times']) for plot_data in current_plots),
+                  f"{self.plot_type} {self.current_page + 1}/{self.total_pages}"):
+            self.remove_cursor()
+
+            fig_width = max(3 * self.grid_cols, 10)
+            fig_height = max(2 * self.grid_rows, 6)
+            self.figure.set_size_inches(fig_width, fig_height)
+
+            self.axes_pool.configure(self.grid_rows, self.grid_cols)
+            self.plot_lines = self.axes_pool.show(page_series(current_plots), self.decimate_var.get())
+            self.track_plotted([(self.plot_type, plot_data['msg_id'], plot_data['field']) for plot_data in current_plots])
+            self.sample_cursor = SampleCursor(
+                self.figure, self.blit, self.plot_lines, [plot_label(plot_data) for plot_data in current_plots])
+            self.page_label.config(text=f"Page {self.current_page + 1}/{self.total_pages}")
+            self.prev_button["state"] = "normal" if self.current_page > 0 else "disabled"
+            self.next_button["state"] = "normal" if self.current_page < self.total_pages - 1 else "disabled"
+            # A pre-rendered page was drawn with the pool's layout: only its pixels are needed
+            # (Live pages change all the time and are not cached)
+            key = self.page_key(self.current_page)
+            rendered = self.page_cache.get(key) if self.live_source is None else None
+            if rendered is not None and rendered.apply(self.axes_pool.axes(), self.canvas):
+                self.canvas.blit()
+                self.blit.capture()
+            else:
+                with span('draw'):
+                    self.canvas.draw()
+                if self.live_source is None:
+                    self.page_cache.put(key, capture_page(self.axes_pool, self.canvas))
+            self.canvas.get_tk_widget().update_idletasks()
+            if self.live_source is None:
+                self.prefetch_pages()
+
+    def prefetch_pages(self):
+        """Render the pages either side of the current one in the background"""
+        for page in (self.current_page + 1, self.current_page - 1):
+            if 0 <= page < self.total_pages:
+                self.page_cache.prefetch(self.page_key(page), self.page_plots(page), self.grid_rows, self.grid_cols,
+                                         tuple(self.figure.get_size_inches()), self.figure.dpi,
+                                         self.decimate_var.get(), self.axes_pool.subplot_params)
+
+    def track_plotted(self, keys):
+        """Remember the (type, instance, field) each line shows; live mode blits the lines"""
+        self.plotted = keys
+        self.plotted_start = self.start_time
+        for line in self.live_lines:
+            self.blit.release(line)
+        self.live_lines = []
+        if self.live_source is not None:
+            self.live_lines = [self.blit.add(line.line, under=True) for line in self.plot_lines]
+
+    def toggle_decimation(self):
+        for line in self.plot_lines:
+            line.set_enabled(self.decimate_var.get())
+        self.canvas.draw_idle()
 
     def prev_page(self):
         if self.current_page > 0:
@@ -240,6 +374,18 @@ class MavlinkPlotterGUI:
             self.plot_current_page()
             
     def update_cursor_position(self, event):
+        if event.inaxes and self.sample_cursor is not None and self.snap_var.get():
+            snapped = self.sample_cursor.move(event.inaxes, event.xdata)
+            if snapped is not None:
+                time, readings = snapped
+                values = ' | '.join(f'{label}: {value}' for label, value in readings)
+                self.cursor_label.config(text=f'Time: {time:.3f}s | {values}')
+                self.blit.update()
+                return
+
+        if self.sample_cursor is not None:
+            self.sample_cursor.hide()
+            self.blit.update()
         if event.inaxes:
             x, y = event.xdata, event.ydata
             if x is not None and y is not None:
@@ -247,6 +393,11 @@ class MavlinkPlotterGUI:
         else:
             self.cursor_label.config(text="")
 
+    def toggle_snap(self):
+        if self.sample_cursor is not None and not self.snap_var.get():
+            self.sample_cursor.hide()
+            self.blit.update()
+
 
     def export_xml(self):
         if self.export_all_mode:
@@ -261,43 +412,22 @@ class MavlinkPlotterGUI:
                 messagebox.showerror("Error", "No data available for selected message type.")
                 return
                 
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".xml",
-                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")],
-                title="Save XML File"
-            )
+            file_path, export_format = ask_export_path(self.master)
             if not file_path:
                 return
-                
-            root = ET.Element("MAVLinkData")
-            msg_element = ET.SubElement(root, "Message", type=msg_type)
-            
+
+            sections = []
             for msg_id in sorted(data_for_msg.keys(), key=int):
                 id_data = data_for_msg[msg_id]
                 times = id_data['times']
                 fields = id_data['data']
-                
+
                 # Validate field lengths
-                valid = True
-                for field in fields:
-                    if len(fields[field]) != len(times):
-                        valid = False
-                        break
-                if not valid:
+                if any(len(fields[field]) != len(times) for field in fields):
                     continue
-                
-                instance_element = ET.SubElement(msg_element, "Instance", ID=str(msg_id))
-                all_fields = sorted(fields.keys())
-                
-                for i in range(len(times)):
-                    record = ET.SubElement(instance_element, "Record")
-                    ET.SubElement(record, "Time").text = str(int(times[i]))
-                    for field in all_fields:
-                        safe_field = field.replace(' ', '_').replace('[', '').replace(']', '')
-                        ET.SubElement(record, safe_field).text = str(fields[field][i])
-            
-            tree = ET.ElementTree(root)
-            tree.write(file_path, encoding='utf-8', xml_declaration=True)
+                sections.append((msg_id, times, [(field, fields[field]) for field in sorted(fields.keys())]))
+            with span('export', sum(len(times) for _, times, _ in sections), export_format.key):
+                export_format.write(file_path, sections, msg_type)
             # messagebox.showinfo("Success", f"All data exported to:\n{file_path}")
             self.export_all_mode = False  # Reset flag
         else:
@@ -322,148 +452,352 @@ class MavlinkPlotterGUI:
                 messagebox.showerror("Error", f"Data length mismatch between time and {field}.")
                 return
                 
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".xml",
-                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")],
-                title="Save XML File"
-            )
+            file_path, export_format = ask_export_path(self.master)
             if not file_path:
                 return
-                
-            root = ET.Element("MAVLinkData")
-            for time, value in zip(times, values):
-                record = ET.SubElement(root, "Record")
-                ET.SubElement(record, "Time").text = str(int(time))
-                safe_field = field.replace(' ', '_').replace('[', '').replace(']', '')
-                ET.SubElement(record, safe_field).text = str(value)
-            
-            tree = ET.ElementTree(root)
-            tree.write(file_path, encoding='utf-8', xml_declaration=True)
+
+            with span('export', len(times), export_format.key):
+                export_format.write(file_path, [(None, times, [(field, values)])])
             messagebox.showinfo("Success", f"Data exported to:\n{file_path}")
 
     def load_log(self):
         self.export_all_mode = False  # Reset export mode
-        self.log_file = filedialog.askopenfilename(
+        log_file = filedialog.askopenfilename(
             title="Select MAVLink log file",
             filetypes=(("TLOG files", "*.tlog"), ("All files", "*.*")))
+        if log_file:
+            self.open_log(log_file)
+
+    def open_catalog(self):
+        CatalogBrowser(self.master, self.open_log)
+
+    def open_log(self, log_file):
+        self.export_all_mode = False
+        self.log_file = log_file
+        self.page_cache.invalidate()
+        self.plot_sources.clear()
         if self.log_file:
-            self.message_data.clear()
-            self.msg_combobox['values'] = self.get_message_types()
-            if self.msg_combobox['values']:
+            self.stop_live()
+            self.reset_log()
+            self.log_date_label.config(text="Log date: Loading...")
+
+            # Scan on a worker thread; types become selectable as they are found
+            index = self.log_index = LogIndex(self.log_file, shared_budget())
+            self.ingest_worker = IngestWorker(
+                self.master, index,
+                lambda progress, cancel_event: index.load(self.log_cache, progress, cancel_event),
+                on_progress=self.on_load_progress,
+                on_types=self.on_load_types,
+                on_done=self.on_load_done,
+                on_error=self.on_load_error,
+                on_cancelled=self.on_load_cancelled)
+            self.show_load_progress(True)
+            self.ingest_worker.start()
+
+    def reset_log(self):
+        """Stop loading the current log and empty the selectors"""
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel(notify=False)
+            self.ingest_worker = None
+        if self.decode_worker is not None:
+            self.decode_worker.cancel(notify=False)
+            self.decode_worker = None
+        self.show_load_progress(False)
+        self.message_data.clear()
+        self.field_index = None
+        self.pending_plot = None
+        self.update_search_matches()
+        self.msg_combobox['values'] = []
+        self.msg_combobox.set('')
+        self.id_combobox['values'] = []
+        self.id_combobox.set('')
+        self.field_combobox['values'] = []
+        self.field_combobox.set('')
+
+    def on_close(self):
+        # The launcher keeps running in the same process: stop every background thread first
+        self.stop_live()
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel(notify=False)
+        if self.decode_worker is not None:
+            self.decode_worker.cancel(notify=False)
+        self.page_cache.close()
+        self.master.destroy()
+
+    def toggle_live(self):
+        if self.live_source is not None:
+            self.stop_live()
+        else:
+            self.start_live()
+
+    def start_live(self):
+        endpoint = simpledialog.askstring(
+            "Live", "MAVLink endpoint (e.g. udpin:0.0.0.0:14550) or a tlog being written:",
+            initialvalue=DEFAULT_ENDPOINT, parent=self.master)
+        if not endpoint:
+            return
+        source = LiveSource(endpoint.strip())
+        try:
+            source.start()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open {endpoint}:\n{str(e)}")
+            return
+
+        self.export_all_mode = False
+        self.log_file = None
+        self.page_cache.invalidate()
+        self.plot_sources.clear()
+        self.reset_log()
+        self.live_source = self.log_index = source
+        self.live_instance_version = None
+        self.live_button.config(text="Stop Live")
+        self.log_date_label.config(text=f"Live: {source.endpoint} | waiting for messages")
+        self.master.after(1000 // LIVE_FPS, self.live_tick)
+
+    def stop_live(self):
+        """Stop receiving; the buffered samples stay selectable and plotted"""
+        if self.live_source is None:
+            return
+        self.live_source.stop()
+        self.live_source = None
+        for line in self.live_lines:
+            self.blit.release(line)
+        self.live_lines = []
+        self.live_button.config(text="Live")
+        self.canvas.draw_idle()
+
+    def live_tick(self):
+        source = self.live_source
+        if source is None:
+            return
+        if source.error is not None:
+            self.stop_live()
+            messagebox.showerror("Error", f"Live stream stopped:\n{str(source.error)}")
+            return
+
+        msg_types = source.message_types()
+        if len(msg_types) != len(self.msg_combobox['values']):
+            self.msg_combobox['values'] = msg_types
+            if not self.msg_combobox.get():
                 self.msg_combobox.current(0)
                 self.update_id_fields()
-                self.log_date_label.config(text="Log date: Not available")
+        # Rebuilt for new instances as well as new types (e.g. a second BATTERY_STATUS id)
+        if source.instance_version != self.live_instance_version:
+            self.live_instance_version = source.instance_version
+            self.field_index = FieldIndex(log_field_paths(source))
+            self.update_search_matches()
+
+        if self.live_lines:
+            stretched = False
+            for line, (msg_type, msg_id, field) in zip(self.plot_lines, self.plotted):
+                times, values = source.series(msg_type, msg_id, field, self.plotted_start)
+                line.set_series(times, values)
+                stretched |= follow_limits(line.ax, times, values)
+            # New limits need the axes redrawn; otherwise only the lines are blitted
+            if stretched:
+                self.canvas.draw_idle()
             else:
-                self.log_date_label.config(text="Log date: No valid data found")
-
-    def plot_data(self):
-        self.export_all_mode = False  # Reset export mode
-        msg_type = self.msg_combobox.get()
-        msg_id = self.id_combobox.get()
-        field = self.field_combobox.get()
-        
-        if not all([msg_type, msg_id, field]):
-            return
-        
-        data = self.message_data[msg_type][msg_id]
-        times = data['times']
-        values = data['data'].get(field, [])
-        
-        if len(times) != len(values):
-            print(f"Data length mismatch: times({len(times)}) vs values({len(values)})")
+                self.blit.update()
+        self.log_date_label.config(text=f"Live: {source.endpoint} | {source.messages} messages")
+        self.master.after(1000 // LIVE_FPS, self.live_tick)
+
+    def cancel_load(self):
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel()
+        if self.decode_worker is not None:
+            self.decode_worker.cancel()
+
+    def decode_type(self, msg_type):
+        """Decode one message type in the background; the selection is refreshed when it is done"""
+        if self.decode_worker is not None:
+            if self.decoding_type == msg_type:
+                return
+            self.decode_worker.cancel(notify=False)
+
+        index = self.log_index
+        self.decoding_type = msg_type
+        self.decode_worker = IngestWorker(
+            self.master, index,
+            lambda progress, cancel_event: index.decode_types([msg_type], progress, cancel_event),
+            on_progress=self.on_decode_progress,
+            on_done=self.on_decode_done,
+            on_error=self.on_decode_error,
+            on_cancelled=self.on_decode_cancelled)
+        self.show_load_progress(True)
+        self.decode_worker.start()
+
+    def show_load_progress(self, visible):
+        if visible:
+            self.progress_bar['value'] = 0
+            self.progress_label.config(text="")
+            self.progress_bar.pack(side='left', padx=5, before=self.trace_bar)
+            self.progress_label.pack(side='left', padx=5, before=self.trace_bar)
+            self.cancel_load_button.pack(side='left', padx=5, before=self.trace_bar)
+        else:
+            self.progress_bar.pack_forget()
+            self.progress_label.pack_forget()
+            self.cancel_load_button.pack_forget()
+
+    def on_load_progress(self, done, total):
+        self.progress_bar['value'] = 100 * done / total if total else 100
+        self.progress_label.config(text=f"{done / 1e6:.1f} / {total / 1e6:.1f} MB")
+
+    def on_decode_progress(self, done, total):
+        self.progress_bar['value'] = 100 * done / total if total else 100
+        self.progress_label.config(text=f"Decoding {self.decoding_type}: {done}/{total} messages")
+
+    def on_decode_done(self):
+        msg_type = self.decoding_type
+        self.decode_worker = None
+        self.decoding_type = None
+        self.show_load_progress(False)
+        if self.msg_combobox.get() == msg_type:
+            self.update_id_fields(keep_selection=True)
+        if self.pending_plot is not None and self.pending_plot[0] == msg_type:
+            pending, self.pending_plot = self.pending_plot, None
+            # Unless another field was picked meanwhile
+            if pending == (self.msg_combobox.get(), self.id_combobox.get(), self.field_combobox.get()):
+                self.plot_data()
+
+    def on_decode_error(self, error):
+        self.decode_worker = None
+        self.decoding_type = None
+        self.pending_plot = None
+        self.show_load_progress(False)
+        messagebox.showerror("Error", f"Failed to decode messages:\n{str(error)}")
+
+    def on_decode_cancelled(self):
+        self.decode_worker = None
+        self.decoding_type = None
+        self.pending_plot = None
+        self.show_load_progress(False)
+
+    def on_load_types(self, msg_types):
+        values = sorted(set(self.msg_combobox['values']) | set(msg_types))
+        self.msg_combobox['values'] = values
+        if not self.msg_combobox.get():
+            self.msg_combobox.current(0)
+            self.update_id_fields()
+
+    def on_load_done(self):
+        self.ingest_worker = None
+        self.show_load_progress(False)
+        # Drop snapshots taken while the log was still loading
+        self.message_data.clear()
+        self.field_index = FieldIndex(log_field_paths(self.log_index))
+        self.update_search_matches()
+        self.msg_combobox['values'] = self.get_message_types()
+        if self.msg_combobox['values']:
+            if self.msg_combobox.get() in self.msg_combobox['values']:
+                self.update_id_fields(keep_selection=True)
+            else:
+                self.msg_combobox.current(0)
+                self.update_id_fields()
+            self.log_date_label.config(text="Log date: Not available")
+        else:
+            self.log_date_label.config(text="Log date: No valid data found")
+
+    def on_load_error(self, error):
+        self.ingest_worker = None
+        self.log_index = None
+        self.show_load_progress(False)
+        self.log_date_label.config(text="Log date: Not loaded")
+        messagebox.showerror("Error", f"Failed to load log:\n{str(error)}")
+
+    def on_load_cancelled(self):
+        self.ingest_worker = None
+        self.log_index = None
+        self.message_data.clear()
+        self.show_load_progress(False)
+        self.msg_combobox['values'] = []
+        self.msg_combobox.set('')
+        self.id_combobox['values'] = []
+        self.id_combobox.set('')
+        self.field_combobox['values'] = []
+        self.field_combobox.set('')
+        self.log_date_label.config(text="Log date: Loading cancelled")
+
+    def update_search_matches(self):
+        query = self.search_var.get().strip()
+        if self.field_index is None or not query:
+            self.search_combobox['values'] = []
+            self.search_combobox.set('')
+            self.search_label.config(text="")
             return
-        
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(times, values)
-        ax.set_xlabel("Time (seconds from start)")
-        ax.set_ylabel(field)
-        ax.set_title(f"{msg_type} (ID {msg_id}) - {field}")
-        ax.grid(True)
-        self.figure.tight_layout()
-        self.canvas.draw()
+        matches = self.field_index.search(query)
+        self.search_combobox['values'] = ['/'.join(path) for path in matches[:SEARCH_SHOWN]]
+        self.search_combobox.set('')
+        shown = f" (first {SEARCH_SHOWN} listed)" if len(matches) > SEARCH_SHOWN else ""
+        self.search_label.config(text=f"{len(matches)} fields{shown}")
+
+    def select_search_match(self, event=None):
+        msg_type, msg_id, field = self.search_combobox.get().split('/')
+        self.msg_combobox.set(msg_type)
+        self.update_id_fields()
+        self.id_combobox.set(msg_id)
+        self.update_field_options()
+        self.field_combobox.set(field)
+        if msg_id in self.message_data.get(msg_type, {}):
+            self.pending_plot = None
+            self.plot_data()
+        else:
+            # Plotted by on_decode_done once the type is decoded
+            self.pending_plot = (msg_type, msg_id, field)
 
     def get_message_types(self):
-        mlog = mavutil.mavlink_connection(self.log_file)
-        message_types = set()
-        while True:
-            msg = mlog.recv_match(blocking=False)
-            if msg is None:
-                break
-            message_types.add(msg.get_type())
-        return sorted(message_types)
-
-    def update_id_fields(self, event=None):
+        if self.log_index is None:
+            return []
+        return self.log_index.message_types()
+
+    def update_id_fields(self, event=None, keep_selection=False):
         msg_type = self.msg_combobox.get()
-        if not msg_type:
+        if not msg_type or self.log_index is None:
             return
-        
-        # Parse all messages of this type
-        mlog = mavutil.mavlink_connection(self.log_file)
-        ids = set()
-        self.message_data[msg_type] = {}
-        self.start_time = None
-        
-        while True:
-            msg = mlog.recv_match(type=msg_type, blocking=False)
-            if msg is None:
-                break
-            
-            # Get timestamp from log
-            timestamp = msg._timestamp
-            if self.start_time is None:
-                self.start_time = timestamp
-                try:
-                    dt = datetime.fromtimestamp(self.start_time)
-                    self.log_date_label.config(text=f"Log date: {dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                except:
-                    self.log_date_label.config(text="Log date: Invalid timestamp")
-            
-            # Get ID if exists
-            msg_id = str(getattr(msg, 'id', '0'))
-            if msg_id not in self.message_data[msg_type]:
-                self.message_data[msg_type][msg_id] = {
-                    'times': [],
-                    'data': {}
-                }
-            
-            # Store relative time
-            rel_time = timestamp - self.start_time
-            self.message_data[msg_type][msg_id]['times'].append(rel_time)
-            
-            # Store fields
-            for field in msg._fieldnames:
-                if field in ['time_boot_ms', 'time_usec', 'id']:
-                    continue
-                
-                value = getattr(msg, field)
-                if isinstance(value, (list, tuple)):
-                    for idx, val in enumerate(value):
-                        if isinstance(val, (int, float)):
-                            field_name = f"{field}[{idx}]"
-                            if field_name not in self.message_data[msg_type][msg_id]['data']:
-                                self.message_data[msg_type][msg_id]['data'][field_name] = []
-                            self.message_data[msg_type][msg_id]['data'][field_name].append(val)
-                elif isinstance(value, (int, float)):
-                    if field not in self.message_data[msg_type][msg_id]['data']:
-                        self.message_data[msg_type][msg_id]['data'][field] = []
-                    self.message_data[msg_type][msg_id]['data'][field].append(value)
-            
-            ids.add(msg_id)
-        
+
+        self.start_time = self.log_index.type_start_times.get(msg_type)
+        if self.start_time is not None:
+            try:
+                dt = datetime.fromtimestamp(self.start_time)
+                self.log_date_label.config(text=f"Log date: {dt.strftime('%Y-%m-%d %H:%M:%S')}")
+            except:
+                self.log_date_label.config(text="Log date: Invalid timestamp")
+
+            if self.log_index.is_decoded(msg_type):
+                # While a log is still being parsed, take a fresh snapshot on every selection
+                if self.ingest_worker is not None or self.live_source is not None or msg_type not in self.message_data:
+                    self.message_data[msg_type] = self.log_index.type_data(msg_type, self.start_time)
+            elif self.ingest_worker is None:
+                self.decode_type(msg_type)
+
         # Update ID combobox
-        self.current_ids = sorted(ids, key=int)
+        previous_id = self.id_combobox.get()
+        self.current_ids = self.log_index.instance_ids(msg_type)
         self.id_combobox['values'] = self.current_ids
-        self.id_combobox.current(0 if self.current_ids else -1)
-        self.update_field_options()
+        if keep_selection and previous_id in self.current_ids:
+            self.id_combobox.set(previous_id)
+        else:
+            self.id_combobox.current(0 if self.current_ids else -1)
+        self.update_field_options(keep_selection=keep_selection)
 
-    def update_field_options(self, event=None):
+    def update_field_options(self, event=None, keep_selection=False):
         msg_type = self.msg_combobox.get()
         msg_id = self.id_combobox.get()
         
-        if msg_type and msg_id and msg_id in self.message_data.get(msg_type, {}):
+        if not (msg_type and msg_id):
+            return
+        if msg_id in self.message_data.get(msg_type, {}):
             fields = sorted(self.message_data[msg_type][msg_id]['data'].keys())
-            self.field_combobox['values'] = fields
+        elif self.log_index is not None:
+            # Not decoded yet: list the fields from the message definition
+            fields = self.log_index.field_names(msg_type, msg_id)
+        else:
+            return
+
+        previous_field = self.field_combobox.get()
+        self.field_combobox['values'] = fields
+        if keep_selection and previous_field in fields:
+            self.field_combobox.set(previous_field)
+        else:
             self.field_combobox.current(0 if fields else -1)
 
     def plot_data(self):
@@ -473,6 +807,8 @@ class MavlinkPlotterGUI:
         
         if not all([msg_type, msg_id, field]):
             return
+        if msg_id not in self.message_data.get(msg_type, {}):
+            return  # Still decoding
         
         data = self.message_data[msg_type][msg_id]
         times = data['times']
@@ -482,15 +818,17 @@ class MavlinkPlotterGUI:
             print(f"Data length mismatch: times({len(times)}) vs values({len(values)})")
             return
         
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(times, values)
-        ax.set_xlabel("Time (seconds from start)")
-        ax.set_ylabel(field)
-        ax.set_title(f"{msg_type} (ID {msg_id}) - {field}")
-        ax.grid(True)
-        self.figure.tight_layout()
-        self.canvas.draw()
+        with span('plot', len(times), f"{msg_type} {field}"):
+            self.remove_cursor()
+            self.axes_pool.configure(1, 1, compact=False)
+            self.plot_lines = self.axes_pool.show(
+                [dict(times=times, values=values, title=f"{msg_type} (ID {msg_id}) - {field}",
+                      xlabel="Time (seconds from start)", ylabel=field)],
+                self.decimate_var.get())
+            self.track_plotted([(msg_type, msg_id, field)])
+            self.sample_cursor = SampleCursor(self.figure, self.blit, self.plot_lines, [f"{field} (ID {msg_id})"])
+            with span('draw'):
+                self.canvas.draw()
 
 # if __name__ == "__main__":
 #     root = tk.Tk()
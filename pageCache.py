@@ -0,0 +1,254 @@
+import collections
+import threading
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from plotDecimation import DecimatedLine
+from spanTrace import span
+
+# Rendered "Plot All" pages kept in memory (a 5x5 page at 100 dpi is about 6 MB)
+PAGE_CACHE_PAGES = 8
+# Pages waiting to be pre-rendered; older requests are dropped
+PREFETCH_QUEUE = 4
+# Subplot spacing that tight_layout sets through subplots_adjust
+SUBPLOT_PARAMS = ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')
+
+
+def plot_label(plot_data):
+    return f"{plot_data['field']} (ID {plot_data['msg_id']})"
+
+
+class AxesPool:
+    """One Axes and DecimatedLine per cell of a grid, reused for every page and field shown.
+
+    Axes are only created (and the figure cleared) when the grid shape
+    changes; showing other data just replaces the lines' series, the labels
+    and the limits. tight_layout runs again only after a change of grid or
+    figure size, so paging keeps the spacing the first page settled on.
+    compact is the small-font style of "Plot All" pages.
+    """
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.shape = None
+        self.cells = []
+        self.subplot_params = None
+        self._size = None
+
+    def configure(self, rows, cols, compact=True):
+        """Make the figure a rows x cols grid of pooled axes"""
+        if (rows, cols, compact) == self.shape:
+            return
+        self.figure.clear()
+        fontsize = 8 if compact else None
+        self.cells = []
+        for i in range(rows * cols):
+            ax = self.figure.add_subplot(rows, cols, i + 1)
+            line = DecimatedLine(ax, [], [])
+            if compact:
+                ax.tick_params(labelsize=6)
+            ax.grid(True)
+            ax.format_coord = lambda x, y: f'Time: {x:.2f}s, Value: {y:.2f}'
+            self.cells.append((ax, line, fontsize))
+        self.shape = (rows, cols, compact)
+        self.subplot_params = None
+
+    def show(self, series, decimate, subplot_params=None):
+        """Show series (dicts of times, values, title, xlabel, ylabel) in the first cells, hide the rest.
+
+        Returns the DecimatedLines of the shown series. The spacing is
+        subplot_params when given, else the pool's current layout, else
+        tight_layout's.
+        """
+        size = tuple(self.figure.get_size_inches())
+        if size != self._size:
+            self._size = size
+            self.subplot_params = None
+        if subplot_params is not None:
+            self.subplot_params = dict(subplot_params)
+        # Known spacing goes first so the lines are decimated for their final widths
+        if self.subplot_params is not None:
+            self.figure.subplots_adjust(**self.subplot_params)
+
+        lines = []
+        with span('series') as series_span:
+            for i, (ax, line, fontsize) in enumerate(self.cells):
+                if i >= len(series):
+                    ax.set_visible(False)
+                    continue
+                data = series[i]
+                ax.set_visible(True)
+                line.enabled = decimate
+                line.set_series(data['times'], data['values'])
+                series_span.add(len(data['times']))
+                ax.set_title(data['title'], fontsize=fontsize)
+                ax.set_xlabel(data['xlabel'], fontsize=fontsize)
+                ax.set_ylabel(data['ylabel'], fontsize=fontsize)
+                ax.set_autoscale_on(True)
+                ax.relim()
+                ax.autoscale_view()
+                lines.append(line)
+        if self.subplot_params is None:
+            self.layout()
+        return lines
+
+    def layout(self):
+        """Fit the spacing to the shown labels and the figure size with tight_layout"""
+        self._size = tuple(self.figure.get_size_inches())
+        with span('tight_layout'):
+            self.figure.tight_layout()
+        params = self.figure.subplotpars
+        self.subplot_params = {name: getattr(params, name) for name in SUBPLOT_PARAMS}
+        # Decimate again for the axes widths tight_layout settled on
+        for ax, line, _ in self.cells:
+            if ax.get_visible():
+                line.reset()
+
+    def axes(self):
+        """The axes showing data"""
+        return [ax for ax, _, _ in self.cells if ax.get_visible()]
+
+
+def page_series(plots):
+    """AxesPool.show() series of the plots of a "Plot All" page"""
+    return [dict(times=plot_data['times'], values=plot_data['values'], title=plot_label(plot_data),
+                 xlabel="Time (s)", ylabel=plot_data['field']) for plot_data in plots]
+
+
+class RenderedPage:
+    """Pixels of a page drawn off screen, with the layout needed to put live axes over them"""
+
+    def __init__(self, image, subplot_params, limits):
+        self.image = image
+        self.subplot_params = subplot_params
+        self.limits = limits
+
+    def apply(self, axes, canvas):
+        """Give the axes (laid out with subplot_params) the rendered limits and show the pixels.
+
+        Returns False if the canvas is not the size the page was rendered at.
+        """
+        buffer = np.asarray(canvas.get_renderer().buffer_rgba())
+        if buffer.shape != self.image.shape:
+            return False
+        for ax, (xlim, ylim) in zip(axes, self.limits):
+            ax.set_xlim(xlim, auto=None)
+            ax.set_ylim(ylim, auto=None)
+        buffer[...] = self.image
+        canvas.figure.stale = False
+        return True
+
+
+def capture_page(pool, canvas):
+    """RenderedPage of what the canvas of a pool's figure last drew"""
+    return RenderedPage(
+        np.asarray(canvas.get_renderer().buffer_rgba()).copy(),
+        dict(pool.subplot_params),
+        [(ax.get_xlim(), ax.get_ylim()) for ax in pool.axes()])
+
+
+def render_page(plots, rows, cols, size_inches, dpi, decimate, subplot_params):
+    """Draw a page on a private Agg figure (safe off the Tk thread) and return it as a RenderedPage.
+
+    subplot_params are those of the live pool, so the pixels line up with its axes.
+    """
+    with span('render_page', sum(len(plot_data['times']) for plot_data in plots)):
+        figure = Figure(figsize=size_inches, dpi=dpi)
+        canvas = FigureCanvasAgg(figure)
+        pool = AxesPool(figure)
+        pool.configure(rows, cols)
+        pool.show(page_series(plots), decimate, subplot_params)
+        with span('draw'):
+            canvas.draw()
+        return capture_page(pool, canvas)
+
+
+class PageCache:
+    """Bounded LRU of rendered pages, filled ahead of time by a background thread.
+
+    Keys are (msg_type, page, rows, cols, width px, height px, decimate,
+    subplot params).
+    prefetch() queues pages to render; the newest requests are served first
+    and requests for pages already cached are dropped.
+    """
+
+    def __init__(self, max_pages=PAGE_CACHE_PAGES):
+        self.max_pages = max_pages
+        self._pages = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._wanted = collections.OrderedDict()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+        self._generation = 0
+        self._closed = False
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, key, page):
+        with self._lock:
+            self._put(key, page)
+
+    def _put(self, key, page):
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, msg_type=None):
+        """Drop the pending and cached pages of msg_type, or all of them"""
+        with self._lock:
+            self._generation += 1
+            for pages in (self._pages, self._wanted):
+                for key in [key for key in pages if msg_type is None or key[0] == msg_type]:
+                    del pages[key]
+
+    def prefetch(self, key, plots, rows, cols, size_inches, dpi, decimate, subplot_params):
+        """Queue a page for rendering on the background thread unless it is cached"""
+        with self._lock:
+            if key in self._pages:
+                return
+            self._wanted[key] = (plots, rows, cols, size_inches, dpi, decimate, subplot_params)
+            self._wanted.move_to_end(key, last=False)
+            while len(self._wanted) > PREFETCH_QUEUE:
+                self._wanted.popitem()
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def close(self):
+        """Drop every page and stop the background thread (the plotter window was closed)"""
+        with self._lock:
+            self._closed = True
+            self._generation += 1
+            self._pages.clear()
+            self._wanted.clear()
+            self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._wanted and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                key, args = self._wanted.popitem(last=False)
+                generation = self._generation
+            try:
+                page = render_page(*args)
+            except Exception as e:
+                print(f"Error pre-rendering page: {e}")
+                continue
+            with self._lock:
+                # Invalidated while rendering (grid or data changed): drop the result
+                if generation == self._generation:
+                    self._put(key, page)
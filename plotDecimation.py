@@ -0,0 +1,81 @@
+import numpy as np
+
+# Points drawn per horizontal pixel of the axes: the min and the max of the samples under it
+POINTS_PER_PIXEL = 2
+
+
+def envelope_indices(values, bins):
+    """Indices of the minimum and maximum of each of `bins` equal runs of values, in sample order.
+
+    The first and last samples are always included so the line spans the
+    same range as the full series.
+    """
+    count = len(values)
+    step = -(-count // bins)
+    whole = count - count % step
+    starts = np.arange(0, whole, step)
+    blocks = values[:whole].reshape(-1, step)
+    indices = [starts + blocks.argmin(axis=1), starts + blocks.argmax(axis=1), [0, count - 1]]
+    if whole < count:
+        tail = values[whole:]
+        indices.append([whole + tail.argmin(), whole + tail.argmax()])
+    return np.unique(np.concatenate(indices))
+
+
+def decimate(times, values, xlim, pixels, times_sorted=True):
+    """Return (times, values) reduced to at most about POINTS_PER_PIXEL points per pixel over xlim.
+
+    Only samples inside xlim (plus one on each side, so the line reaches the
+    edges) are considered; xlim None means the whole series.
+    """
+    start, end = 0, len(times)
+    if xlim is not None and times_sorted:
+        start = max(int(np.searchsorted(times, xlim[0], 'left')) - 1, 0)
+        end = min(int(np.searchsorted(times, xlim[1], 'right')) + 1, len(times))
+    if end - start <= POINTS_PER_PIXEL * pixels:
+        return times[start:end], values[start:end]
+    indices = start + envelope_indices(values[start:end], max(pixels, 1))
+    return times[indices], values[indices]
+
+
+class DecimatedLine:
+    """A Line2D that draws a decimated view of a full-resolution series.
+
+    The view is recomputed from the full columns whenever the axes' x limits
+    change (zoom stack, toolbar, set_xlim). With enabled False every sample
+    is drawn.
+    """
+
+    def __init__(self, ax, times, values, *args, enabled=True, **kwargs):
+        self.ax = ax
+        self.enabled = enabled
+        self._set_series(times, values)
+        self.line, = ax.plot(*self._view(None), *args, **kwargs)
+        ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    def _set_series(self, times, values):
+        self.times = np.asarray(times)
+        self.values = np.asarray(values)
+        self.times_sorted = len(self.times) < 2 or bool(np.all(self.times[1:] >= self.times[:-1]))
+
+    def set_series(self, times, values):
+        """Show another full-resolution series on the same line"""
+        self._set_series(times, values)
+        self.line.set_data(*self._view(None))
+
+    def _view(self, xlim):
+        if not self.enabled:
+            return self.times, self.values
+        pixels = int(self.ax.get_window_extent().width)
+        return decimate(self.times, self.values, xlim, pixels, self.times_sorted)
+
+    def _on_xlim_changed(self, ax):
+        self.line.set_data(*self._view(ax.get_xlim()))
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.line.set_data(*self._view(self.ax.get_xlim()))
+
+    def reset(self):
+        """Show the whole series again, e.g. before relim() and autoscale_view()"""
+        self.line.set_data(*self._view(None))
@@ -0,0 +1,208 @@
+import numpy as np
+from matplotlib.lines import Line2D
+from matplotlib.transforms import IdentityTransform, blended_transform_factory
+
+# Motion events are handled at most once per frame (about 60 Hz)
+FRAME_MS = 16
+
+
+class BlitManager:
+    """Redraws a few animated artists over a cached copy of the rest of the figure.
+
+    The background is captured after every full draw, so update() only costs
+    a restore, the overlay artists and a blit.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.artists = []
+        self._background = None
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add(self, artist, under=False):
+        """Animate artist; under draws it below the artists already added"""
+        artist.set_animated(True)
+        if under:
+            self.artists.insert(0, artist)
+        else:
+            self.artists.append(artist)
+        return artist
+
+    def release(self, artist):
+        """Stop animating an artist, leaving it in the figure to be drawn normally"""
+        if artist in self.artists:
+            self.artists.remove(artist)
+        artist.set_animated(False)
+
+    def remove(self, artist):
+        if artist in self.artists:
+            self.artists.remove(artist)
+            artist.remove()
+
+    def clear(self):
+        """Forget the overlay artists, e.g. before the figure is cleared"""
+        self.artists = []
+        self._background = None
+
+    def _on_draw(self, event):
+        self.capture()
+
+    def capture(self):
+        """Take the current canvas pixels as the background, e.g. after they were set without a draw"""
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
+
+    def update(self):
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class MotionThrottle:
+    """Passes only the latest motion_notify_event to handler, at most once every interval_ms"""
+
+    def __init__(self, canvas, handler, interval_ms=FRAME_MS):
+        self.widget = canvas.get_tk_widget()
+        self.handler = handler
+        self.interval_ms = interval_ms
+        self._event = None
+        self._scheduled = False
+        canvas.mpl_connect('motion_notify_event', self._on_motion)
+
+    def _on_motion(self, event):
+        self._event = event
+        if not self._scheduled:
+            self._scheduled = True
+            self.widget.after(self.interval_ms, self._fire)
+
+    def _fire(self):
+        self._scheduled = False
+        event, self._event = self._event, None
+        if event is not None and self.widget.winfo_exists():
+            self.handler(event)
+
+
+class Crosshair:
+    """Blitted cursor lines drawn in pixel coordinates, so they never affect axis limits"""
+
+    def __init__(self, figure, blit, horizontal=True, **line_kwargs):
+        line_kwargs.setdefault('color', 'gray')
+        line_kwargs.setdefault('linewidth', 0.8)
+        line_kwargs.setdefault('linestyle', ':')
+        self.blit = blit
+        self.vertical = self._add_line(figure, line_kwargs)
+        self.horizontal = self._add_line(figure, line_kwargs) if horizontal else None
+
+    def _add_line(self, figure, line_kwargs):
+        line = Line2D([], [], transform=IdentityTransform(), visible=False, **line_kwargs)
+        figure.add_artist(line)
+        return self.blit.add(line)
+
+    def move(self, x, y, ax):
+        """Place the lines through display point (x, y) of ax"""
+        bbox = ax.bbox
+        self.vertical.set_data([x, x], [bbox.y0, bbox.y1])
+        self.vertical.set_visible(True)
+        if self.horizontal is not None:
+            self.horizontal.set_data([bbox.x0, bbox.x1], [y, y])
+            self.horizontal.set_visible(True)
+
+    def hide(self):
+        self.vertical.set_visible(False)
+        if self.horizontal is not None:
+            self.horizontal.set_visible(False)
+
+
+def nearest_index(times, x, times_sorted=True):
+    """Index of the sample nearest time x: a binary search on sorted times, else a linear scan"""
+    if not len(times):
+        return None
+    if not times_sorted:
+        return int(np.abs(times - x).argmin())
+    idx = int(np.searchsorted(times, x))
+    if idx == 0:
+        return 0
+    if idx == len(times):
+        return idx - 1
+    return idx if times[idx] - x < x - times[idx - 1] else idx - 1
+
+
+class SampleCursor:
+    """Snaps to the recorded sample nearest the mouse and marks that instant on every axes.
+
+    series are DecimatedLines (full-resolution times and values plus their
+    axes); labels name them in the readout. Each axes gets a vertical line
+    at the snapped time and a marker on its own nearest sample. The values
+    are returned rather than drawn: text is by far the slowest artist to blit.
+    """
+
+    def __init__(self, figure, blit, series, labels, **line_kwargs):
+        line_kwargs.setdefault('color', 'gray')
+        line_kwargs.setdefault('linewidth', 0.8)
+        line_kwargs.setdefault('linestyle', ':')
+        self.blit = blit
+        self.series = series
+        self.labels = labels
+        self._overlays = []
+        for line in series:
+            ax = line.ax
+            vline = Line2D([], [], transform=blended_transform_factory(ax.transData, ax.transAxes),
+                           visible=False, clip_box=ax.bbox, **line_kwargs)
+            marker = Line2D([], [], transform=ax.transData, marker='o', markersize=4, color='red',
+                            visible=False, clip_box=ax.bbox)
+            for artist in (vline, marker):
+                figure.add_artist(artist)
+                blit.add(artist)
+            self._overlays.append((vline, marker))
+
+    def move(self, ax, x):
+        """Snap to the sample of the series in ax nearest time x and update every axes.
+
+        Returns (snapped time, [(label, value) of every series at that time])
+        with the series in ax first, or None if ax has no series.
+        """
+        hovered = next((i for i, line in enumerate(self.series) if line.ax is ax), None)
+        if hovered is None or x is None:
+            return None
+        line = self.series[hovered]
+        idx = nearest_index(line.times, x, line.times_sorted)
+        if idx is None:
+            return None
+        snapped = float(line.times[idx])
+
+        readings = []
+        for i, (line, (vline, marker)) in enumerate(zip(self.series, self._overlays)):
+            vline.set_data([snapped, snapped], [0, 1])
+            vline.set_visible(True)
+            j = idx if i == hovered else nearest_index(line.times, snapped, line.times_sorted)
+            if j is None:
+                continue
+            value = line.values[j].item()
+            marker.set_data([line.times[j]], [value])
+            marker.set_visible(True)
+            reading = (self.labels[i], value)
+            if i == hovered:
+                readings.insert(0, reading)
+            else:
+                readings.append(reading)
+        return snapped, readings
+
+    def hide(self):
+        for overlay in self._overlays:
+            for artist in overlay:
+                artist.set_visible(False)
+
+    def remove(self):
+        """Take the overlays off the figure, e.g. before its axes show other series"""
+        for overlay in self._overlays:
+            for artist in overlay:
+                self.blit.remove(artist)
+        self._overlays = []
@@ -0,0 +1,67 @@
+import numpy as np
+
+from timeAlign import align
+
+
+def parse_selection(paths):
+    """Split 'TYPE/instance/field' paths (the favorite file format) into tuples, skipping malformed ones"""
+    selection = []
+    for path in paths:
+        parts = path.split('/') if isinstance(path, str) else []
+        if len(parts) == 3:
+            selection.append(tuple(parts))
+    return selection
+
+
+def selection_section(message_data, selection, mode=None, rate=None):
+    """(times, columns, exact_times) of selected (type, instance, field)s, for ExportFormat.write.
+
+    With mode None the fields are written side by side by row index, up to
+    the shortest, under the times of the last selected instance (the
+    exporter's original layout). Otherwise they are put on one timeline by
+    timeAlign.align and named TYPE.instance.field. Fields absent from the
+    log are skipped; raises ValueError when nothing is left.
+    """
+    if mode is not None:
+        series = []
+        for msg_type, instance_id, field in selection:
+            data = message_data.get(msg_type, {}).get(instance_id)
+            if data is None or field not in data['data']:
+                continue  # Listed by the message definition but absent from the log
+            series.append((f"{msg_type}.{instance_id}.{field}", data['times'], data['data'][field]))
+        if not series:
+            raise ValueError("No data available for the selected fields")
+        timeline, columns = align(series, mode, rate)
+        if not len(timeline):
+            raise ValueError("The selected fields do not overlap in time")
+        return timeline, columns, True
+
+    field_data = {}
+    min_length = float('inf')
+    last = None
+    for msg_type, instance_id, field in selection:
+        data = message_data.get(msg_type, {}).get(instance_id)
+        if data is None:
+            continue
+        last = data
+        if field not in data['data']:
+            continue  # Listed by the message definition but absent from the log
+        field_data[field] = data['data'][field]
+        min_length = min(min_length, len(data['times']))
+    if not field_data:
+        raise ValueError("No data available for the selected fields")
+    columns = [(field, values[:min_length]) for field, values in field_data.items()]
+    return last['times'][:min_length], columns, False
+
+
+def clip_section(times, columns, start=None, end=None):
+    """Keep only the rows with start <= time <= end (either bound may be None)"""
+    if start is None and end is None:
+        return times, columns
+    times = np.asarray(times)
+    keep = np.ones(len(times), dtype=bool)
+    if start is not None:
+        keep &= times >= start
+    if end is not None:
+        keep &= times <= end
+    return times[keep], [(name, np.asarray(values)[keep]) for name, values in columns]
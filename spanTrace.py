@@ -0,0 +1,188 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# Spans kept for the trace file; the oldest are dropped
+MAX_SPANS = 200000
+# Top-level spans (and their breakdowns) kept for the status bar
+LATEST_SPANS = 3
+TRACE_ENABLED = os.environ.get('MAVLINK_TRACE', '') not in ('', '0')
+
+
+class _NoSpan:
+    """What span() returns while tracing is off: entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, count):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed stage; count is the samples (messages, frames, rows...) it handled"""
+
+    __slots__ = ('tracer', 'name', 'detail', 'count', 'start', 'children')
+
+    def __init__(self, tracer, name, count=None, detail=None):
+        self.tracer = tracer
+        self.name = name
+        self.detail = detail
+        self.count = count
+        self.children = None
+
+    def add(self, count):
+        self.count = (self.count or 0) + count
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._finish(self, time.perf_counter_ns())
+        return False
+
+    @property
+    def label(self):
+        return f"{self.name} {self.detail}" if self.detail else self.name
+
+
+class SpanSummary:
+    """A finished top-level span with the time its direct children took, by name"""
+
+    def __init__(self, label, seconds, count, children):
+        self.label = label
+        self.seconds = seconds
+        self.count = count
+        self.children = children
+
+    def __str__(self):
+        text = f"{self.label} {format_seconds(self.seconds)}"
+        if self.count is not None:
+            text += f" ({format_count(self.count)})"
+        # Only the children that took a noticeable share of the time
+        parts = [f"{name} {format_seconds(seconds)}" for name, seconds in
+                 sorted(self.children.items(), key=lambda item: -item[1]) if seconds >= 0.05 * self.seconds]
+        if parts:
+            text += f" [{', '.join(parts[:3])}]"
+        return text
+
+
+def format_seconds(seconds):
+    return f"{seconds:.2f} s" if seconds >= 1 else f"{seconds * 1000:.0f} ms"
+
+
+def format_count(count):
+    if count >= 1e6:
+        return f"{count / 1e6:.1f}M"
+    if count >= 1e4:
+        return f"{count / 1e3:.0f}k"
+    return str(count)
+
+
+class Tracer:
+    """Collects the spans of all threads while enabled.
+
+    Spans nest on a thread; when a top-level one ends it is kept with the
+    time spent in each kind of child, for the status bars. Every span is
+    also kept (up to max_spans) for export as a Chrome trace.
+    """
+
+    def __init__(self, enabled=TRACE_ENABLED, max_spans=MAX_SPANS):
+        self.enabled = enabled
+        self.generation = 0
+        self._spans = collections.deque(maxlen=max_spans)
+        self._latest = collections.OrderedDict()
+        self._threads = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name, count=None, detail=None):
+        """Context manager timing a stage; a shared no-op one while tracing is off"""
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, count, detail)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span, end):
+        stack = self._stack()
+        stack.pop()
+        duration = end - span.start
+        ident = threading.get_ident()
+        with self._lock:
+            self._spans.append((span.name, span.detail, span.start, duration, ident, span.count))
+            if ident not in self._threads:
+                self._threads[ident] = threading.current_thread().name
+            if stack:
+                parent = stack[-1]
+                if parent.children is None:
+                    parent.children = {}
+                parent.children[span.name] = parent.children.get(span.name, 0) + duration
+            else:
+                children = {name: nanoseconds * 1e-9 for name, nanoseconds in (span.children or {}).items()}
+                self._latest.pop(span.name, None)
+                self._latest[span.name] = SpanSummary(span.label, duration * 1e-9, span.count, children)
+                while len(self._latest) > LATEST_SPANS:
+                    self._latest.popitem(last=False)
+            self.generation += 1
+
+    def latest(self):
+        """SpanSummaries of the most recent top-level spans, oldest first"""
+        with self._lock:
+            return list(self._latest.values())
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._latest.clear()
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._spans)
+
+    def chrome_trace(self):
+        """The spans as a Chrome trace (chrome://tracing, Perfetto): complete events in microseconds"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+            threads = dict(self._threads)
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in threads.items()]
+        for name, detail, start, duration, tid, count in spans:
+            args = {}
+            if detail is not None:
+                args['detail'] = detail
+            if count is not None:
+                args['count'] = count
+            events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (start - self._origin) / 1000, 'dur': duration / 1000, 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+tracer = Tracer()
+
+
+def span(name, count=None, detail=None):
+    """tracer.span: time a stage of loading, plotting or exporting"""
+    return tracer.span(name, count, detail)
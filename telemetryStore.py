@@ -0,0 +1,156 @@
+import numpy as np
+
+# MAVLink field types and the array dtype used to store them
+MAVLINK_DTYPES = {
+    'float': np.float32,
+    'double': np.float64,
+    'int8_t': np.int8,
+    'uint8_t': np.uint8,
+    'uint8_t_mavlink_version': np.uint8,
+    'int16_t': np.int16,
+    'uint16_t': np.uint16,
+    'int32_t': np.int32,
+    'uint32_t': np.uint32,
+    'int64_t': np.int64,
+    'uint64_t': np.uint64,
+}
+
+
+def field_dtypes(msg):
+    """Map each field name of a pymavlink message to its column dtype"""
+    names = getattr(msg, 'fieldnames', None) or []
+    types = getattr(msg, 'fieldtypes', None) or []
+    return {name: MAVLINK_DTYPES.get(ftype, np.float64) for name, ftype in zip(names, types)}
+
+
+class Column:
+    """Contiguous typed array with amortised O(1) append"""
+
+    def __init__(self, dtype, capacity=256):
+        self._buffer = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    @classmethod
+    def from_array(cls, array):
+        """Wrap an existing (possibly memory-mapped) array without copying it"""
+        column = cls.__new__(cls)
+        column._buffer = array
+        column._size = len(array)
+        return column
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    def append(self, value):
+        if self._size == len(self._buffer):
+            self._reserve(self._size + 1)
+        self._buffer[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._buffer.dtype)
+        end = self._size + len(values)
+        if end > len(self._buffer):
+            self._reserve(end)
+        self._buffer[self._size:end] = values
+        self._size = end
+
+    def _reserve(self, needed):
+        capacity = max(needed, len(self._buffer) * 2, 256)
+        buffer = np.empty(capacity, dtype=self._buffer.dtype)
+        buffer[:self._size] = self._buffer[:self._size]
+        self._buffer = buffer
+
+    def trim(self):
+        # Drop the growth slack once ingest is finished
+        if len(self._buffer) != self._size:
+            self._buffer = self._buffer[:self._size].copy()
+
+    def view(self):
+        return self._buffer[:self._size]
+
+
+class InstanceColumns:
+    """Timestamps plus one column per field for a single (type, instance)"""
+
+    def __init__(self):
+        self.times = Column(np.float64)
+        self.fields = {}
+
+    def column(self, field, dtype):
+        column = self.fields.get(field)
+        if column is None:
+            column = self.fields[field] = Column(dtype)
+        return column
+
+    def trim(self):
+        self.times.trim()
+        for column in self.fields.values():
+            column.trim()
+
+    def as_dict(self, start_time=0.0):
+        """Plot/export layout: {'times': relative times, 'data': {field: array view}}"""
+        # Fields are clipped to the timestamp count so a snapshot taken while
+        # the log is still loading stays consistent
+        times = self.times.view()
+        count = len(times)
+        return {
+            'times': times - start_time,
+            'data': {field: column.view()[:count] for field, column in list(self.fields.items())}
+        }
+
+
+class TelemetryStore:
+    """Columnar storage of decoded telemetry keyed by message type and instance id"""
+
+    def __init__(self):
+        self.types = {}
+
+    def __contains__(self, msg_type):
+        return msg_type in self.types
+
+    def instance(self, msg_type, msg_id):
+        instances = self.types.get(msg_type)
+        if instances is None:
+            instances = self.types[msg_type] = {}
+        columns = instances.get(msg_id)
+        if columns is None:
+            columns = instances[msg_id] = self._new_instance()
+        return columns
+
+    def _new_instance(self):
+        return InstanceColumns()
+
+    def message_types(self):
+        return sorted(self.types)
+
+    def instance_ids(self, msg_type):
+        return sorted(self.types.get(msg_type, {}), key=int)
+
+    def trim(self):
+        for instances in self.types.values():
+            for columns in instances.values():
+                columns.trim()
+
+    def columns(self):
+        """Yield ((type, id, field), array) for every column; the timestamp column has field None"""
+        for msg_type, instances in self.types.items():
+            for msg_id, columns in instances.items():
+                yield (msg_type, msg_id, None), columns.times.view()
+                for field, column in columns.fields.items():
+                    yield (msg_type, msg_id, field), column.view()
+
+    @classmethod
+    def from_columns(cls, columns):
+        store = cls()
+        for (msg_type, msg_id, field), array in columns.items():
+            instance = store.instance(msg_type, msg_id)
+            if field is None:
+                instance.times = Column.from_array(array)
+            else:
+                instance.fields[field] = Column.from_array(array)
+        return store
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Ways of putting fields recorded at different instants on one timeline
+ALIGN_MERGE = 'merge'
+ALIGN_PREVIOUS = 'previous'
+ALIGN_NEAREST = 'nearest'
+ALIGN_RESAMPLE = 'resample'
+ALIGN_MODES = (ALIGN_MERGE, ALIGN_PREVIOUS, ALIGN_NEAREST, ALIGN_RESAMPLE)
+
+
+def previous_indices(times, timeline):
+    """Index of the last sample at or before each timeline instant (-1 if there is none)"""
+    return np.searchsorted(times, timeline, 'right') - 1
+
+
+def nearest_indices(times, timeline):
+    """Index of the sample nearest each timeline instant; ties go to the earlier sample"""
+    if len(times) == 1:
+        return np.zeros(len(timeline), dtype=np.intp)
+    after = np.clip(np.searchsorted(times, timeline, 'left'), 1, len(times) - 1)
+    before = after - 1
+    use_after = times[after] - timeline < timeline - times[before]
+    return np.where(use_after, after, before)
+
+
+def align(series, mode, rate=None):
+    """Put series [(name, times, values)] on one timeline.
+
+    merge: every timestamp of every series, each field holding its latest sample
+    previous / nearest: the timestamps of the densest series, each field taking
+        its latest or nearest sample
+    resample: rate samples per second, linearly interpolated
+
+    Rows before every field has a sample (and, for resample, after any has
+    ended) are dropped so no value is invented. Returns (timeline,
+    [(name, values)]); values keep their dtype except when resampled, which
+    gives float64.
+    """
+    if mode not in ALIGN_MODES:
+        raise ValueError(f"Unknown alignment: {mode}")
+
+    # Fields of one instance share their times array: sort and index it once
+    clocks = {}
+    prepared = []
+    for name, times, values in series:
+        clock = clocks.get(id(times))
+        if clock is None:
+            sorted_times = np.asarray(times, dtype=np.float64)
+            order = None
+            if len(sorted_times) > 1 and np.any(sorted_times[1:] < sorted_times[:-1]):
+                order = np.argsort(sorted_times, kind='stable')
+                sorted_times = sorted_times[order]
+            clock = clocks[id(times)] = [times, sorted_times, order, None]
+        values = np.asarray(values)
+        prepared.append((name, clock, values[clock[2]] if clock[2] is not None else values))
+
+    sorted_clocks = [clock[1] for clock in clocks.values()]
+    if not prepared or any(len(times) == 0 for times in sorted_clocks):
+        return np.empty(0), [(name, values[:0]) for name, _, values in prepared]
+    start = max(times[0] for times in sorted_clocks)
+
+    if mode == ALIGN_RESAMPLE:
+        if not rate or rate <= 0:
+            raise ValueError("Resampling needs a rate above zero")
+        end = min(times[-1] for times in sorted_clocks)
+        count = int(np.floor((end - start) * rate + 1e-9)) + 1 if end >= start else 0
+        timeline = start + np.arange(count) / rate
+        return timeline, [(name, np.interp(timeline, clock[1], values.astype(np.float64)))
+                          for name, clock, values in prepared]
+
+    if mode == ALIGN_MERGE:
+        timeline = np.unique(np.concatenate(sorted_clocks))
+    else:
+        timeline = max(sorted_clocks, key=len)
+    timeline = timeline[np.searchsorted(timeline, start, 'left'):]
+
+    find = nearest_indices if mode == ALIGN_NEAREST else previous_indices
+    columns = []
+    for name, clock, values in prepared:
+        if clock[3] is None:
+            clock[3] = find(clock[1], timeline)
+        columns.append((name, values[clock[3]]))
+    return timeline, columns
@@ -0,0 +1,226 @@
+import os
+import re
+import struct
+from array import array
+
+from pymavlink import mavutil
+
+# A tlog is a sequence of frames: big-endian uint64 microsecond timestamp + one MAVLink packet
+TIMESTAMP = struct.Struct('>Q')
+TIMESTAMP_LEN = 8
+MARKER_V1 = 0xFE
+MARKER_V2 = 0xFD
+HEADER_LEN_V1 = 6
+HEADER_LEN_V2 = 10
+CRC_LEN = 2
+SIGNATURE_LEN = 13
+
+# Timestamps further than this from the first frame of the log are treated as garbage
+MAX_TIMESTAMP_SPREAD = 30 * 24 * 60 * 60 * 1000000
+RESYNC_WINDOW = 64 * 1024
+# Frames that must chain correctly after a candidate before it is accepted as a boundary
+RESYNC_CONFIRM = 2
+# Frames scanned between progress reports and cancellation checks
+SCAN_REPORT_INTERVAL = 20000
+
+FORMAT_TOKEN = re.compile(r'(\d*)([a-zA-Z?])')
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+def select_dialect(first_marker):
+    """Switch pymavlink to MAVLink 2 the way mavfile does when a log starts with a v2 frame"""
+    if first_marker == MARKER_V2 and mavutil.mavlink.WIRE_PROTOCOL_VERSION != "2.0":
+        os.environ['MAVLINK20'] = '1'
+        mavutil.set_dialect(mavutil.current_dialect)
+    return mavutil.mavlink
+
+
+def type_name(msgid):
+    msg_class = mavutil.mavlink.mavlink_map.get(msgid)
+    return msg_class.msgname if msg_class is not None else f"UNKNOWN_{msgid}"
+
+
+def instance_layout(msg_class):
+    """(payload offset, Struct) of a message's scalar 'id' field, or None if it has none"""
+    if 'id' not in msg_class.ordered_fieldnames:
+        return None
+    offset = 0
+    tokens = FORMAT_TOKEN.findall(msg_class.unpacker.format.lstrip('<>=!@'))
+    for name, (count, code) in zip(msg_class.ordered_fieldnames, tokens):
+        fmt = '<' + count + code
+        if name == 'id':
+            return (offset, struct.Struct(fmt)) if count in ('', '1') and code != 's' else None
+        offset += struct.calcsize(fmt)
+    return None
+
+
+def frame_length(buf, pos):
+    """Length of the frame starting at pos, or None if no MAVLink header follows the timestamp there"""
+    if pos + TIMESTAMP_LEN + HEADER_LEN_V1 > len(buf):
+        return None
+    marker = buf[pos + TIMESTAMP_LEN]
+    payload_len = buf[pos + TIMESTAMP_LEN + 1]
+    if marker == MARKER_V1:
+        return TIMESTAMP_LEN + HEADER_LEN_V1 + payload_len + CRC_LEN
+    if marker == MARKER_V2:
+        if pos + TIMESTAMP_LEN + HEADER_LEN_V2 > len(buf):
+            return None
+        length = TIMESTAMP_LEN + HEADER_LEN_V2 + payload_len + CRC_LEN
+        if buf[pos + TIMESTAMP_LEN + 2] & 0x01:
+            length += SIGNATURE_LEN
+        return length
+    return None
+
+
+def frame_msgid(buf, pos):
+    packet = pos + TIMESTAMP_LEN
+    if buf[packet] == MARKER_V1:
+        return buf[packet + 5]
+    return buf[packet + 7] | (buf[packet + 8] << 8) | (buf[packet + 9] << 16)
+
+
+def frame_crc_ok(buf, pos, length):
+    """Check the packet CRC (including the message's CRC_EXTRA) of a complete frame"""
+    mavlink = mavutil.mavlink
+    msg_class = mavlink.mavlink_map.get(frame_msgid(buf, pos))
+    if msg_class is None:
+        return False
+    packet = pos + TIMESTAMP_LEN
+    header_len = HEADER_LEN_V1 if buf[packet] == MARKER_V1 else HEADER_LEN_V2
+    crc_pos = packet + header_len + buf[packet + 1]
+    crc = mavlink.x25crc(bytes(buf[packet + 1:crc_pos]))
+    crc.accumulate(bytes([msg_class.crc_extra]))
+    return crc.crc == buf[crc_pos] | (buf[crc_pos + 1] << 8)
+
+
+def first_frame(buf):
+    """Return (timestamp, marker) of the first frame of a tlog buffer, or None if it is empty"""
+    if len(buf) < TIMESTAMP_LEN + 1:
+        return None
+    return TIMESTAMP.unpack_from(buf, 0)[0], buf[TIMESTAMP_LEN]
+
+
+def find_frame_start(buf, offset, limit, reference_usec):
+    """Find the first frame boundary at or after offset (and before limit) of a tlog buffer.
+
+    A candidate needs a plausible timestamp, a valid CRC and RESYNC_CONFIRM
+    further frames chaining on from it. Returns limit if none is found.
+    """
+    while offset < limit:
+        window = buf[offset:offset + RESYNC_WINDOW + 2 * 1024]
+        if not window:
+            return limit
+        window_end = min(len(window), RESYNC_WINDOW, limit - offset)
+
+        for pos in range(window_end):
+            if _frame_chain_ok(window, pos, reference_usec):
+                return offset + pos
+        offset += window_end
+    return limit
+
+
+def _frame_chain_ok(buf, pos, reference_usec):
+    for _ in range(RESYNC_CONFIRM + 1):
+        length = frame_length(buf, pos)
+        if length is None:
+            return False
+        if pos + length > len(buf):
+            # Ran off the end of the read window (or the file): accept what has been checked
+            return True
+        usec = TIMESTAMP.unpack_from(buf, pos)[0]
+        if abs(usec - reference_usec) > MAX_TIMESTAMP_SPREAD or not frame_crc_ok(buf, pos, length):
+            return False
+        pos += length
+        if pos == len(buf):
+            return True
+    return True
+
+
+def split_ranges(buf, count):
+    """Split a tlog buffer into at most count byte ranges that each start on a frame boundary"""
+    first = first_frame(buf)
+    if first is None:
+        return []
+    size = len(buf)
+    reference_usec = first[0]
+
+    starts = [0]
+    for i in range(1, count):
+        nominal = size * i // count
+        if nominal <= starts[-1]:
+            continue
+        start = find_frame_start(buf, nominal, size, reference_usec)
+        if start > starts[-1] and start < size:
+            starts.append(start)
+
+    ends = starts[1:] + [size]
+    return list(zip(starts, ends))
+
+
+def scan_frames(buf, start, end, reference_usec, frames, first_usec, report=None, cancel_event=None):
+    """Header-only pass over the frames starting in [start, end) of a tlog buffer.
+
+    Appends each frame offset to frames[(msgid, instance id)] and records the
+    first timestamp of every msgid in first_usec. Payloads are not decoded;
+    only messages with an 'id' field have it read to key their instances.
+    """
+    mavlink = mavutil.mavlink
+    layouts = {}
+    size = len(buf)
+    unpack_timestamp = TIMESTAMP.unpack_from
+    pos = start
+    count = 0
+
+    while pos < end:
+        length = frame_length(buf, pos)
+        if length is None:
+            # Not on a frame boundary: corrupt bytes, skip to the next good frame
+            pos = find_frame_start(buf, pos + 1, end, reference_usec)
+            continue
+        if pos + length > size:
+            break  # truncated final frame
+
+        count += 1
+        if count % SCAN_REPORT_INTERVAL == 0:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ScanCancelled()
+            if report is not None:
+                report(pos)
+
+        msgid = frame_msgid(buf, pos)
+        layout = layouts.get(msgid)
+        if layout is None:
+            msg_class = mavlink.mavlink_map.get(msgid)
+            if msg_class is None:
+                # Decoded as MAVLink_unknown, whose id is always 0
+                layout = layouts[msgid] = ('0', None)
+            else:
+                layout = layouts[msgid] = (str(msgid), instance_layout(msg_class))
+
+        instance, field_layout = layout
+        if field_layout is not None:
+            field_offset, field_struct = field_layout
+            header_len = HEADER_LEN_V1 if buf[pos + TIMESTAMP_LEN] == MARKER_V1 else HEADER_LEN_V2
+            payload = pos + TIMESTAMP_LEN + header_len
+            available = max(0, min(field_struct.size, buf[pos + TIMESTAMP_LEN + 1] - field_offset))
+            # MAVLink 2 drops trailing zero bytes from the payload
+            raw = bytes(buf[payload + field_offset:payload + field_offset + available])
+            instance = str(field_struct.unpack(raw.ljust(field_struct.size, b'\0'))[0])
+
+        key = (msgid, instance)
+        offsets = frames.get(key)
+        if offsets is None:
+            # A corrupt header must not invent a type or instance: CRC-check the first frame of each key
+            if msgid in mavlink.mavlink_map and not frame_crc_ok(buf, pos, length):
+                pos = find_frame_start(buf, pos + 1, end, reference_usec)
+                continue
+            offsets = frames[key] = array('q')
+            if msgid not in first_usec:
+                first_usec[msgid] = unpack_timestamp(buf, pos)[0]
+        offsets.append(pos)
+        pos += length
+
+    return frames, first_usec
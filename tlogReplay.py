@@ -0,0 +1,91 @@
+import argparse
+import socket
+import sys
+import threading
+import time
+
+from pymavlink import mavutil
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 14550
+
+
+def replay(log_file, address, speed=1.0, loop=False, cancel_event=None, progress=None):
+    """Send the messages of a tlog as UDP datagrams to address, paced by their timestamps.
+
+    speed scales the pace (2 is twice as fast, 0 sends as fast as possible).
+    progress(messages_sent) is called about once a second. Returns the
+    number of messages sent.
+    """
+    cancel_event = cancel_event or threading.Event()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    reported = time.monotonic()
+    try:
+        while not cancel_event.is_set():
+            mlog = mavutil.mavlink_connection(log_file)
+            first_time = None
+            started = time.monotonic()
+            try:
+                while not cancel_event.is_set():
+                    msg = mlog.recv_match(blocking=False)
+                    if msg is None:
+                        break
+                    if msg.get_type() == 'BAD_DATA':
+                        continue
+                    if first_time is None:
+                        first_time = msg._timestamp
+                    if speed > 0:
+                        delay = (msg._timestamp - first_time) / speed - (time.monotonic() - started)
+                        if delay > 0 and cancel_event.wait(delay):
+                            break
+                    sock.sendto(msg.get_msgbuf(), address)
+                    sent += 1
+                    if progress is not None and time.monotonic() - reported >= 1:
+                        reported = time.monotonic()
+                        progress(sent)
+            finally:
+                mlog.close()
+            if not loop or first_time is None:
+                break
+    finally:
+        sock.close()
+    return sent
+
+
+def main(argv=None):
+    """main.py replay LOG [--host HOST] [--port PORT] [--speed X] [--loop]"""
+    import os
+
+    from exportCli import EXIT_BAD_INPUT, EXIT_FAILURE, EXIT_INTERRUPTED, EXIT_OK, emit
+
+    parser = argparse.ArgumentParser(prog='main.py replay',
+                                     description="Replay a tlog over UDP in real time, e.g. to try the plotter's live mode.")
+    parser.add_argument('log', help="tlog to replay")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"destination address (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"destination UDP port (default: {DEFAULT_PORT})")
+    parser.add_argument('--speed', type=float, default=1.0, help="playback speed factor; 0 sends as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="start over at the end of the log")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.log):
+        emit('error', message=f"Log file not found: {args.log}")
+        return EXIT_BAD_INPUT
+    cancel_event = threading.Event()
+    started = time.perf_counter()
+    try:
+        sent = replay(args.log, (args.host, args.port), args.speed, args.loop, cancel_event,
+                      lambda count: emit('progress', stage='replay', sent=count))
+    except KeyboardInterrupt:
+        cancel_event.set()
+        emit('error', message="Interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit('error', message=f"{type(e).__name__}: {e}")
+        return EXIT_FAILURE
+    emit('done', sent=sent, seconds=round(time.perf_counter() - started, 3))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
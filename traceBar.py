@@ -0,0 +1,72 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from spanTrace import tracer
+
+# How often the shown timings are refreshed (ms)
+REFRESH_MS = 500
+
+
+class TraceBar(ttk.Frame):
+    """Status bar part with the timings switch, the latest span timings and "Save Trace".
+
+    The tracer is shared by every window of the process; each bar follows
+    its state, so switching timings on in one window shows them in all.
+    """
+
+    def __init__(self, parent, wraplength=600):
+        super().__init__(parent)
+        self.enabled_var = tk.BooleanVar(value=tracer.enabled)
+        ttk.Checkbutton(self, text="Timings", variable=self.enabled_var, command=self.toggle).pack(side='left')
+        self.timings_label = ttk.Label(self, text="", wraplength=wraplength)
+        self.timings_label.pack(side='left', padx=5)
+        self.save_button = ttk.Button(self, text="Save Trace", command=self.save_trace)
+        self._generation = None
+        self._after_id = None
+        self.refresh()
+
+    def toggle(self):
+        tracer.enabled = self.enabled_var.get()
+        self.refresh()
+
+    def refresh(self):
+        if self.enabled_var.get() != tracer.enabled:
+            self.enabled_var.set(tracer.enabled)
+        if tracer.enabled:
+            if tracer.generation != self._generation:
+                self._generation = tracer.generation
+                latest = tracer.latest()
+                self.timings_label.config(text=" | ".join(str(summary) for summary in reversed(latest))
+                                          or "Waiting for a load, plot or export")
+            if not self.save_button.winfo_manager():
+                self.save_button.pack(side='left', padx=5)
+        elif self.save_button.winfo_manager() or self._generation is not None:
+            self._generation = None
+            self.timings_label.config(text="")
+            self.save_button.pack_forget()
+        self._after_id = self.after(REFRESH_MS, self.refresh)
+
+    def save_trace(self):
+        if not len(tracer):
+            messagebox.showwarning("No Timings", "Nothing has been timed yet.", parent=self)
+            return
+        file_path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")],
+            initialfile="trace.json",
+            title="Save trace (open in chrome://tracing or ui.perfetto.dev)")
+        if not file_path:
+            return
+        try:
+            tracer.save(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save trace:\n{e}", parent=self)
+            return
+        messagebox.showinfo("Success", f"Trace of {len(tracer)} spans saved to:\n{file_path}", parent=self)
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
@@ -1,11 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from pymavlink import mavutil
-import xml.etree.ElementTree as ET
 import os
 import json
+import bisect
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from columnSpill import shared_budget
+from logCache import LogCache
+from logIndex import LogIndex
+from ingestWorker import IngestWorker
+from plotDecimation import DecimatedLine
+from plotInteraction import BlitManager, MotionThrottle, Crosshair
+from catalogBrowser import CatalogBrowser
+from fieldSearch import SEARCH_SHOWN, FieldIndex, log_field_paths
+from exportFormats import ask_export_path
+from selectionExport import parse_selection, selection_section
+from spanTrace import span
+from timeAlign import ALIGN_MERGE, ALIGN_NEAREST, ALIGN_PREVIOUS, ALIGN_RESAMPLE
+from traceBar import TraceBar
+
+# Export alignment choices: by row index (fields written side by side as recorded) or on a common timeline
+ALIGN_CHOICES = {
+    "By row": None,
+    "Merge timestamps": ALIGN_MERGE,
+    "Previous sample": ALIGN_PREVIOUS,
+    "Nearest sample": ALIGN_NEAREST,
+    "Resample": ALIGN_RESAMPLE,
+}
 
 class XmlExporterGUI:
     _instance = None
@@ -24,13 +45,31 @@ class XmlExporterGUI:
             self.master.protocol("WM_DELETE_WINDOW", self._on_close)
             
             self.log_file = None
+            self.log_index = None
+            self.log_cache = LogCache()
+            self.ingest_worker = None
+            self.decode_worker = None
+            self.decode_callbacks = []
             self.message_data = {}
             self.selected_fields = set()
+            # Tree items by 'type', 'type/instance' and 'type/instance/field' path, and back;
+            # children are only inserted when a node is first opened
+            self.tree_nodes = {}
+            self.node_paths = {}
+            self.unopened_nodes = set()
+            self.tree_types = []
+            self.field_index = None
+            # {msg_type: {'type/instance/field'}} of the loaded log, for validating selections
+            self.valid_paths = {}
             
             self.create_widgets()
             self.load_log()
 
     def _on_close(self):
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel(notify=False)
+        if self.decode_worker is not None:
+            self.decode_worker.cancel(notify=False)
         XmlExporterGUI._instance = None
         self.master.destroy()
 
@@ -54,6 +93,17 @@ class XmlExporterGUI:
         except Exception as e:
             print(f"Error loading icon: {e}")
 
+        # Filters the tree as you type; * and ? match field names, or whole paths when the query has a /
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.filter_tree())
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(search_frame, text="Tick All Matches", command=self.tick_matches).pack(side=tk.LEFT, padx=5)
+        self.search_label = ttk.Label(search_frame, text="")
+        self.search_label.pack(side=tk.LEFT, padx=5)
+
         # Split into left (tree) and right (selected fields) panels
         paned = ttk.PanedWindow(main_frame, orient=tk.HORIZONTAL)
         paned.pack(fill=tk.BOTH, expand=True)
@@ -87,7 +137,7 @@ class XmlExporterGUI:
 
         self.export_btn = ttk.Button(
             btn_frame, 
-            text="Export XML", 
+            text="Export", 
             command=self.export_xml,
             state=tk.DISABLED
         )
@@ -124,10 +174,47 @@ class XmlExporterGUI:
             command=self.import_favorite
         ).pack(side=tk.LEFT, padx=5)
 
+        ttk.Button(
+            btn_frame,
+            text="Catalog",
+            command=self.open_catalog
+        ).pack(side=tk.LEFT, padx=5)
+
+        # How fields from different messages are lined up in the export
+        align_frame = ttk.Frame(main_frame)
+        align_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(align_frame, text="Align:").pack(side=tk.LEFT, padx=5)
+        self.align_var = tk.StringVar(value="By row")
+        align_combobox = ttk.Combobox(align_frame, textvariable=self.align_var, values=list(ALIGN_CHOICES),
+                                      state="readonly", width=18)
+        align_combobox.pack(side=tk.LEFT)
+        align_combobox.bind("<<ComboboxSelected>>", self.on_align_select)
+        ttk.Label(align_frame, text="Rate (Hz):").pack(side=tk.LEFT, padx=(10, 5))
+        self.rate_var = tk.StringVar(value="10")
+        self.rate_entry = ttk.Entry(align_frame, textvariable=self.rate_var, width=8, state=tk.DISABLED)
+        self.rate_entry.pack(side=tk.LEFT)
+
+        # Timings of the latest load, preview and export stages, while switched on
+        self.trace_bar = TraceBar(main_frame, wraplength=560)
+        self.trace_bar.pack(fill=tk.X, pady=(5, 0))
+
+        # Load progress, shown only while a log is being parsed
+        self.progress_frame = ttk.Frame(main_frame)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate', maximum=100)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.progress_label = ttk.Label(self.progress_frame, text="")
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            self.progress_frame,
+            text="Cancel",
+            command=self.cancel_load
+        ).pack(side=tk.LEFT, padx=5)
+
         self.tree.tag_configure('checked', image=self.create_checkmark())
         self.tree.tag_configure('unchecked', image=self.create_empty_checkmark())
         
         self.tree.bind('<Button-1>', self.on_tree_click)
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
 
     def create_checkmark(self):
         checkbox = tk.PhotoImage(width=16, height=16)
@@ -147,28 +234,117 @@ class XmlExporterGUI:
         if not item:
             return
 
-        # Get the full path to this item
-        field_node = item
-        instance_node = self.tree.parent(field_node)
-        msg_type_node = self.tree.parent(instance_node)
-        
-        if not msg_type_node:  # Invalid structure
+        # Only field items (type/instance/field) can be checked
+        full_path = self.node_paths.get(item)
+        if full_path is None or full_path.count('/') != 2:
             return
 
-        msg_type = self.tree.item(msg_type_node)['text']
-        instance_id = self.tree.item(instance_node)['text']
-        field = self.tree.item(field_node)['text']
-        full_path = f"{msg_type}/{instance_id}/{field}"
-
         if full_path in self.selected_fields:
             self.selected_fields.remove(full_path)
-            self.tree.item(field_node, tags=('unchecked',))
+            self.set_checked(full_path, False)
         else:
             self.selected_fields.add(full_path)
-            self.tree.item(field_node, tags=('checked',))
+            self.set_checked(full_path, True)
+
+        self.on_selection_changed()
 
+    def on_selection_changed(self):
         self.update_selected_listbox()
-        self.export_btn['state'] = tk.NORMAL if self.selected_fields else tk.DISABLED
+        if self.ingest_worker is None:
+            self.export_btn['state'] = tk.NORMAL if self.selected_fields else tk.DISABLED
+            # Start decoding now so export and preview are ready sooner
+            self.ensure_decoded()
+
+    def filter_tree(self):
+        """Show the fields matching the search, or the whole (lazily filled) tree when it is empty"""
+        if self.ingest_worker is not None:
+            return  # The index is built when the scan is done
+        self.clear_tree()
+        query = self.search_var.get().strip()
+        if self.field_index is None:
+            return
+        if not query:
+            self.add_tree_types(self.log_index.message_types())
+            self.search_label.config(text="")
+            return
+
+        matches = self.field_index.search(query)
+        for msg_type, instance_id, field in matches[:SEARCH_SHOWN]:
+            instance_path = f"{msg_type}/{instance_id}"
+            if instance_path not in self.tree_nodes:
+                if msg_type not in self.tree_nodes:
+                    self.insert_tree_node('', 'end', msg_type, msg_type, open=True)
+                self.insert_tree_node(self.tree_nodes[msg_type], 'end', instance_path, instance_id, open=True)
+            path = f"{instance_path}/{field}"
+            tag = 'checked' if path in self.selected_fields else 'unchecked'
+            self.insert_tree_node(self.tree_nodes[instance_path], 'end', path, field, tags=(tag,))
+        shown = f" (first {SEARCH_SHOWN} shown)" if len(matches) > SEARCH_SHOWN else ""
+        self.search_label.config(text=f"{len(matches)} fields{shown}")
+
+    def tick_matches(self):
+        query = self.search_var.get().strip()
+        if self.field_index is None or not query:
+            return
+        for msg_type, instance_id, field in self.field_index.search(query):
+            path = f"{msg_type}/{instance_id}/{field}"
+            if path not in self.selected_fields:
+                self.selected_fields.add(path)
+                self.set_checked(path, True)
+        self.on_selection_changed()
+
+    def on_tree_open(self, event):
+        node = self.tree.focus()
+        if node not in self.unopened_nodes or self.log_index is None:
+            return
+        self.unopened_nodes.discard(node)
+        self.tree.delete(*self.tree.get_children(node))
+        path = self.node_paths[node]
+        if '/' not in path:
+            for instance_id in self.log_index.instance_ids(path):
+                self.insert_tree_branch(node, 'end', f"{path}/{instance_id}", instance_id)
+        else:
+            msg_type, instance_id = path.split('/', 1)
+            for field in self.log_index.field_names(msg_type, instance_id):
+                field_path = f"{path}/{field}"
+                tag = 'checked' if field_path in self.selected_fields else 'unchecked'
+                self.insert_tree_node(node, 'end', field_path, field, tags=(tag,))
+
+    def insert_tree_node(self, parent, position, path, text, tags=(), open=False):
+        node = self.tree.insert(parent, position, text=text, tags=tags, open=open)
+        self.tree_nodes[path] = node
+        self.node_paths[node] = path
+        return node
+
+    def insert_tree_branch(self, parent, position, path, text):
+        """Insert a type or instance item whose children are inserted when it is opened"""
+        node = self.insert_tree_node(parent, position, path, text)
+        self.tree.insert(node, 'end')  # placeholder, so the item shows as openable
+        self.unopened_nodes.add(node)
+        return node
+
+    def clear_tree(self):
+        self.tree.delete(*self.tree.get_children())
+        self.tree_nodes = {}
+        self.node_paths = {}
+        self.unopened_nodes = set()
+        self.tree_types = []
+
+    def set_checked(self, path, checked):
+        # Fields not inserted yet get their state when their instance is opened
+        node = self.tree_nodes.get(path)
+        if node is not None:
+            self.tree.item(node, tags=('checked' if checked else 'unchecked',))
+
+    def is_valid_path(self, path):
+        paths = self.valid_paths.get(path.split('/', 1)[0])
+        return paths is not None and path in paths
+
+    def index_paths(self, msg_types):
+        """Re-read the fields of msg_types (e.g. once decoded) into valid_paths"""
+        for msg_type in msg_types:
+            self.valid_paths[msg_type] = {f"{msg_type}/{instance_id}/{field}"
+                                          for instance_id in self.log_index.instance_ids(msg_type)
+                                          for field in self.log_index.field_names(msg_type, instance_id)}
 
     def update_selected_listbox(self):
         self.selected_listbox.delete(0, tk.END)
@@ -176,11 +352,9 @@ class XmlExporterGUI:
             self.selected_listbox.insert(tk.END, field)
 
     def clear_selection(self):
+        for path in self.selected_fields:
+            self.set_checked(path, False)
         self.selected_fields.clear()
-        for item in self.tree.get_children():
-            for msg_type in self.tree.get_children(item):
-                for field in self.tree.get_children(msg_type):
-                    self.tree.item(field, tags=('unchecked',))
         self.update_selected_listbox()
         self.export_btn['state'] = tk.DISABLED
 
@@ -191,7 +365,6 @@ class XmlExporterGUI:
         )
         if self.log_file:
             self.parse_log_file()
-            self.populate_tree()
 
     def upload_new_log(self):
         new_file = filedialog.askopenfilename(
@@ -200,135 +373,215 @@ class XmlExporterGUI:
         )
         if new_file:
             self.log_file = new_file
-            self.parse_log_file()
-            self.populate_tree()
-            messagebox.showinfo("Info", "New log file loaded successfully")
-
-    def parse_log_file(self):
+            self.parse_log_file(
+                on_loaded=lambda: messagebox.showinfo("Info", "New log file loaded successfully"))
+
+    def open_catalog(self):
+        CatalogBrowser(self.master, self.open_log)
+
+    def open_log(self, log_file):
+        self.log_file = log_file
+        self.parse_log_file()
+
+    def parse_log_file(self, on_loaded=None):
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel(notify=False)
+        if self.decode_worker is not None:
+            self.decode_worker.cancel(notify=False)
+            self.decode_worker = None
+        self.decode_callbacks = []
         self.message_data.clear()
-        mlog = mavutil.mavlink_connection(self.log_file)
-        start_time = None
-        
-        while True:
-            msg = mlog.recv_match(blocking=False)
-            if msg is None:
-                break
-            
-            msg_type = msg.get_type()
+        self.field_index = None
+        self.valid_paths = {}
+        self.clear_tree()
+        self.export_btn['state'] = tk.DISABLED
+
+        def on_done():
+            self.ingest_worker = None
+            self.progress_frame.pack_forget()
+            self.populate_tree()
+            self.ensure_decoded()
+            if on_loaded:
+                on_loaded()
+
+        # Scan on a worker thread; the tree fills in as message types are found
+        index = self.log_index = LogIndex(self.log_file, shared_budget())
+        self.ingest_worker = IngestWorker(
+            self.master, index,
+            lambda progress, cancel_event: index.load(self.log_cache, progress, cancel_event),
+            on_progress=self.on_load_progress,
+            on_types=self.add_tree_types,
+            on_done=on_done,
+            on_error=self.on_load_error,
+            on_cancelled=self.on_load_cancelled)
+        self.progress_bar['value'] = 0
+        self.progress_label.config(text="")
+        self.progress_frame.pack(fill=tk.X, pady=(5, 0))
+        self.ingest_worker.start()
+
+    def is_loading(self):
+        if self.ingest_worker is None:
+            return False
+        messagebox.showinfo("Loading", "Please wait until the log has finished loading.")
+        return True
+
+    def cancel_load(self):
+        if self.ingest_worker is not None:
+            self.ingest_worker.cancel()
+        if self.decode_worker is not None:
+            self.decode_worker.cancel()
+
+    def ensure_decoded(self, then=None):
+        """Make sure the types of the selected fields are decoded.
+
+        Returns True if they already are; otherwise decodes them in the
+        background, calls then() when done and returns False.
+        """
+        if self.log_index is None:
+            return True
+        msg_types = sorted({path.split('/')[0] for path in self.selected_fields})
+        pending = [msg_type for msg_type in msg_types if not self.log_index.is_decoded(msg_type)]
+        if not pending:
+            self.update_message_data()
+            return True
+
+        if then is not None:
+            self.decode_callbacks.append(then)
+        if self.decode_worker is not None:
+            # Replace the running decode with one covering the whole selection
+            self.decode_worker.cancel(notify=False)
+
+        index = self.log_index
+        self.decode_worker = IngestWorker(
+            self.master, index,
+            lambda progress, cancel_event: index.decode_types(pending, progress, cancel_event),
+            on_progress=self.on_decode_progress,
+            on_done=lambda: self.on_decode_done(pending),
+            on_error=self.on_decode_error,
+            on_cancelled=self.on_decode_cancelled)
+        self.progress_bar['value'] = 0
+        self.progress_label.config(text="")
+        self.progress_frame.pack(fill=tk.X, pady=(5, 0))
+        self.decode_worker.start()
+        return False
+
+    def update_message_data(self):
+        for msg_type in list(self.log_index.store.types):
             if msg_type not in self.message_data:
-                self.message_data[msg_type] = {}
-            
-            timestamp = msg._timestamp
-            if start_time is None:
-                start_time = timestamp
-            
-            msg_id = str(getattr(msg, 'id', '0'))
-            if msg_id not in self.message_data[msg_type]:
-                self.message_data[msg_type][msg_id] = {
-                    'times': [],
-                    'data': {}
-                }
-            
-            rel_time = timestamp - start_time
-            self.message_data[msg_type][msg_id]['times'].append(rel_time)
-            
-            for field in msg._fieldnames:
-                if field in ['time_boot_ms', 'time_usec', 'id']:
-                    continue
-                
-                value = getattr(msg, field)
-                if isinstance(value, (list, tuple)):
-                    for idx, val in enumerate(value):
-                        if isinstance(val, (int, float)):
-                            field_name = f"{field}[{idx}]"
-                            if field_name not in self.message_data[msg_type][msg_id]['data']:
-                                self.message_data[msg_type][msg_id]['data'][field_name] = []
-                            self.message_data[msg_type][msg_id]['data'][field_name].append(val)
-                elif isinstance(value, (int, float)):
-                    if field not in self.message_data[msg_type][msg_id]['data']:
-                        self.message_data[msg_type][msg_id]['data'][field] = []
-                    self.message_data[msg_type][msg_id]['data'][field].append(value)
+                self.message_data[msg_type] = self.log_index.type_data(msg_type, self.log_index.start_time)
+
+    def on_decode_progress(self, done, total):
+        self.progress_bar['value'] = 100 * done / total if total else 100
+        self.progress_label.config(text=f"Decoding: {done}/{total} messages")
+
+    def on_decode_done(self, msg_types):
+        self.decode_worker = None
+        self.progress_frame.pack_forget()
+        self.index_paths(msg_types)
+        self.update_message_data()
+        callbacks, self.decode_callbacks = self.decode_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_decode_error(self, error):
+        self.decode_worker = None
+        self.decode_callbacks = []
+        self.progress_frame.pack_forget()
+        messagebox.showerror("Error", f"Failed to decode messages:\n{str(error)}")
+
+    def on_decode_cancelled(self):
+        self.decode_worker = None
+        self.decode_callbacks = []
+        self.progress_frame.pack_forget()
+
+    def on_load_progress(self, done, total):
+        self.progress_bar['value'] = 100 * done / total if total else 100
+        self.progress_label.config(text=f"{done / 1e6:.1f} / {total / 1e6:.1f} MB")
+
+    def on_load_error(self, error):
+        self.ingest_worker = None
+        self.log_index = None
+        self.progress_frame.pack_forget()
+        self.clear_tree()
+        messagebox.showerror("Error", f"Failed to load log:\n{str(error)}")
+
+    def on_load_cancelled(self):
+        self.ingest_worker = None
+        self.log_index = None
+        self.progress_frame.pack_forget()
+        self.clear_tree()
+        self.update_selected_listbox()
+
+    def add_tree_types(self, msg_types):
+        # Insert newly found types in sorted position; instances and fields are read when opened
+        for msg_type in msg_types:
+            position = bisect.bisect(self.tree_types, msg_type)
+            self.tree_types.insert(position, msg_type)
+            self.insert_tree_branch('', position, msg_type, msg_type)
 
     def populate_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        
-        for msg_type in sorted(self.message_data.keys()):
-            msg_type_node = self.tree.insert('', 'end', text=msg_type)
-            
-            for instance_id, data in sorted(self.message_data[msg_type].items(), key=lambda x: int(x[0])):
-                instance_node = self.tree.insert(msg_type_node, 'end', text=instance_id)
-                
-                for field in sorted(data['data'].keys()):
-                    self.tree.insert(instance_node, 'end', text=field, tags=('unchecked',))
-
-        # Validate selected fields against current data
-        valid_paths = set()
-        for msg_type_node in self.tree.get_children():
-            msg_type = self.tree.item(msg_type_node)['text']
-            for instance_node in self.tree.get_children(msg_type_node):
-                instance_id = self.tree.item(instance_node)['text']
-                for field_node in self.tree.get_children(instance_node):
-                    field = self.tree.item(field_node)['text']
-                    valid_paths.add(f"{msg_type}/{instance_id}/{field}")
-
-        # Update selected fields and checkboxes
-        self.selected_fields = {path for path in self.selected_fields if path in valid_paths}
-        for path in self.selected_fields:
-            msg_type, instance_id, field = path.split('/')
-            for msg_type_node in self.tree.get_children():
-                if self.tree.item(msg_type_node)['text'] == msg_type:
-                    for instance_node in self.tree.get_children(msg_type_node):
-                        if self.tree.item(instance_node)['text'] == instance_id:
-                            for field_node in self.tree.get_children(instance_node):
-                                if self.tree.item(field_node)['text'] == field:
-                                    self.tree.item(field_node, tags=('checked',))
-                                    break
-                            break
-                    break
-        
+        # Rebuilt once the scan is complete, as instances and fields may have been found since
+        paths = log_field_paths(self.log_index) if self.log_index is not None else []
+        self.field_index = FieldIndex(paths) if self.log_index is not None else None
+        self.valid_paths = {}
+        for msg_type, instance_id, field in paths:
+            self.valid_paths.setdefault(msg_type, set()).add(f"{msg_type}/{instance_id}/{field}")
+        self.filter_tree()
+
+        # Keep the selected fields this log has
+        self.selected_fields = {path for path in self.selected_fields if self.is_valid_path(path)}
         self.update_selected_listbox()
         self.export_btn['state'] = tk.NORMAL if self.selected_fields else tk.DISABLED
 
+    def on_align_select(self, event=None):
+        resample = ALIGN_CHOICES[self.align_var.get()] == ALIGN_RESAMPLE
+        self.rate_entry['state'] = tk.NORMAL if resample else tk.DISABLED
+
     def export_xml(self):
+        if self.is_loading():
+            return
         if not self.selected_fields:
             messagebox.showerror("Error", "Please select at least one field")
             return
-        
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".xml",
-            filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")],
-            title="Save XML File"
-        )
+        if not self.ensure_decoded(self.export_xml):
+            return
+
+        mode = ALIGN_CHOICES[self.align_var.get()]
+        rate = None
+        if mode == ALIGN_RESAMPLE:
+            try:
+                rate = float(self.rate_var.get())
+            except ValueError:
+                rate = 0
+            if not rate > 0:
+                messagebox.showerror("Error", "Please enter a resample rate above zero")
+                return
+
+        file_path, export_format = ask_export_path(self.master)
         if not file_path:
             return
-        
-        root = ET.Element("MAVLinkData")
-        field_data = {}
-        min_length = float('inf')
-        
-        for path in self.selected_fields:
-            msg_type, instance_id, field = path.split('/')
-            data = self.message_data[msg_type][instance_id]
-            times = data['times']
-            values = data['data'][field]
-            field_data[field] = values
-            min_length = min(min_length, len(times))
-        
-        for i in range(min_length):
-            record = ET.SubElement(root, "Record")
-            ET.SubElement(record, "Time").text = f"{int(data['times'][i])}"
-            for field, values in field_data.items():
-                safe_field = field.replace(' ', '_').replace('[', '').replace(']', '')
-                ET.SubElement(record, safe_field).text = str(values[i])
-        
-        tree = ET.ElementTree(root)
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
-        messagebox.showinfo("Success", f"XML exported to:\n{file_path}")
+
+        # Sorted so aligned columns come out in a stable order
+        paths = sorted(self.selected_fields) if mode is not None else self.selected_fields
+        with span('export', detail=export_format.key) as export_span:
+            try:
+                with span('select'):
+                    times, columns, exact_times = selection_section(self.message_data, parse_selection(paths), mode, rate)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            export_span.add(len(times))
+            export_format.write(file_path, [(None, times, columns)], exact_times=exact_times)
+        messagebox.showinfo("Success", f"{export_format.name} exported to:\n{file_path}")
 
     def show_preview(self):
+        if self.is_loading():
+            return
         if not self.selected_fields:
             messagebox.showwarning("No Selection", "Please select fields to preview.")
             return
+        if not self.ensure_decoded(self.show_preview):
+            return
 
         # Create preview window
         preview_win = tk.Toplevel(self.master)
@@ -352,7 +605,7 @@ class XmlExporterGUI:
             msg_type, instance_id, field = path.split('/')
             data = self.message_data[msg_type][instance_id]
             times = data['times']
-            values = data['data'][field]
+            values = data['data'].get(field, [])
             if len(times) == len(values):
                 field_names.append(f"{msg_type} (ID {instance_id}) - {field}")
                 field_data.append({
@@ -396,6 +649,15 @@ class XmlExporterGUI:
         )
         next_button.grid(row=0, column=2, padx=5)
 
+        # Unticked draws every sample, for exact inspection
+        decimate_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            nav_frame,
+            text="Decimate",
+            variable=decimate_var,
+            command=lambda: toggle_decimation()
+        ).grid(row=0, column=3, padx=5)
+
         # Matplotlib Figure
         fig = plt.Figure(figsize=(10, 6), dpi=100)
         canvas = FigureCanvasTkAgg(fig, master=preview_win)
@@ -415,29 +677,36 @@ class XmlExporterGUI:
         zoom_stack = []
         zoom_rect = None
         zoom_start = None
+        line = None
+
+        # Rubber band and crosshair are blitted over a cached background
+        blit = BlitManager(canvas)
+        crosshair = None
 
         def plot_current():
-            nonlocal current_index
+            nonlocal current_index, line, zoom_rect, zoom_start, crosshair
             data = field_data[current_index]
-            fig.clear()
-            ax = fig.add_subplot(111)
-            ax.plot(data['times'], data['values'], 'b-')
-            ax.set_title(data['title'], fontsize=10)
-            ax.set_xlabel(data['xlabel'], fontsize=9)
-            ax.set_ylabel(data['ylabel'], fontsize=9)
-            ax.grid(True)
-            fig.tight_layout()
-            canvas.draw()
+            blit.clear()
+            zoom_rect = None
+            zoom_start = None
+            with span('preview', len(data['times']), data['title']):
+                fig.clear()
+                ax = fig.add_subplot(111)
+                line = DecimatedLine(ax, data['times'], data['values'], 'b-', enabled=decimate_var.get())
+                ax.set_title(data['title'], fontsize=10)
+                ax.set_xlabel(data['xlabel'], fontsize=9)
+                ax.set_ylabel(data['ylabel'], fontsize=9)
+                ax.grid(True)
+                crosshair = Crosshair(fig, blit)
+                with span('tight_layout'):
+                    fig.tight_layout()
+                with span('draw'):
+                    canvas.draw()
             field_var.set(field_names[current_index])
             plot_info.config(text=f"Plot {current_index + 1} of {len(field_data)}")
             prev_button["state"] = "normal" if current_index > 0 else "disabled"
             next_button["state"] = "normal" if current_index < len(field_data)-1 else "disabled"
 
-            # Reconnect zoom events
-            canvas.mpl_connect('button_press_event', on_press)
-            canvas.mpl_connect('button_release_event', on_release)
-            canvas.mpl_connect('motion_notify_event', update_cursor)
-
         def navigate(step):
             nonlocal current_index
             new_index = current_index + step
@@ -452,39 +721,42 @@ class XmlExporterGUI:
                 current_index = selected
                 plot_current()
 
+        def remove_zoom_rect():
+            nonlocal zoom_rect
+            if zoom_rect:
+                blit.remove(zoom_rect)
+                zoom_rect = None
+
         def on_press(event):
             nonlocal zoom_start, zoom_rect
             
             if event.button == 1:  # Left mouse button
                 if event.inaxes:
                     zoom_start = (event.xdata, event.ydata)
-                    if zoom_rect:
-                        zoom_rect.remove()
-                    zoom_rect = plt.Rectangle(
+                    remove_zoom_rect()
+                    zoom_rect = blit.add(plt.Rectangle(
                         (event.xdata, event.ydata), 
                         0, 0, 
                         fill=False, 
                         linestyle='dashed', 
                         color='red'
-                    )
+                    ))
                     event.inaxes.add_patch(zoom_rect)
-                    canvas.draw()
+                    blit.update()
             elif event.button == 3:  # Right mouse button
                 reset_zoom()
 
         def on_release(event):
-            nonlocal zoom_start, zoom_rect, zoom_stack
+            nonlocal zoom_start, zoom_stack
             
             if event.button == 1 and zoom_start and zoom_rect and event.inaxes:  # Left mouse button
                 x0, y0 = zoom_start
                 x1, y1 = event.xdata, event.ydata
                 
                 if x1 is None or y1 is None:
-                    if zoom_rect:
-                        zoom_rect.remove()
-                        zoom_rect = None
+                    remove_zoom_rect()
                     zoom_start = None
-                    canvas.draw()
+                    blit.update()
                     return
                     
                 # Ensure x0 < x1 and y0 < y1
@@ -506,17 +778,14 @@ class XmlExporterGUI:
                 ax.set_ylim(y_min, y_max)
                 
                 # Remove rectangle
-                if zoom_rect:
-                    zoom_rect.remove()
-                    zoom_rect = None
+                remove_zoom_rect()
                 zoom_start = None
                 canvas.draw()
 
         def reset_zoom():
             nonlocal zoom_stack
             
-            if zoom_rect:
-                zoom_rect.remove()
+            remove_zoom_rect()
             
             if zoom_stack:
                 ax = fig.axes[0]
@@ -528,39 +797,49 @@ class XmlExporterGUI:
             else:
                 # Reset to full view
                 ax = fig.axes[0]
+                line.reset()
                 ax.relim()
                 ax.autoscale_view()
                 canvas.draw()
 
         def update_cursor(event):
-            nonlocal zoom_start, zoom_rect
-            
+            # Called at most once per frame with the latest mouse position
             if zoom_start and zoom_rect and event.inaxes:
                 # Update zoom rectangle
                 x0, y0 = zoom_start
                 x1, y1 = event.xdata, event.ydata
                 
-                if x1 is None or y1 is None:
-                    return
-                
-                # Calculate width and height
-                width = x1 - x0
-                height = y1 - y0
-                
-                # Update rectangle position and size
-                x = min(x0, x1)
-                y = min(y0, y1)
-                zoom_rect.set_xy((x, y))
-                zoom_rect.set_width(abs(width))
-                zoom_rect.set_height(abs(height))
-                canvas.draw()
+                if x1 is not None and y1 is not None:
+                    # Calculate width and height
+                    width = x1 - x0
+                    height = y1 - y0
+                    
+                    # Update rectangle position and size
+                    x = min(x0, x1)
+                    y = min(y0, y1)
+                    zoom_rect.set_xy((x, y))
+                    zoom_rect.set_width(abs(width))
+                    zoom_rect.set_height(abs(height))
             
             if event.inaxes:
+                crosshair.move(event.x, event.y, event.inaxes)
                 x, y = event.xdata, event.ydata
                 if x is not None and y is not None:
                     cursor_label.config(text=f'Time: {x:.2f}s, Value: {y:.2f}')
             else:
+                crosshair.hide()
                 cursor_label.config(text="")
+            blit.update()
+
+        def toggle_decimation():
+            if line is not None:
+                line.set_enabled(decimate_var.get())
+                canvas.draw_idle()
+
+        # Connected once; the handlers always act on the current plot
+        canvas.mpl_connect('button_press_event', on_press)
+        canvas.mpl_connect('button_release_event', on_release)
+        MotionThrottle(canvas, update_cursor)
 
         field_dropdown.bind('<<ComboboxSelected>>', on_dropdown_select)
 
@@ -595,6 +874,9 @@ class XmlExporterGUI:
         if not file_path:
             return
         
+        if self.is_loading():
+            return
+
         try:
             with open(file_path, 'r') as f:
                 favorite = json.load(f)
@@ -603,19 +885,16 @@ class XmlExporterGUI:
             return
         
         # Validate paths against current data
-        valid_paths = set()
-        for path in favorite:
-            parts = path.split('/')
-            if len(parts) != 3:
-                continue
-            msg_type, instance_id, field = parts
-            if msg_type in self.message_data:
-                if instance_id in self.message_data[msg_type]:
-                    if field in self.message_data[msg_type][instance_id]['data']:
-                        valid_paths.add(path)
-        
+        valid_paths = {path for path in favorite if isinstance(path, str) and self.is_valid_path(path)}
+
+        for path in self.selected_fields - valid_paths:
+            self.set_checked(path, False)
+        for path in valid_paths - self.selected_fields:
+            self.set_checked(path, True)
         self.selected_fields = valid_paths
-        self.populate_tree()  # Refresh tree and update selections
+        self.update_selected_listbox()
+        self.export_btn['state'] = tk.NORMAL if self.selected_fields else tk.DISABLED
+        self.ensure_decoded()
         messagebox.showinfo("Success", f"Imported {len(valid_paths)} valid fields.")
 
 def open_xml_exporter():
@@ -0,0 +1,96 @@
+import numpy as np
+
+from spanTrace import span
+
+# Records formatted and written per block; bounds the temporary Python lists
+RECORDS_PER_BLOCK = 8192
+WRITE_BUFFER = 1 << 20
+
+_ATTRIB_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'),
+                   ('\r', '&#13;'), ('\n', '&#10;'), ('\t', '&#09;'))
+
+
+def safe_tag(field):
+    """Element name of a field column, e.g. 'voltages[0]' -> 'voltages0'"""
+    return field.replace(' ', '_').replace('[', '').replace(']', '')
+
+
+def _escape_attrib(value):
+    for char, entity in _ATTRIB_ESCAPES:
+        value = value.replace(char, entity)
+    return value
+
+
+class XmlStreamWriter:
+    """Writes MAVLinkData XML incrementally, byte for byte as ElementTree.write would.
+
+    Elements are opened with start() and closed with end(); records are
+    written in blocks by write_records, so memory stays bounded whatever the
+    size of the export. Use as a context manager: the open elements are
+    closed and the file flushed on exit.
+    """
+
+    def __init__(self, file_path, root="MAVLinkData"):
+        # Same text mode and error handling as ElementTree.write to a path
+        self._file = open(file_path, 'w', encoding='utf-8', errors='xmlcharrefreplace',
+                          buffering=WRITE_BUFFER)
+        self._file.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        self._open = []
+        # An element stays unterminated ('<tag') until its first child, so an empty one becomes '<tag />'
+        self._pending = False
+        self.start(root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            while self._open:
+                self.end()
+        self._file.close()
+        return False
+
+    def _close_pending(self):
+        if self._pending:
+            self._file.write('>')
+            self._pending = False
+
+    def start(self, tag, **attrib):
+        self._close_pending()
+        attrs = ''.join(f' {name}="{_escape_attrib(str(value))}"' for name, value in attrib.items())
+        self._file.write(f'<{tag}{attrs}')
+        self._open.append(tag)
+        self._pending = True
+
+    def end(self):
+        tag = self._open.pop()
+        if self._pending:
+            self._file.write(' />')
+            self._pending = False
+        else:
+            self._file.write(f'</{tag}>')
+
+    def write_records(self, times, columns, exact_times=False):
+        """Write one Record per sample: its Time (whole seconds) and each (field, values) column.
+
+        The row template and tag names are built once; values are converted
+        with tolist() a block at a time so the text matches str() of the
+        decoded message values. exact_times keeps the fractional seconds of
+        Time, for timelines denser than one record per second.
+        """
+        count = len(times)
+        if not count:
+            return
+        with span('xml_serialise', count):
+            self._write_records(times, columns, count, exact_times)
+
+    def _write_records(self, times, columns, count, exact_times):
+        self._close_pending()
+        tags = [safe_tag(field) for field, _ in columns]
+        time_text = '%s' if exact_times else '%d'
+        template = f'<Record><Time>{time_text}</Time>' + ''.join(f'<{tag}>%s</{tag}>' for tag in tags) + '</Record>'
+        write = self._file.write
+        for start in range(0, count, RECORDS_PER_BLOCK):
+            end = min(start + RECORDS_PER_BLOCK, count)
+            block = [np.asarray(times[start:end]).tolist()] + [np.asarray(values)[start:end].tolist() for _, values in columns]
+            write(''.join([template % row for row in zip(*block)]))